@@ -1,15 +1,29 @@
-from fastapi import APIRouter, HTTPException, status, Header, File, UploadFile, Form
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, HTTPException, status, Header, File, UploadFile, Form, Query
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from sqlalchemy import insert, text  # ✅ Jeden import, usuń duplikat
 import cv2
 import numpy as np
+import asyncio
 import base64
+import hashlib
 
-from app.core.database import SessionLocal
+from app.core.database import SessionLocal, engine
 from app.models.qr_image import employees
-from app.services.qr_generator import generate_qr_code_blob
-from app.services.facial_recognition import FACE_CASCADE, crop_and_normalize, save_face_to_db
-from app.services.video import camera_instance
+from app.services.qr_generator import build_qr_payload, generate_qr_code_blob, qr_payload_token
+from app.services.facial_recognition import crop_and_normalize, save_face_to_db
+from app.services.face_templates import (
+    add_face_template,
+    delete_face_template,
+    keep_photo_as_template,
+    list_face_templates,
+)
+from app.services.video import camera_instance, door_registry
+from app.services.face_model import face_model_manager
+from app.services.qr_index import qr_index
+from app.services.access_stats import get_access_stats
+from app.services.audit import encode_thumbnail
+from app.services.audit_export import EXPORT_FORMATS, export_filename, iter_export
+from app.services.audit_query import AUDIT_TABLES, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, count_rows, fetch_page
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -17,9 +31,6 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 ADMIN_USERNAME = "admin"
 ADMIN_PASSWORD = "admin1"
 
-CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-FACE_CASCADE = cv2.CascadeClassifier(CASCADE_PATH)
-
 def get_db():
     db = SessionLocal()
     try:
@@ -74,16 +85,21 @@ async def create_user(
             )
         ret, buffer = cv2.imencode('.jpg', face_mask)
         face_photo_bytes = buffer.tobytes()
-        qr_code_blob = generate_qr_code_blob(fullName)
+        qr_payload = build_qr_payload(fullName)
+        qr_code_blob = generate_qr_code_blob(fullName, payload=qr_payload)
         
         # Insert into database
         stmt = insert(employees).values(
             emp_name=fullName,
             emp_qr_code=qr_code_blob,
             emp_photo=face_photo_bytes,
+            qr_token=qr_payload_token(qr_payload),
         )
         result = db.execute(stmt)
+        add_face_template(db, result.lastrowid, face_mask)
         db.commit()
+        face_model_manager.notify_face_added(fullName, face_mask, result.lastrowid)
+        qr_index.invalidate()
         
         print(f"✓ Added user: {fullName}")
         print(f"  → Face photo: {len(face_photo_bytes)} bytes")
@@ -122,8 +138,11 @@ async def delete_user(user_id: int, authorization: str = Header(None)):
     verify_admin_header(authorization)
     db = SessionLocal()
     try:
+        db.execute(text("DELETE FROM face_templates WHERE emp_id = :id"), {"id": user_id})
         db.execute(text("DELETE FROM employees WHERE emp_id = :id"), {"id": user_id})
         db.commit()
+        face_model_manager.notify_employees_changed()
+        qr_index.invalidate()
         return {"success": True, "message": f"User {user_id} deleted"}
     except Exception as e:
         db.rollback()
@@ -132,18 +151,165 @@ async def delete_user(user_id: int, authorization: str = Header(None)):
         db.close()
 
 
+def _camera_for_door(door: str | None):
+    if door:
+        selected = door_registry.get(door)
+        if selected is None:
+            raise HTTPException(status_code=404, detail=f"Unknown door: {door}")
+        camera = selected.camera
+    else:
+        camera = camera_instance
+    if not camera:
+        raise HTTPException(status_code=503, detail="Camera service not initialized")
+    return camera
+
+
+def _employee_name(db, user_id: int) -> str:
+    row = db.execute(text("SELECT emp_name FROM employees WHERE emp_id = :id"), {"id": user_id}).fetchone()
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Unknown user: {user_id}")
+    return row[0]
+
+
+@router.get("/users/{user_id}/templates")
+async def list_user_templates(user_id: int, authorization: str = Header(None)):
+    verify_admin_header(authorization)
+    db = SessionLocal()
+    try:
+        _employee_name(db, user_id)
+        return {"user_id": user_id, "templates": list_face_templates(db, user_id)}
+    finally:
+        db.close()
+
+
+@router.post("/users/{user_id}/templates")
+async def add_user_templates(
+    user_id: int,
+    facePhotos: list[UploadFile] = File(...),
+    authorization: str = Header(None),
+):
+    """Enroll more captures of an existing user (different days, lighting, glasses...).
+
+    Uploads are validated first: if none contains a usable face, nothing is
+    written and the request fails with 400.
+    """
+    verify_admin_header(authorization)
+    db = SessionLocal()
+    try:
+        name = _employee_name(db, user_id)
+        accepted, rejected = [], []
+        for photo in facePhotos:
+            img = cv2.imdecode(np.frombuffer(await photo.read(), np.uint8), cv2.IMREAD_COLOR)
+            if img is None:
+                rejected.append({"file": photo.filename, "reason": "Invalid image file"})
+                continue
+            try:
+                accepted.append((photo.filename, crop_and_normalize(img)))
+            except ValueError as e:
+                rejected.append({"file": photo.filename, "reason": str(e)})
+        if not accepted:
+            reasons = "; ".join(f"{r['file']}: {r['reason']}" for r in rejected)
+            raise HTTPException(status_code=400, detail=f"No usable face in the uploaded photos ({reasons})")
+
+        # Pierwszy dodatkowy szablon: zdjęcie z rejestracji zostaje w galerii
+        keep_photo_as_template(db, user_id)
+        faces, added = [], []
+        for filename, face_mask in accepted:
+            template = add_face_template(db, user_id, face_mask)
+            added.append({"file": filename, **template})
+            faces.append(face_mask)
+        db.commit()
+        for face_mask in faces:
+            face_model_manager.notify_face_added(name, face_mask, user_id)
+        print(f"✓ Added {len(added)} face templates for: {name}")
+        return {"success": True, "user_id": user_id, "added": added, "rejected": rejected}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        db.rollback()
+        print(f"✗ Error adding face templates: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        db.close()
+
+
+@router.post("/users/{user_id}/templates/capture")
+async def capture_user_templates(
+    user_id: int,
+    door: str | None = Form(None),
+    count: int = Form(1, ge=1, le=5),
+    authorization: str = Header(None),
+):
+    """Enroll ``count`` camera captures of an existing user, half a second apart."""
+    verify_admin_header(authorization)
+    camera = _camera_for_door(door)
+    db = SessionLocal()
+    try:
+        name = _employee_name(db, user_id)
+        # Pierwszy dodatkowy szablon: zdjęcie z rejestracji zostaje w galerii
+        keep_photo_as_template(db, user_id)
+        faces, added, rejected = [], [], 0
+        for i in range(count):
+            if i:
+                await asyncio.sleep(0.5)
+            frame = camera.get_raw_frame()
+            if frame is None:
+                rejected += 1
+                continue
+            try:
+                face_mask = crop_and_normalize(frame)
+            except ValueError:
+                # Nie wykryto twarzy w tej klatce
+                rejected += 1
+                continue
+            added.append(add_face_template(db, user_id, face_mask))
+            faces.append(face_mask)
+        if not added:
+            raise HTTPException(status_code=422, detail="No face detected in the captured frames")
+        db.commit()
+        for face_mask in faces:
+            face_model_manager.notify_face_added(name, face_mask, user_id)
+        return {"success": True, "user_id": user_id, "added": added, "rejected": rejected}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        db.close()
+
+
+@router.delete("/users/{user_id}/templates/{template_id}")
+async def delete_user_template(user_id: int, template_id: int, authorization: str = Header(None)):
+    verify_admin_header(authorization)
+    db = SessionLocal()
+    try:
+        if not delete_face_template(db, user_id, template_id):
+            raise HTTPException(status_code=404, detail=f"Unknown template {template_id} of user {user_id}")
+        db.commit()
+        face_model_manager.notify_employees_changed()
+        return {"success": True, "message": f"Template {template_id} of user {user_id} deleted"}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        db.close()
+
+
 @router.post("/face-capture")
 async def capture_face_from_camera(
     fullName: str = Form(...),
+    door: str | None = Form(None),
     authorization: str = Header(None),
 ):
     verify_admin_header(authorization)
 
-    # 1. Bierzemy klatkę z działającej kamery (Singleton)
-    if not camera_instance:
-        raise HTTPException(status_code=503, detail="Camera service not initialized")
-
-    frame = camera_instance.get_raw_frame()
+    # 1. Bierzemy klatkę z działającej kamery (domyślne drzwi albo wskazane w `door`)
+    camera = _camera_for_door(door)
+    frame = camera.get_raw_frame()
     
     if frame is None:
         raise HTTPException(status_code=503, detail="Could not capture frame from camera")
@@ -160,17 +326,22 @@ async def capture_face_from_camera(
         ret, buffer = cv2.imencode('.jpg', face_mask)
         face_blob = buffer.tobytes()
 
-        # 4. Generujemy QR
-        qr_code_blob = generate_qr_code_blob(fullName)
+        # 4. Generujemy QR (losowa część payloadu = qr_token do wyszukiwania)
+        qr_payload = build_qr_payload(fullName)
+        qr_code_blob = generate_qr_code_blob(fullName, payload=qr_payload)
 
         # 5. Zapisujemy wszystko
         stmt = insert(employees).values(
             emp_name=fullName,
             emp_qr_code=qr_code_blob,
             emp_photo=face_blob,
+            qr_token=qr_payload_token(qr_payload),
         )
-        db.execute(stmt)
+        result = db.execute(stmt)
+        add_face_template(db, result.lastrowid, face_mask)
         db.commit()
+        face_model_manager.notify_face_added(fullName, face_mask, result.lastrowid)
+        qr_index.invalidate()
 
         return {"success": True, "message": f"User '{fullName}' added with Face & QR."}
 
@@ -183,42 +354,191 @@ async def capture_face_from_camera(
     finally:
         db.close()
 
+def _audit_page(table_name: str, *, limit, cursor, sort, order, date_from, date_to, employee, include_total):
+    table = AUDIT_TABLES[table_name]
+    db = SessionLocal()
+    try:
+        rows, next_cursor = fetch_page(
+            db, table,
+            limit=limit, cursor=cursor, sort=sort, order=order,
+            date_from=date_from, date_to=date_to, employee=employee,
+        )
+        page = {"next_cursor": next_cursor, "limit": limit}
+        if include_total:
+            page["total"] = count_rows(db, table, date_from=date_from, date_to=date_to, employee=employee)
+        return rows, page
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        db.close()
+
 @router.get('/api/failed-attempts')
-async def get_failed_attempts(authorization: str = Header(None)):
+async def get_failed_attempts(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    sort: str = "id",
+    order: str = "desc",
+    date_from: str | None = None,
+    date_to: str | None = None,
+    employee: str | None = None,
+    include_total: bool = False,
+    authorization: str = Header(None),
+):
+    """One page of denials, newest first; pass `next_cursor` back as `cursor` for the next one."""
     verify_admin_header(authorization)
+    rows, page = _audit_page(
+        "unauthorized_access",
+        limit=limit, cursor=cursor, sort=sort, order=order,
+        date_from=date_from, date_to=date_to, employee=employee, include_total=include_total,
+    )
+    attempts = [
+        {
+            "id": row.id,
+            "qr_text": row.qr_text,
+            "photo_url": f"/admin/api/failed-attempts/{row.id}/photo" if row.has_photo else None,
+            "thumbnail_url": f"/admin/api/failed-attempts/{row.id}/thumbnail" if row.has_photo else None,
+            "created_at": row.created_at
+        } for row in rows
+    ]
+    return {"failed_attempts": attempts, **page}
+
+# Revalidated on every use: the ETag is a hash of the photo, so an unchanged image costs a 304.
+IMAGE_CACHE_CONTROL = "private, no-cache"
+
+def _failed_attempt_image(attempt_id: int, column: str, if_none_match: str | None):
     db = SessionLocal()
     try:
-        result = db.execute(text("SELECT * FROM unauthorized_access")).fetchall()
-        attempts = [
-            {
-                "id": row[0],
-                "qr_text": row[1],
-                "photo": base64.b64encode(row[2]).decode() if row[2] else None,
-                "created_at": row[3]
-            } for row in result
-        ]
-        return {"failed_attempts": attempts}
+        row = db.execute(
+            text("SELECT photo, thumbnail IS NULL FROM unauthorized_access WHERE id = :id"),
+            {"id": attempt_id},
+        ).first()
+        if row is None or row[0] is None:
+            raise HTTPException(status_code=404, detail="Photo not found")
+
+        photo, missing_thumbnail = row
+        # Hash of the bytes, not their length: a replaced photo of the same size gets a new tag.
+        digest = hashlib.blake2b(photo, digest_size=12).hexdigest()
+        headers = {"ETag": f'"ua-{attempt_id}-{column}-{digest}"', "Cache-Control": IMAGE_CACHE_CONTROL}
+        if if_none_match and headers["ETag"] in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+
+        if column == "photo":
+            content = photo
+        elif missing_thumbnail:
+            # Rows written before thumbnails existed: generate once and store.
+            frame = cv2.imdecode(np.frombuffer(photo, dtype=np.uint8), cv2.IMREAD_COLOR)
+            content = encode_thumbnail(frame) if frame is not None else None
+            if content is None:
+                content = photo
+            else:
+                db.execute(
+                    text("UPDATE unauthorized_access SET thumbnail = :thumbnail WHERE id = :id"),
+                    {"thumbnail": content, "id": attempt_id},
+                )
+                db.commit()
+        else:
+            content = db.execute(
+                text("SELECT thumbnail FROM unauthorized_access WHERE id = :id"), {"id": attempt_id}
+            ).scalar()
+        return Response(content=content, media_type="image/jpeg", headers=headers)
     finally:
         db.close()
 
+@router.get('/api/failed-attempts/{attempt_id}/photo')
+async def get_failed_attempt_photo(
+    attempt_id: int,
+    if_none_match: str | None = Header(None),
+    authorization: str = Header(None),
+):
+    verify_admin_header(authorization)
+    return _failed_attempt_image(attempt_id, "photo", if_none_match)
+
+@router.get('/api/failed-attempts/{attempt_id}/thumbnail')
+async def get_failed_attempt_thumbnail(
+    attempt_id: int,
+    if_none_match: str | None = Header(None),
+    authorization: str = Header(None),
+):
+    verify_admin_header(authorization)
+    return _failed_attempt_image(attempt_id, "thumbnail", if_none_match)
+
 @router.get('/api/good-entries')
-async def get_good_entries(authorization: str = Header(None)):
+async def get_good_entries(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    sort: str = "id",
+    order: str = "desc",
+    date_from: str | None = None,
+    date_to: str | None = None,
+    employee: str | None = None,
+    include_total: bool = False,
+    authorization: str = Header(None),
+):
+    """One page of granted entries; `employee` matches emp_id (digits) or emp_name."""
+    verify_admin_header(authorization)
+    rows, page = _audit_page(
+        "good_entries",
+        limit=limit, cursor=cursor, sort=sort, order=order,
+        date_from=date_from, date_to=date_to, employee=employee, include_total=include_total,
+    )
+    entries = [
+        {
+            "id": row.id,
+            "emp_id": row.emp_id,
+            "emp_name": row.emp_name,
+            "created_at": row.created_at
+        } for row in rows
+    ]
+    return {"good_entries": entries, **page}
+        
+@router.get('/api/stats')
+async def get_stats(
+    hours: int = Query(24, ge=1, le=24 * 31),
+    days: int = Query(7, ge=1, le=366),
+    top: int = Query(10, ge=1, le=100),
+    authorization: str = Header(None),
+):
+    """Granted/denied counts (totals, per hour, per day, per employee) from the rollup table."""
     verify_admin_header(authorization)
     db = SessionLocal()
     try:
-        result = db.execute(text("SELECT * FROM good_entries")).fetchall()
-        entries = [
-            {
-                "id": row[0],
-                "emp_id": row[1],
-                "emp_name": row[2],
-                "created_at": row[3]
-            } for row in result
-        ]
-        return {"good_entries": entries}
+        return get_access_stats(db, hours=hours, days=days, top_employees=top)
     finally:
         db.close()
-        
+
+# URL names of the exportable audit tables (same as the list endpoints).
+EXPORT_TABLES = {"good-entries": "good_entries", "failed-attempts": "unauthorized_access"}
+
+@router.get('/api/export/{table}')
+async def export_audit_table(
+    table: str,
+    format: str = "csv",
+    gzip: bool = False,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    employee: str | None = None,
+    authorization: str = Header(None),
+):
+    """Stream a whole audit table (optionally filtered) as CSV or NDJSON, in constant memory."""
+    verify_admin_header(authorization)
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown export: {table}")
+    table_name = EXPORT_TABLES[table]
+    try:
+        chunks = iter_export(
+            engine, table_name, format,
+            compress=gzip, date_from=date_from, date_to=date_to, employee=employee,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = export_filename(table_name, format, gzip)
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 @router.get('/access-denials')
 async def get_access_denials(authorization: str = Header(None)):
     return FileResponse('app/templates/denials.html')
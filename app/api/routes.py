@@ -3,7 +3,10 @@ from fastapi import APIRouter
 from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi import APIRouter, Response
 from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
-from app.services.video import camera_instance, generate_frames, CameraState
+from app.services.video import camera_instance, default_door, door_registry, agenerate_frames, agenerate_state_events, CameraState
+from app.services.qr_index import qr_index
+from app.services.audit import audit_writer
+from app.services.face_pool import face_process_pool
 from fastapi import HTTPException
 
 router = APIRouter()
@@ -25,21 +28,83 @@ async def read_root():
 async def read_login():
     return FileResponse('app/templates/login.html')
 
-@router.get('/qr')
-async def read_qr():
-    if camera_instance:
-        camera_instance.start_qr_scanning()
+def _door(door_id: str):
+    door = door_registry.get(door_id)
+    if door is None:
+        raise HTTPException(status_code=404, detail=f"Unknown door: {door_id}")
+    return door
+
+# Widoki kiosku i API są wspólne dla starych ścieżek (pierwsze drzwi) i /doors/{door_id}/...
+# Szablony używają względnych URL-i, więc ta sama strona działa pod oboma prefiksami.
+
+def _qr_page(camera):
+    if camera:
+        camera.start_qr_scanning()
     return FileResponse('app/templates/qr.html')
 
-@router.get('/facerec')
-async def read_facerec():
-    if not camera_instance or not camera_instance.target_employee:
+def _facerec_page(camera):
+    if not camera or not camera.target_employee:
         print("⚠️ Brak target_employee, przekierowanie do QR")
-        return RedirectResponse(url='/qr')
+        return RedirectResponse(url='qr')
     
-    print(f"✅ Face recognition page for: {camera_instance.target_employee}")
+    print(f"✅ Face recognition page for: {camera.target_employee}")
     return FileResponse('app/templates/facerec.html')
 
+def _qr_status(camera):
+    if not camera:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Camera not initialized"}
+        )
+    status = camera.get_qr_status()
+    if status["verified"]:
+        print(f"✅ QR Verified: {status['employee']}")
+        return JSONResponse(status_code=200, content=status)
+    return JSONResponse(status_code=200, content={"verified": False})
+
+def _face_status(camera):
+    if not camera:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Camera not initialized"}
+        )
+    status = camera.get_face_status()
+    if status["verified"]:
+        print(f"✅ Face Verified: {status['employee']}")
+        return JSONResponse(status_code=200, content=status)
+    if status["blocked"]:
+        return JSONResponse(status_code=403, content={"error": "Access Blocked", "blocked": True})
+    
+    return JSONResponse(status_code=200, content={"verified": False})
+
+def _events(door):
+    if door is None:
+        raise HTTPException(status_code=503, detail="Camera not available")
+
+    return StreamingResponse(
+        agenerate_state_events(door),
+        media_type='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _video_feed(door):
+    if door is None:
+        raise HTTPException(status_code=503, detail="Camera not available")
+    
+    return StreamingResponse(
+        agenerate_frames(door),
+        media_type='multipart/x-mixed-replace; boundary=frame'
+    )
+
+
+@router.get('/qr')
+async def read_qr():
+    return _qr_page(camera_instance)
+
+@router.get('/facerec')
+async def read_facerec():
+    return _facerec_page(camera_instance)
+
 
 @router.get('/accessgranted')
 async def read_accessgranted():
@@ -52,16 +117,7 @@ async def read_accessdenied():
 
 @router.get('/api/qr-status')
 async def qr_verification_status():
-    if not camera_instance:
-        return JSONResponse(
-            status_code=503,
-            content={"error": "Camera not initialized"}
-        )
-    status = camera_instance.get_qr_status()
-    if status["verified"]:
-        print(f"✅ QR Verified: {status['employee']}")
-        return JSONResponse(status_code=200, content=status)
-    return JSONResponse(status_code=200, content={"verified": False})
+    return _qr_status(camera_instance)
 
 
 @router.post('/api/qr-reset')
@@ -72,19 +128,7 @@ async def qr_reset():
 
 @router.get('/api/face-status')
 async def face_verification_status():
-    if not camera_instance:
-        return JSONResponse(
-            status_code=503,
-            content={"error": "Camera not initialized"}
-        )
-    status = camera_instance.get_face_status()
-    if status["verified"]:
-        print(f"✅ Face Verified: {status['employee']}")
-        return JSONResponse(status_code=200, content=status)
-    if status["blocked"]:
-        return JSONResponse(status_code=403, content={"error": "Access Blocked", "blocked": True})
-    
-    return JSONResponse(status_code=200, content={"verified": False})
+    return _face_status(camera_instance)
 
 
 @router.post('/api/face-reset')
@@ -105,12 +149,96 @@ async def stop_scan():
         camera_instance.reset_to_idle()
     return {"success": True, "message": "Stopped scanning"}
 
+@router.get('/api/camera-stats')
+async def camera_stats():
+    if not default_door:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Camera not initialized"}
+        )
+    return {
+        **default_door.stats(),
+        "doors": door_registry.stats(),
+        "qr_index": qr_index.stats(),
+        "audit": audit_writer.stats(),
+        "face_process_pool": face_process_pool.stats() if face_process_pool else None,
+    }
+
+@router.get('/api/events')
+async def state_events():
+    """Server-Sent Events: current camera state on connect, then every transition."""
+    return _events(default_door)
+
 @router.get('/video_feed')
 async def video_feed():
-    if camera_instance is None:
-        raise HTTPException(status_code=503, detail="Camera not available")
-    
-    return StreamingResponse(
-        generate_frames(),
-        media_type='multipart/x-mixed-replace; boundary=frame'
-    )
\ No newline at end of file
+    return _video_feed(default_door)
+
+
+# --- Drzwi (ACS_DOORS): każde z własną kamerą i maszyną stanów ---
+
+@router.get('/api/doors')
+async def list_doors():
+    return {
+        "doors": [
+            {"id": door.door_id, "state": door.camera.state.value, "target": door.camera.target_employee}
+            for door in door_registry
+        ]
+    }
+
+@router.get('/doors/{door_id}/qr')
+async def read_door_qr(door_id: str):
+    return _qr_page(_door(door_id).camera)
+
+@router.get('/doors/{door_id}/facerec')
+async def read_door_facerec(door_id: str):
+    return _facerec_page(_door(door_id).camera)
+
+@router.get('/doors/{door_id}/accessgranted')
+async def read_door_accessgranted(door_id: str):
+    _door(door_id)
+    return FileResponse('app/templates/accessgranted.html')
+
+@router.get('/doors/{door_id}/accessdenied')
+async def read_door_accessdenied(door_id: str):
+    _door(door_id)
+    return FileResponse('app/templates/accessdenied.html')
+
+@router.get('/doors/{door_id}/api/qr-status')
+async def door_qr_status(door_id: str):
+    return _qr_status(_door(door_id).camera)
+
+@router.get('/doors/{door_id}/api/face-status')
+async def door_face_status(door_id: str):
+    return _face_status(_door(door_id).camera)
+
+@router.post('/doors/{door_id}/api/qr-reset')
+async def door_qr_reset(door_id: str):
+    _door(door_id).camera.start_qr_scanning()
+    return {"success": True, "message": "QR status reset"}
+
+@router.post('/doors/{door_id}/api/face-reset')
+async def door_face_reset(door_id: str):
+    _door(door_id).camera.start_qr_scanning()
+    return {"success": True, "message": "Reset to QR scanning mode"}
+
+@router.post('/doors/{door_id}/api/start-scan')
+async def door_start_scan(door_id: str):
+    _door(door_id).camera.start_qr_scanning()
+    return {"success": True, "message": "Started QR scanning"}
+
+@router.post('/doors/{door_id}/api/stop-scan')
+async def door_stop_scan(door_id: str):
+    _door(door_id).camera.reset_to_idle()
+    return {"success": True, "message": "Stopped scanning"}
+
+@router.get('/doors/{door_id}/api/camera-stats')
+async def door_camera_stats(door_id: str):
+    return _door(door_id).stats()
+
+@router.get('/doors/{door_id}/api/events')
+async def door_state_events(door_id: str):
+    return _events(_door(door_id))
+
+@router.get('/doors/{door_id}/video_feed')
+async def door_video_feed(door_id: str):
+    return _video_feed(_door(door_id))
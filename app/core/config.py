@@ -0,0 +1,118 @@
+"""Runtime settings.
+
+Every value can be overridden with an environment variable of the same name
+prefixed with ``ACS_`` (e.g. ``ACS_FACE_MODEL_DIR=/var/lib/acs/face_model``).
+"""
+
+import os
+
+
+def _env_str(name: str, default: str) -> str:
+    return os.environ.get(f"ACS_{name}", default)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(f"ACS_{name}", default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(f"ACS_{name}", default))
+    except ValueError:
+        return default
+
+
+# SQLAlchemy URL of the main database.
+DATABASE_URL = _env_str("DATABASE_URL", "sqlite:///./access_control.db")
+
+# SQLite tuning applied to every new connection (see app.core.database.create_db_engine).
+# WAL lets the admin dashboards read while the camera pipeline writes audit rows.
+SQLITE_JOURNAL_MODE = _env_str("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = _env_str("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_MMAP_SIZE = _env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+SQLITE_CACHE_SIZE_KB = _env_int("SQLITE_CACHE_SIZE_KB", 64 * 1024)
+
+# Connection pool: camera/analysis/audit threads + the API threadpool share it.
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 8)
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 16)
+
+# Directory holding the persisted LBPH model snapshot (see app.services.face_model).
+FACE_MODEL_DIR = _env_str("FACE_MODEL_DIR", "data/face_model")
+
+# MJPEG stream: max frames per second processed/encoded for viewers (0 = camera rate)
+# and how many ready frames a slow viewer may lag behind before old ones are dropped.
+STREAM_TARGET_FPS = _env_float("STREAM_TARGET_FPS", 30.0)
+STREAM_QUEUE_SIZE = _env_int("STREAM_QUEUE_SIZE", 2)
+
+# Frame analysis (QR decode / face recognition) cadence: every N stream frames,
+# or at most ANALYSIS_MAX_HZ times per second when that is > 0.
+ANALYSIS_EVERY_N_FRAMES = _env_int("ANALYSIS_EVERY_N_FRAMES", 4)
+ANALYSIS_MAX_HZ = _env_float("ANALYSIS_MAX_HZ", 0.0)
+ANALYSIS_WORKERS = _env_int("ANALYSIS_WORKERS", 1)
+
+# Failed face matches (analysed frames) before a verification session is blocked.
+# The default keeps the original budget of 20 camera frames at the analysis cadence.
+FACE_MAX_FAILED_ATTEMPTS = _env_int("FACE_MAX_FAILED_ATTEMPTS", max(1, 20 // max(1, ANALYSIS_EVERY_N_FRAMES)))
+
+# Audit log writer (good_entries / unauthorized_access): bounded queue flushed in
+# batches. Backpressure when full: "block" (up to 100 ms), "drop_new" or "drop_oldest".
+AUDIT_QUEUE_SIZE = _env_int("AUDIT_QUEUE_SIZE", 10_000)
+AUDIT_BATCH_SIZE = _env_int("AUDIT_BATCH_SIZE", 200)
+AUDIT_FLUSH_INTERVAL = _env_float("AUDIT_FLUSH_INTERVAL", 0.5)
+AUDIT_BACKPRESSURE = _env_str("AUDIT_BACKPRESSURE", "block")
+
+# Denial snapshot thumbnails (longest side in px), stored next to the full photo.
+AUDIT_THUMBNAIL_SIZE = _env_int("AUDIT_THUMBNAIL_SIZE", 96)
+
+# Doors served by this host: "id=source" pairs, source = device index, file or stream URL
+# (e.g. "main=0,garage=1,lab=rtsp://10.0.0.5/stream"). Empty = one door "main" on device 0/1.
+DOORS = _env_str("DOORS", "")
+# OpenCV worker threads per process (0 = split the cores evenly between the doors).
+OPENCV_THREADS = _env_int("OPENCV_THREADS", 0)
+
+# Face detection + recognition in worker processes (0 = in the server process).
+# Frames are passed through shared-memory slots of FACE_PROCESS_SLOT_BYTES each.
+FACE_PROCESS_WORKERS = _env_int("FACE_PROCESS_WORKERS", 0)
+FACE_PROCESS_SLOT_BYTES = _env_int("FACE_PROCESS_SLOT_BYTES", 1920 * 1080 * 3)
+# Seconds an analysis thread waits for a free slot before giving up on the pool for that frame.
+FACE_PROCESS_SLOT_TIMEOUT = _env_float("FACE_PROCESS_SLOT_TIMEOUT", 5.0)
+
+# Face detection during verification: search only around the last face (expanded by
+# FACE_TRACK_MARGIN x its size), with a full-frame scan every FACE_TRACK_FULL_EVERY
+# analyses. FACE_DETECT_DOWNSCALE < 1 runs the Haar cascade on a smaller image.
+FACE_TRACK_FULL_EVERY = _env_int("FACE_TRACK_FULL_EVERY", 10)
+FACE_TRACK_MARGIN = _env_float("FACE_TRACK_MARGIN", 0.5)
+FACE_DETECT_DOWNSCALE = _env_float("FACE_DETECT_DOWNSCALE", 1.0)
+
+# Face detector backend: "haar" (default), "lbp" (cascade XML) or "dnn" (.onnx YuNet or
+# .caffemodel SSD + .prototxt in FACE_DETECTOR_CONFIG). FACE_DETECTOR_MODEL overrides the
+# model file; FACE_DETECTOR_CONFIDENCE is the DNN score threshold.
+FACE_DETECTOR_BACKEND = _env_str("FACE_DETECTOR", "haar")
+FACE_DETECTOR_MODEL = _env_str("FACE_DETECTOR_MODEL", "")
+FACE_DETECTOR_CONFIG = _env_str("FACE_DETECTOR_CONFIG", "")
+FACE_DETECTOR_CONFIDENCE = _env_float("FACE_DETECTOR_CONFIDENCE", 0.6)
+
+# Face matcher: "opencv" (cv2.face LBPH from opencv-contrib) or "numpy" (app.services.lbph_gallery,
+# vectorised gallery). Same features and distances, so FACE_THRESHOLD holds. Snapshots record
+# the matcher: switching it makes the next start rebuild the model instead of loading one.
+FACE_MATCHER = _env_str("FACE_MATCHER", "opencv")
+
+# Shared face gallery for several server processes (uvicorn --workers N), numpy matcher only:
+# rebuilds publish the gallery to one file in FACE_GALLERY_DIR that every process maps
+# read-only (see app.services.face_gallery_file). Processes check for a newer file every
+# FACE_GALLERY_POLL_SECONDS. Empty = every process keeps its own in-memory gallery.
+FACE_GALLERY_DIR = _env_str("FACE_GALLERY_DIR", "")
+FACE_GALLERY_POLL_SECONDS = _env_float("FACE_GALLERY_POLL_SECONDS", 2.0)
+
+# Face verification after a QR scan: "1:1" scores the face against the claimed employee's
+# templates only (with FACE_VERIFY_THRESHOLD), "1:N" identifies against the whole gallery.
+# The threshold is chosen for the false accept rate of a whole session, 1 - (1 - FAR)^attempts
+# with attempts = FACE_MAX_FAILED_ATTEMPTS, not of one comparison: 76 keeps it under 1% at
+# 5 attempts (per comparison FAR 0.17%, session FRR about 7% on the benchmark's faces).
+# Recalibrate with tests/benchmark_face_verification.py when changing either value.
+FACE_VERIFICATION_MODE = _env_str("FACE_VERIFICATION_MODE", "1:1")
+FACE_VERIFY_THRESHOLD = _env_float("FACE_VERIFY_THRESHOLD", 76.0)
@@ -1,12 +1,71 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool
 from typing import Generator
-DATABASE_URL = "sqlite:///./access_control.db"
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+from app.core.config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
 )
 
+
+def create_db_engine(
+    url: str = DATABASE_URL,
+    *,
+    journal_mode: str = SQLITE_JOURNAL_MODE,
+    synchronous: str = SQLITE_SYNCHRONOUS,
+    busy_timeout_ms: int = SQLITE_BUSY_TIMEOUT_MS,
+    mmap_size: int = SQLITE_MMAP_SIZE,
+    cache_size_kb: int = SQLITE_CACHE_SIZE_KB,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+) -> Engine:
+    """Create an engine; for file-based SQLite every connection gets the tuning pragmas.
+
+    The camera pipeline writes from background threads while the API reads from
+    the threadpool, so file databases use a QueuePool sized for both instead of
+    opening a new connection (and re-running the pragmas) per session.
+    """
+    if not url.startswith("sqlite"):
+        return create_engine(url, pool_size=pool_size, max_overflow=max_overflow)
+
+    in_memory = url in ("sqlite://", "sqlite:///:memory:")
+    kwargs = {}
+    if not in_memory:
+        kwargs = {"poolclass": QueuePool, "pool_size": pool_size, "max_overflow": max_overflow}
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": busy_timeout_ms / 1000.0},
+        **kwargs,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if not in_memory:
+                cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+                cursor.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+            cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            # Negative cache_size = size in KiB rather than pages.
+            cursor.execute(f"PRAGMA cache_size={-abs(int(cache_size_kb))}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+engine = create_db_engine()
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -0,0 +1,156 @@
+"""Lightweight versioned schema migrations for the SQLite database.
+
+`metadata.create_all()` only creates missing tables, so columns and indexes
+added to existing tables are applied here. Each migration runs once, in its own
+transaction, and is recorded in `schema_migrations`. Migrations are written to
+be idempotent so they are also safe on a fresh database that `create_all()`
+has just created with the current schema.
+
+Run from the FastAPI `lifespan` hook and from `create_db.py`.
+"""
+
+from typing import Callable
+
+from sqlalchemy.engine import Connection, Engine
+
+
+def _columns(conn: Connection, table: str) -> list[str]:
+    return [row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")]
+
+
+def _add_employees_qr_token(conn: Connection) -> None:
+    if "qr_token" not in _columns(conn, "employees"):
+        conn.exec_driver_sql("ALTER TABLE employees ADD COLUMN qr_token VARCHAR(64)")
+    conn.exec_driver_sql("CREATE UNIQUE INDEX IF NOT EXISTS ux_employees_qr_token ON employees (qr_token)")
+
+
+def _add_lookup_indexes(conn: Connection) -> None:
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_employees_emp_name ON employees (emp_name)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_good_entries_created_at ON good_entries (created_at)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_good_entries_emp_id ON good_entries (emp_id)")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_unauthorized_access_created_at ON unauthorized_access (created_at)"
+    )
+
+
+def _add_unauthorized_access_thumbnail(conn: Connection) -> None:
+    # Existing rows keep NULL; the photo endpoint generates their thumbnails on first request.
+    if "thumbnail" not in _columns(conn, "unauthorized_access"):
+        conn.exec_driver_sql("ALTER TABLE unauthorized_access ADD COLUMN thumbnail BLOB")
+
+
+# (period, bucket expression, per-employee) levels counted in access_rollups;
+# must match app.services.access_stats.rollup_keys.
+_ROLLUP_LEVELS = [
+    ("hour", "substr(created_at, 1, 13) || ':00:00'", False),
+    ("day", "substr(created_at, 1, 10)", False),
+    ("all", "''", False),
+    ("day", "substr(created_at, 1, 10)", True),
+    ("all", "''", True),
+]
+
+
+def _add_access_rollups(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS access_rollups ("
+        " period VARCHAR(8) NOT NULL,"
+        " bucket VARCHAR(19) NOT NULL,"
+        " outcome VARCHAR(8) NOT NULL,"
+        " emp_name VARCHAR(512) NOT NULL,"
+        " count INTEGER NOT NULL,"
+        " PRIMARY KEY (period, bucket, outcome, emp_name))"
+    )
+    # Count the events logged so far; from now on the audit writer keeps the table current.
+    conn.exec_driver_sql("DELETE FROM access_rollups")
+    sources = [
+        ("good_entries", "granted", "emp_name"),
+        ("unauthorized_access", "denied", "COALESCE(qr_text, 'Not Found')"),
+    ]
+    for table, outcome, name_expr in sources:
+        for period, bucket_expr, per_employee in _ROLLUP_LEVELS:
+            emp_expr = name_expr if per_employee else "''"
+            where = "created_at IS NOT NULL"
+            if per_employee:
+                # 'Not Found' (access_stats.UNKNOWN_QR) is not an employee: it only counts in the totals.
+                where += f" AND {emp_expr} NOT IN ('', 'Not Found')"
+            conn.exec_driver_sql(
+                "INSERT INTO access_rollups (period, bucket, outcome, emp_name, count)"
+                f" SELECT '{period}', {bucket_expr}, '{outcome}', {emp_expr}, COUNT(*)"
+                f" FROM {table} WHERE {where}"
+                f" GROUP BY {bucket_expr}, {emp_expr}"
+            )
+
+
+def _drop_unknown_qr_rollups(conn: Connection) -> None:
+    # Migration 4 and the audit writer used to count the 'Not Found' placeholder as an employee.
+    conn.exec_driver_sql("DELETE FROM access_rollups WHERE emp_name = 'Not Found'")
+
+
+def _add_face_templates(conn: Connection) -> None:
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS face_templates ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+        " emp_id INTEGER NOT NULL,"
+        " face BLOB NOT NULL,"
+        " features BLOB,"
+        " feature_kind VARCHAR(32),"
+        " quality FLOAT,"
+        " created_at DATETIME DEFAULT (CURRENT_TIMESTAMP))"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_face_templates_emp_id ON face_templates (emp_id)")
+    # Every enrolled photo becomes the employee's first template; features and quality
+    # are filled in by the model loader on its next run.
+    conn.exec_driver_sql(
+        "INSERT INTO face_templates (emp_id, face, created_at)"
+        " SELECT emp_id, emp_photo, COALESCE(created_at, CURRENT_TIMESTAMP) FROM employees e"
+        " WHERE emp_photo IS NOT NULL"
+        " AND NOT EXISTS (SELECT 1 FROM face_templates t WHERE t.emp_id = e.emp_id)"
+    )
+
+
+def _add_face_templates_raw(conn: Connection) -> None:
+    # Existing templates keep NULL; the model loader decodes their JPEG once and fills it in.
+    if "face_raw" not in _columns(conn, "face_templates"):
+        conn.exec_driver_sql("ALTER TABLE face_templates ADD COLUMN face_raw BLOB")
+
+
+# (version, description, upgrade). Append only; never renumber.
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "employees.qr_token with unique index", _add_employees_qr_token),
+    (2, "indexes on emp_name, created_at and good_entries.emp_id", _add_lookup_indexes),
+    (3, "unauthorized_access.thumbnail", _add_unauthorized_access_thumbnail),
+    (4, "access_rollups counters, backfilled from the audit tables", _add_access_rollups),
+    (5, "face_templates, backfilled from employees.emp_photo", _add_face_templates),
+    (6, "face_templates.face_raw", _add_face_templates_raw),
+    (7, "access_rollups without the 'Not Found' placeholder per employee", _drop_unknown_qr_rollups),
+]
+
+
+def current_version(conn: Connection) -> int:
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY,"
+        " description VARCHAR(200) NOT NULL,"
+        " applied_at DATETIME DEFAULT CURRENT_TIMESTAMP)"
+    )
+    return conn.exec_driver_sql("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").scalar()
+
+
+def run_migrations(engine: Engine) -> int:
+    """Apply pending migrations; returns the resulting schema version."""
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    for migration_version, description, upgrade in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        with engine.begin() as conn:
+            upgrade(conn)
+            conn.exec_driver_sql(
+                "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                (migration_version, description),
+            )
+        version = migration_version
+        print(f"Applied migration {migration_version}: {description}")
+
+    return version
@@ -4,11 +4,17 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from app.core.database import engine, Base
 from app.api.admin import router as admin_router
+from app.services.face_model import face_model_manager
+from app.services.video import door_registry
+from app.services.face_pool import face_process_pool
+from app.services.qr_index import backfill_qr_tokens, qr_index
+from app.services.audit import audit_writer
 
 
 # Import models so they are registered on the metadata
 import app.models.qr_image  # noqa: F401
 from app.models.qr_image import metadata as core_metadata
+from app.core.migrations import run_migrations
 
 
 @asynccontextmanager
@@ -18,8 +24,20 @@ async def lifespan(app: FastAPI) -> None:
 	# app.models.qr_image.metadata (employees, etc.). We create both.
 	Base.metadata.create_all(bind=engine)
 	core_metadata.create_all(bind=engine)
+	run_migrations(engine)
+	backfill_qr_tokens()
 	print("Database tables created (if not existing) in `access_control.db`")
+	# Load the persisted face model (or start a background rebuild if it is stale).
+	face_model_manager.load_snapshot()
+	qr_index.load()
+	audit_writer.start()
 	yield
+	door_registry.release_all()
+	if face_process_pool:
+		face_process_pool.shutdown()
+	# Flush queued good_entries / unauthorized_access rows before exiting.
+	audit_writer.stop()
+	face_model_manager.save_snapshot()
 
 app = FastAPI(title="SE AGH Access Control System", lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -1,4 +1,4 @@
-from sqlalchemy import Table, MetaData, Column, Integer, String, LargeBinary, DateTime
+from sqlalchemy import Table, MetaData, Column, Integer, String, LargeBinary, DateTime, Float, Index, PrimaryKeyConstraint
 from sqlalchemy import func
 
 # Define the employees table using SQLAlchemy Core (no ORM class)
@@ -12,11 +12,17 @@ employees = Table(
     Column("emp_qr_code", LargeBinary, nullable=True),
     Column("emp_photo", LargeBinary, nullable=True),
     Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    # Random part of the QR payload ("<name>|<qr_token>"), used for badge lookup.
+    Column("qr_token", String(64), nullable=True),
 )
+# Index names must match app.core.migrations (existing databases get them from there).
+Index("ux_employees_qr_token", employees.c.qr_token, unique=True)
+Index("ix_employees_emp_name", employees.c.emp_name)
 
 # Store unauthorized access attempts for audit/debug.
 # - qr_text: the decoded QR payload used
 # - photo: a JPEG snapshot from the camera at the time the attempts were exhausted
+# - thumbnail: small JPEG of the same snapshot for list views
 # - created_at: server timestamp
 unauthorized_access = Table(
     "unauthorized_access",
@@ -25,7 +31,9 @@ unauthorized_access = Table(
     Column("qr_text", String(512), nullable=True),
     Column("photo", LargeBinary, nullable=True),
     Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("thumbnail", LargeBinary, nullable=True),
 )
+Index("ix_unauthorized_access_created_at", unauthorized_access.c.created_at)
 
 # Store authorized (successful) access events.
 # - emp_id / emp_name: who entered
@@ -38,10 +46,59 @@ good_entries = Table(
     Column("emp_name", String(100), nullable=False),
     Column("created_at", DateTime(timezone=True), server_default=func.now()),
 )
+Index("ix_good_entries_created_at", good_entries.c.created_at)
+Index("ix_good_entries_emp_id", good_entries.c.emp_id)
+
+# Precomputed counters over good_entries / unauthorized_access (see app.services.access_stats).
+# - period: "hour", "day" or "all"; bucket: start of the hour/day ("" for "all")
+# - outcome: "granted" or "denied"
+# - emp_name: employee (denials: resolved QR name or "Not Found"); "" = all employees
+access_rollups = Table(
+    "access_rollups",
+    metadata,
+    Column("period", String(8), nullable=False),
+    Column("bucket", String(19), nullable=False),
+    Column("outcome", String(8), nullable=False),
+    Column("emp_name", String(512), nullable=False),
+    Column("count", Integer, nullable=False, default=0),
+    PrimaryKeyConstraint("period", "bucket", "outcome", "emp_name"),
+)
+
+# Face enrollment captures; an employee can have several (see app.services.face_templates).
+# - face: normalised 200x200 grayscale face, JPEG
+# - face_raw: the same face as raw 200x200 uint8 pixels, loaded without decoding;
+#   NULL until the model loader fills it in
+# - features: precomputed LBPH histogram (float32 bytes) in the layout named by feature_kind;
+#   NULL until the model loader computes it
+# - quality: 0..1 sharpness/contrast score of the capture
+face_templates = Table(
+    "face_templates",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("emp_id", Integer, nullable=False),
+    Column("face", LargeBinary, nullable=False),
+    Column("face_raw", LargeBinary, nullable=True),
+    Column("features", LargeBinary, nullable=True),
+    Column("feature_kind", String(32), nullable=True),
+    Column("quality", Float, nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+Index("ix_face_templates_emp_id", face_templates.c.emp_id)
 
 def create_tables(engine):
-    """Create the employees table in the target database."""
+    """Create the tables in the target database and bring older schemas up to date."""
+    from app.core.migrations import run_migrations
+
     metadata.create_all(engine)
+    run_migrations(engine)
 
 
-__all__ = ["employees", "unauthorized_access", "good_entries", "metadata", "create_tables"]
+__all__ = [
+    "employees",
+    "unauthorized_access",
+    "good_entries",
+    "access_rollups",
+    "face_templates",
+    "metadata",
+    "create_tables",
+]
@@ -0,0 +1,131 @@
+"""app.services.access_stats
+
+Access statistics served from the `access_rollups` table instead of scanning
+the audit tables.
+
+The audit writer calls `apply_rollups()` in the same transaction that inserts
+a batch of events. Each event increments one counter per rollup level: hour,
+day, day per employee, all time, and all time per employee. Every dashboard
+number is then a primary-key lookup or a short range scan over buckets.
+Existing rows are counted once by migration 4.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+GRANTED = "granted"
+DENIED = "denied"
+
+# Stored by the audit writer for denials whose QR code matched no employee; not an employee name.
+UNKNOWN_QR = "Not Found"
+
+HOUR_FORMAT = "%Y-%m-%d %H:00:00"
+DAY_FORMAT = "%Y-%m-%d"
+
+
+def rollup_keys(created_at: datetime, outcome: str, emp_name: str | None) -> list[tuple]:
+    """(period, bucket, outcome, emp_name) counters touched by one event.
+
+    Events without a known employee only count towards the totals.
+    """
+    hour = created_at.strftime(HOUR_FORMAT)
+    day = created_at.strftime(DAY_FORMAT)
+    keys = [
+        ("hour", hour, outcome, ""),
+        ("day", day, outcome, ""),
+        ("all", "", outcome, ""),
+    ]
+    if emp_name and emp_name != UNKNOWN_QR:
+        keys.append(("day", day, outcome, emp_name))
+        keys.append(("all", "", outcome, emp_name))
+    return keys
+
+
+def rollup_increments(good_rows: list[dict], denied_rows: list[dict]) -> Counter:
+    increments: Counter = Counter()
+    for row in good_rows:
+        increments.update(rollup_keys(row["created_at"], GRANTED, row["emp_name"]))
+    for row in denied_rows:
+        increments.update(rollup_keys(row["created_at"], DENIED, row["qr_text"]))
+    return increments
+
+
+def apply_rollups(conn, increments: Counter) -> None:
+    if not increments:
+        return
+    conn.execute(
+        text(
+            "INSERT INTO access_rollups (period, bucket, outcome, emp_name, count)"
+            " VALUES (:period, :bucket, :outcome, :emp_name, :count)"
+            " ON CONFLICT (period, bucket, outcome, emp_name)"
+            " DO UPDATE SET count = count + excluded.count"
+        ),
+        [
+            {"period": period, "bucket": bucket, "outcome": outcome, "emp_name": emp_name, "count": count}
+            for (period, bucket, outcome, emp_name), count in increments.items()
+        ],
+    )
+
+
+def _series(rows, buckets: list[str]) -> list[dict]:
+    counts = {(bucket, outcome): count for bucket, outcome, count in rows}
+    return [
+        {"bucket": bucket, GRANTED: counts.get((bucket, GRANTED), 0), DENIED: counts.get((bucket, DENIED), 0)}
+        for bucket in buckets
+    ]
+
+
+def get_access_stats(db, hours: int = 24, days: int = 7, top_employees: int = 10, now: datetime | None = None) -> dict:
+    """Totals, per-hour and per-day series (zero-filled, oldest first) and the busiest employees."""
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    hour_buckets = [(now - timedelta(hours=h)).strftime(HOUR_FORMAT) for h in range(hours - 1, -1, -1)]
+    day_buckets = [(now - timedelta(days=d)).strftime(DAY_FORMAT) for d in range(days - 1, -1, -1)]
+
+    totals = dict(
+        db.execute(
+            text("SELECT outcome, count FROM access_rollups WHERE period = 'all' AND bucket = '' AND emp_name = ''")
+        ).fetchall()
+    )
+    hourly = db.execute(
+        text(
+            "SELECT bucket, outcome, count FROM access_rollups"
+            " WHERE period = 'hour' AND bucket >= :since AND emp_name = ''"
+        ),
+        {"since": hour_buckets[0]},
+    ).fetchall()
+    daily = db.execute(
+        text(
+            "SELECT bucket, outcome, count FROM access_rollups"
+            " WHERE period = 'day' AND bucket >= :since AND emp_name = ''"
+        ),
+        {"since": day_buckets[0]},
+    ).fetchall()
+    employees = {}
+    for outcome in (GRANTED, DENIED):
+        employees[outcome] = [
+            {"emp_name": name, "count": count}
+            for name, count in db.execute(
+                text(
+                    "SELECT emp_name, count FROM access_rollups"
+                    " WHERE period = 'all' AND bucket = '' AND outcome = :outcome AND emp_name != ''"
+                    " ORDER BY count DESC LIMIT :limit"
+                ),
+                {"outcome": outcome, "limit": top_employees},
+            ).fetchall()
+        ]
+
+    hourly_series = _series(hourly, hour_buckets)
+    return {
+        "totals": {GRANTED: totals.get(GRANTED, 0), DENIED: totals.get(DENIED, 0)},
+        "last_hours": {
+            GRANTED: sum(h[GRANTED] for h in hourly_series),
+            DENIED: sum(h[DENIED] for h in hourly_series),
+        },
+        "hourly": hourly_series,
+        "daily": _series(daily, day_buckets),
+        "employees": employees,
+    }
@@ -0,0 +1,138 @@
+"""app.services.analysis
+
+Frame analysis decoupled from the display path.
+
+`FrameAnalyzer` takes the shared (read-only) camera frames the stream is
+encoding and, at a configurable cadence (every N frames or at most X Hz),
+runs the expensive QR decode / face detection + recognition on a worker pool.
+Results are posted back through a callback; the stream keeps running at camera
+rate and simply overlays the most recent `AnalysisResult`.
+
+If all workers are busy when a frame is due, that frame is skipped rather than
+queued, so a slow recognizer lowers the analysis rate instead of building lag.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import numpy as np
+
+
+@dataclass
+class FaceDetection:
+    box: tuple[int, int, int, int]
+    name: str
+    confidence: float
+
+
+@dataclass
+class QrDetection:
+    text: str
+    employee: str
+    polygon: list[tuple[int, int]]
+    emp_id: int | None = None
+
+
+@dataclass
+class AnalysisResult:
+    kind: str                   # "qr" | "face"
+    seq: int                    # capture sequence number of the analysed frame
+    session_id: int             # VideoCamera session the frame was submitted in
+    frame: np.ndarray           # analysed frame (read-only), e.g. for audit snapshots
+    timestamp: float = field(default_factory=time.time)
+    qr_codes: list[QrDetection] = field(default_factory=list)
+    faces: list[FaceDetection] = field(default_factory=list)
+    detected_name: str = "Unknown"
+    detected_emp_id: int | None = None  # employee the face was matched to (None: unknown or ambiguous)
+    no_templates: bool = False  # 1:1 verification: the claimed employee has no face templates
+    confidence: float = 999.0
+    face_count: int = 0
+    message: str | None = None  # status text to overlay (e.g. "No face data in DB")
+    threshold: float = 0.0      # face distance threshold the result was decided with
+
+
+class FrameAnalyzer:
+    def __init__(
+        self,
+        analyze: Callable[[np.ndarray, int, Any], AnalysisResult | None],
+        on_result: Callable[[AnalysisResult], None],
+        every_n_frames: int = 4,
+        max_hz: float = 0.0,
+        max_workers: int = 1,
+    ):
+        self._analyze = analyze
+        self._on_result = on_result
+        self.every_n_frames = max(1, every_n_frames)
+        # max_hz > 0 switches from "every N frames" to a time-based cadence.
+        self.max_hz = max_hz
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="frame-analysis")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._frame_counter = 0
+        self._last_submit = 0.0
+        self._closed = False
+
+        # Metrics
+        self.submitted = 0
+        self.skipped_busy = 0
+        self.completed = 0
+        self.last_latency = 0.0
+
+    def _due(self, now: float) -> bool:
+        if self.max_hz > 0:
+            return now - self._last_submit >= 1.0 / self.max_hz
+        return self._frame_counter % self.every_n_frames == 0
+
+    def submit(self, frame: np.ndarray, seq: int, context: Any = None) -> bool:
+        """Offer a frame for analysis; returns True if it was scheduled."""
+        now = time.monotonic()
+        with self._lock:
+            if self._closed:
+                return False
+            self._frame_counter += 1
+            if not self._due(now):
+                return False
+            if self._in_flight >= self.max_workers:
+                self.skipped_busy += 1
+                return False
+            self._in_flight += 1
+            self._last_submit = now
+            self.submitted += 1
+        self._executor.submit(self._run, frame, seq, context, now)
+        return True
+
+    def _run(self, frame: np.ndarray, seq: int, context: Any, submitted_at: float) -> None:
+        try:
+            result = self._analyze(frame, seq, context)
+            if result is not None:
+                self._on_result(result)
+        except Exception as e:
+            print(f"Frame analysis error: {e}")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.completed += 1
+                self.last_latency = time.monotonic() - submitted_at
+
+    def shutdown(self) -> None:
+        """Stop scheduling frames; a job that is already running still finishes."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "every_n_frames": self.every_n_frames,
+                "max_hz": self.max_hz,
+                "submitted": self.submitted,
+                "skipped_busy": self.skipped_busy,
+                "completed": self.completed,
+                "last_latency_ms": round(self.last_latency * 1000.0, 2),
+            }
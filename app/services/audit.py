@@ -0,0 +1,277 @@
+"""app.services.audit
+
+Asynchronous, batched writer for the audit tables (`good_entries`,
+`unauthorized_access`).
+
+The camera pipeline only enqueues events; a background worker resolves names,
+JPEG-encodes denial snapshots (plus a small thumbnail for the admin lists) and
+inserts everything that accumulated in a single transaction, together with the
+`access_rollups` counters. The queue is bounded and the backpressure policy
+decides what happens when it is full, so a slow or failing disk can never
+freeze the door stream. Failed batches are retried with backoff; `stop()`
+(called from the FastAPI `lifespan`) flushes what is left.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+from sqlalchemy import insert
+
+from app.core.config import (
+    AUDIT_BACKPRESSURE,
+    AUDIT_BATCH_SIZE,
+    AUDIT_FLUSH_INTERVAL,
+    AUDIT_QUEUE_SIZE,
+    AUDIT_THUMBNAIL_SIZE,
+)
+from app.core.database import engine as default_engine
+from app.models.qr_image import good_entries, unauthorized_access
+from app.services.access_stats import UNKNOWN_QR, apply_rollups, rollup_increments
+from app.services.qr_index import qr_index
+
+
+def _utcnow() -> datetime:
+    # Naive UTC, same as SQLite CURRENT_TIMESTAMP used by the server_default.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def encode_thumbnail(frame_bgr: np.ndarray, max_size: int = AUDIT_THUMBNAIL_SIZE) -> bytes | None:
+    """Downscale so the longest side is `max_size` px and JPEG-encode."""
+    h, w = frame_bgr.shape[:2]
+    scale = max_size / max(h, w)
+    if scale < 1.0:
+        frame_bgr = cv2.resize(frame_bgr, (max(1, round(w * scale)), max(1, round(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', frame_bgr, [cv2.IMWRITE_JPEG_QUALITY, 70])
+    return buffer.tobytes() if ok else None
+
+
+@dataclass
+class GoodEntryEvent:
+    emp_name: str
+    emp_id: int | None = None
+    created_at: datetime = field(default_factory=_utcnow)
+
+
+@dataclass
+class UnauthorizedAccessEvent:
+    qr_text: str | None
+    frame_bgr: np.ndarray | None = None
+    created_at: datetime = field(default_factory=_utcnow)
+
+
+# Put on the queue by stop() to wake a worker waiting for the batch deadline.
+_WAKE = object()
+
+
+class AuditWriter:
+    POLICIES = ("block", "drop_new", "drop_oldest")
+
+    def __init__(
+        self,
+        engine=default_engine,
+        max_queue: int = 10_000,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        policy: str = "block",
+        block_timeout: float = 0.1,
+        max_retries: int = 5,
+    ):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown audit backpressure policy: {policy!r}")
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.max_retries = max_retries
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+        # Metrics
+        self.written = 0
+        self.dropped = 0
+        self.failed_batches = 0
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Write everything still queued, then stop the worker."""
+        with self._cond:
+            thread = self._thread
+            self._stopping = True
+            self._cond.notify_all()
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass  # worker is busy draining anyway
+        if thread is not None:
+            thread.join(timeout)
+        with self._cond:
+            self._thread = None
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Block until every enqueued event has been written (or dropped)."""
+        self.start()
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending == 0, timeout)
+
+    # --- Producers (camera / analysis threads) ---
+
+    def enqueue(self, event) -> bool:
+        self.start()
+        with self._cond:
+            self._pending += 1
+        try:
+            if self.policy == "block":
+                self._queue.put(event, timeout=self.block_timeout)
+            elif self.policy == "drop_oldest":
+                while True:
+                    try:
+                        self._queue.put_nowait(event)
+                        break
+                    except queue.Full:
+                        try:
+                            self._queue.get_nowait()
+                            self._done(1, dropped=True)
+                        except queue.Empty:
+                            pass
+            else:
+                self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self._done(1, dropped=True)
+            print(f"Audit queue full, event dropped ({type(event).__name__})")
+            return False
+
+    def log_good_entry(self, employee_name: str, emp_id: int | None = None) -> bool:
+        return self.enqueue(GoodEntryEvent(emp_name=employee_name, emp_id=emp_id))
+
+    def log_unauthorized_access(self, qr_text: str | None, frame_bgr: np.ndarray | None) -> bool:
+        return self.enqueue(UnauthorizedAccessEvent(qr_text=qr_text, frame_bgr=frame_bgr))
+
+    # --- Worker ---
+
+    def _done(self, count: int, dropped: bool = False) -> None:
+        with self._cond:
+            self._pending -= count
+            if dropped:
+                self.dropped += count
+            self._cond.notify_all()
+
+    def _next_batch(self) -> list:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if self._stopping:
+                timeout = 0
+            try:
+                event = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is not _WAKE:
+                batch.append(event)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._stopping:
+                    return
+                continue
+
+            attempt = 0
+            while True:
+                try:
+                    self._write_batch(batch)
+                    with self._cond:
+                        self.written += len(batch)
+                    self._done(len(batch))
+                    break
+                except Exception as e:
+                    attempt += 1
+                    with self._cond:
+                        self.failed_batches += 1
+                    print(f"Failed to write audit batch ({len(batch)} events, attempt {attempt}): {e}")
+                    if attempt >= self.max_retries:
+                        self._done(len(batch), dropped=True)
+                        break
+                    time.sleep(min(0.2 * 2 ** attempt, 5.0))
+
+    def _write_batch(self, batch: list) -> None:
+        good_rows = []
+        denied_rows = []
+        for event in batch:
+            if isinstance(event, GoodEntryEvent):
+                emp_id = event.emp_id
+                if emp_id is None:
+                    record = qr_index.employee_by_name(event.emp_name)
+                    emp_id = record["emp_id"] if record else None
+                good_rows.append({"emp_id": emp_id, "emp_name": event.emp_name, "created_at": event.created_at})
+            elif isinstance(event, UnauthorizedAccessEvent):
+                photo_bytes = None
+                thumbnail_bytes = None
+                if event.frame_bgr is not None:
+                    ok, buffer = cv2.imencode('.jpg', event.frame_bgr)
+                    photo_bytes = buffer.tobytes() if ok else None
+                    thumbnail_bytes = encode_thumbnail(event.frame_bgr)
+                record = qr_index.lookup(event.qr_text)
+                denied_rows.append({
+                    "qr_text": record["emp_name"] if record else UNKNOWN_QR,
+                    "photo": photo_bytes,
+                    "thumbnail": thumbnail_bytes,
+                    "created_at": event.created_at,
+                })
+
+        with self.engine.begin() as conn:
+            if good_rows:
+                conn.execute(insert(good_entries), good_rows)
+            if denied_rows:
+                conn.execute(insert(unauthorized_access), denied_rows)
+            # Same transaction, so the counters never disagree with the audit rows.
+            apply_rollups(conn, rollup_increments(good_rows, denied_rows))
+
+        for row in good_rows:
+            print(f"Good entry logged (employee={row['emp_name']!r})")
+        for row in denied_rows:
+            print(f"Unauthorized access logged (qr_text={row['qr_text']!r})")
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queued": self._queue.qsize(),
+                "pending": self._pending,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed_batches": self.failed_batches,
+                "policy": self.policy,
+            }
+
+
+audit_writer = AuditWriter(
+    max_queue=AUDIT_QUEUE_SIZE,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+    policy=AUDIT_BACKPRESSURE,
+)
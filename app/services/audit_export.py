@@ -0,0 +1,107 @@
+"""app.services.audit_export
+
+Streaming CSV / NDJSON exports of the audit tables, used by the admin export
+endpoints and `export_audit.py`.
+
+Rows are read through a server-side cursor (`stream_results` + `yield_per`) and
+encoded into fixed-size chunks, optionally gzip-compressed on the fly, so memory
+use stays constant however large the table is. Photos are not exported; the
+`unauthorized_access` export only says whether a snapshot exists.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import zlib
+from typing import Iterator
+
+from sqlalchemy import text
+
+from app.services.audit_query import AUDIT_TABLES, build_filters
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+YIELD_PER = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def export_filename(table_name: str, fmt: str, compress: bool = False) -> str:
+    return f"{table_name}.{fmt}" + (".gz" if compress else "")
+
+
+def _encode(rows, columns: list[str], fmt: str) -> Iterator[str]:
+    if fmt == "ndjson":
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _chunks(pieces: Iterator[str], compress: bool, chunk_size: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31 -> gzip container
+    pending = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode("utf-8")
+        pending.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            out = b"".join(pending)
+            pending, size = [], 0
+            if compressor is not None:
+                out = compressor.compress(out)
+            if out:
+                yield out
+    out = b"".join(pending)
+    if compressor is not None:
+        out = compressor.compress(out) + compressor.flush()
+    if out:
+        yield out
+
+
+def iter_export(
+    engine,
+    table_name: str,
+    fmt: str = "csv",
+    *,
+    compress: bool = False,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    employee: str | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Return an iterator of encoded chunks, ordered by id.
+
+    Arguments are validated here (ValueError) before anything is streamed, so
+    callers can still report a bad request; the query itself runs lazily.
+    """
+    if table_name not in AUDIT_TABLES:
+        raise ValueError(f"Unknown audit table: {table_name!r}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt!r}")
+    table = AUDIT_TABLES[table_name]
+    clauses, params = build_filters(table, date_from, date_to, employee)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    query = text(f"SELECT {', '.join(table.columns)} FROM {table.name}{where} ORDER BY id")
+
+    def generate() -> Iterator[bytes]:
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=YIELD_PER).execute(query, params)
+            columns = list(result.keys())
+            yield from _chunks(_encode(result, columns, fmt), compress, chunk_size)
+
+    return generate()
@@ -0,0 +1,184 @@
+"""app.services.audit_query
+
+Keyset-paginated, filterable reads of the audit tables (`good_entries`,
+`unauthorized_access`) for the admin API.
+
+Pages are addressed by an opaque cursor holding the sort value and `id` of the
+last row returned, so fetching page N costs the same as fetching page 1 (an
+index range scan on `id` or `created_at`) instead of an OFFSET that re-reads
+everything before it. `created_at` is compared as the text SQLite stores, which
+keeps the comparison on `ix_<table>_created_at` and makes cursors round-trip
+exactly.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SORT_COLUMNS = ("id", "created_at")
+SORT_ORDERS = ("asc", "desc")
+
+
+@dataclass(frozen=True)
+class AuditTable:
+    name: str
+    columns: tuple[str, ...]
+    # Columns matched by the `employee` filter: numeric values go to id_column.
+    name_column: str
+    id_column: str | None = None
+
+
+AUDIT_TABLES = {
+    "good_entries": AuditTable(
+        name="good_entries",
+        columns=("id", "emp_id", "emp_name", "created_at"),
+        name_column="emp_name",
+        id_column="emp_id",
+    ),
+    "unauthorized_access": AuditTable(
+        name="unauthorized_access",
+        # Photos are served by their own endpoint; lists only say whether one exists.
+        columns=("id", "qr_text", "photo IS NOT NULL AS has_photo", "created_at"),
+        # The audit writer stores the resolved employee name (or "Not Found") here.
+        name_column="qr_text",
+    ),
+}
+
+
+def encode_cursor(sort_value, row_id: int) -> str:
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return sort_value, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_date_bound(value: str | None, end: bool = False) -> str | None:
+    """Turn an ISO date/datetime into the text format of `created_at` (naive UTC).
+
+    Timezone-aware values are converted to UTC. For ``end=True`` a bare date
+    means "up to and including that day", so the exclusive bound is the next
+    midnight.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def build_filters(
+    table: AuditTable,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    employee: str | None = None,
+) -> tuple[list[str], dict]:
+    """WHERE clauses + bind params shared by the list, count and export queries."""
+    clauses = []
+    params = {}
+    start = parse_date_bound(date_from)
+    end = parse_date_bound(date_to, end=True)
+    if start:
+        clauses.append("created_at >= :date_from")
+        params["date_from"] = start
+    if end:
+        clauses.append("created_at < :date_to")
+        params["date_to"] = end
+    if employee:
+        employee = employee.strip()
+        if table.id_column and employee.isdigit():
+            clauses.append(f"{table.id_column} = :employee")
+            params["employee"] = int(employee)
+        else:
+            clauses.append(f"{table.name_column} = :employee")
+            params["employee"] = employee
+    return clauses, params
+
+
+def _where(clauses: list[str]) -> str:
+    return f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+
+def fetch_page(
+    db,
+    table: AuditTable,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    sort: str = "id",
+    order: str = "desc",
+    date_from: str | None = None,
+    date_to: str | None = None,
+    employee: str | None = None,
+) -> tuple[list, str | None]:
+    """Return ``(rows, next_cursor)``; ``next_cursor`` is None on the last page."""
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unsupported sort column: {sort!r}")
+    if order not in SORT_ORDERS:
+        raise ValueError(f"Unsupported sort order: {order!r}")
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    clauses, params = build_filters(table, date_from, date_to, employee)
+    op = "<" if order == "desc" else ">"
+    direction = order.upper()
+
+    if cursor:
+        last_value, last_id = decode_cursor(cursor)
+        if sort == "id":
+            clauses.append(f"id {op} :last_id")
+        else:
+            clauses.append(f"(created_at {op} :last_value OR (created_at = :last_value AND id {op} :last_id))")
+            params["last_value"] = last_value
+        params["last_id"] = last_id
+
+    order_by = f"id {direction}" if sort == "id" else f"created_at {direction}, id {direction}"
+    params["limit"] = limit + 1
+    rows = db.execute(
+        text(
+            f"SELECT {', '.join(table.columns)} FROM {table.name}"
+            f"{_where(clauses)} ORDER BY {order_by} LIMIT :limit"
+        ),
+        params,
+    ).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.id if sort == "id" else last.created_at, last.id)
+    return rows, next_cursor
+
+
+def count_rows(
+    db,
+    table: AuditTable,
+    *,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    employee: str | None = None,
+) -> int:
+    clauses, params = build_filters(table, date_from, date_to, employee)
+    return db.execute(text(f"SELECT COUNT(*) FROM {table.name}{_where(clauses)}"), params).scalar()
@@ -0,0 +1,162 @@
+"""app.services.broadcast
+
+Encode-once MJPEG fan-out.
+
+`FrameBroadcaster` runs the processing pipeline (state machine + JPEG encode)
+once per camera frame on a single producer thread and pushes the resulting
+bytes to every connected viewer. Each viewer has a small bounded queue; when a
+client is too slow the oldest frame is dropped, so a slow browser never delays
+the others and never causes the pipeline to run more than once per frame.
+
+The producer thread is the only place that runs blocking OpenCV work; async
+viewers (`AsyncFrameSubscriber`) just await an event set from that thread, so
+a long-lived stream connection costs a coroutine rather than a worker thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+
+class FrameSubscriber:
+    def __init__(self, maxsize: int = 2):
+        self._frames: deque[bytes] = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def push(self, data: bytes) -> None:
+        with self._cond:
+            if len(self._frames) == self._frames.maxlen:
+                self.dropped += 1  # deque drops the oldest (stale) frame
+            self._frames.append(data)
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def get(self, timeout: float = 1.0) -> bytes | None:
+        """Return the next frame, or ``None`` if nothing arrived within ``timeout``."""
+        with self._cond:
+            if not self._frames:
+                self._cond.wait_for(lambda: self._frames or self.closed, timeout)
+            return self._frames.popleft() if self._frames else None
+
+
+class AsyncFrameSubscriber(FrameSubscriber):
+    """Subscriber consumed from an event loop; pushes arrive from the producer thread."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 2):
+        super().__init__(maxsize)
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def _wake(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass  # event loop already closed
+
+    def push(self, data: bytes) -> None:
+        super().push(data)
+        self._wake()
+
+    def close(self) -> None:
+        super().close()
+        self._wake()
+
+    async def aget(self, timeout: float = 1.0) -> bytes | None:
+        with self._cond:
+            if self._frames:
+                return self._frames.popleft()
+            if self.closed:
+                return None
+            # Cleared under the lock: any later push() schedules a new set().
+            self._event.clear()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        with self._cond:
+            return self._frames.popleft() if self._frames else None
+
+
+class FrameBroadcaster:
+    def __init__(self, produce: Callable[[], bytes | None], queue_size: int = 2, target_fps: float = 0.0):
+        # `produce` blocks until the next frame is ready (or times out and returns None).
+        self._produce = produce
+        self._queue_size = queue_size
+        self._min_interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self._subscribers: set[FrameSubscriber] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.frames_produced = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def subscribe(self) -> FrameSubscriber:
+        return self._add(FrameSubscriber(self._queue_size))
+
+    def subscribe_async(self, loop: asyncio.AbstractEventLoop | None = None) -> AsyncFrameSubscriber:
+        return self._add(AsyncFrameSubscriber(loop or asyncio.get_running_loop(), self._queue_size))
+
+    def _add(self, subscriber):
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mjpeg-broadcast", daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: FrameSubscriber) -> None:
+        subscriber.close()
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _run(self) -> None:
+        # The pipeline only runs while somebody is watching.
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+
+            started = time.monotonic()
+            try:
+                data = self._produce()
+            except Exception as e:
+                print(f"Frame pipeline error: {e}")
+                time.sleep(0.1)
+                continue
+            if data is None:
+                continue
+
+            self.frames_produced += 1
+            # Viewers that joined while the frame was being produced get it too.
+            with self._lock:
+                subscribers = list(self._subscribers)
+            for subscriber in subscribers:
+                subscriber.push(data)
+
+            # Cap the processing rate at target_fps (the camera paces us otherwise).
+            remaining = self._min_interval - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        return {
+            "subscribers": len(subscribers),
+            "frames_produced": self.frames_produced,
+            "frames_dropped_per_subscriber": [s.dropped for s in subscribers],
+        }
@@ -0,0 +1,148 @@
+"""app.services.capture
+
+Camera capture on a dedicated thread.
+
+`FrameGrabber` reads the device at its native rate and keeps only the newest
+frame. Consumers (stream encoder, QR decoder, face pipeline, admin capture)
+never touch the device: they call `read_latest()` and get the shared frame by
+reference together with its sequence number. Frames are marked read-only, so a
+consumer that wants to draw on a frame must copy it first.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class FrameGrabber:
+    def __init__(self, source: int | str | None = None, retry_interval: float = 2.0):
+        # None = scan the first two device indices (/dev/video0, /dev/video1).
+        self.source = source
+        self.retry_interval = retry_interval
+        self.video = None
+
+        self._cond = threading.Condition()
+        self._frame: np.ndarray | None = None
+        self._seq = 0
+        self._consumed_seq = 0
+        self._thread: threading.Thread | None = None
+        self._running = False
+        self.last_open_attempt_time = 0.0
+
+        # Metrics
+        self.frames_captured = 0
+        self.frames_dropped = 0      # captured, but replaced before any consumer read it
+        self.frames_duplicated = 0   # a consumer asked for a new frame and got one it had already seen
+        self.read_errors = 0
+
+    # --- Lifecycle ---
+
+    def start(self) -> None:
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._cond:
+            self._running = False
+            thread = self._thread
+            self._thread = None
+            self._cond.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _open(self) -> None:
+        # Zabezpieczenie przed spamowaniem próbami otwarcia (max raz na retry_interval)
+        wait = self.retry_interval - (time.time() - self.last_open_attempt_time)
+        if wait > 0:
+            time.sleep(min(wait, 0.2))
+            return
+        self.last_open_attempt_time = time.time()
+
+        sources = range(2) if self.source is None else [self.source]
+        for source in sources:
+            cap = cv2.VideoCapture(source, cv2.CAP_ANY)
+            if cap.isOpened():
+                ret, frame = cap.read()
+                if ret and frame is not None and frame.size > 0:
+                    print(f"Kamera otwarta (source={source})")
+                    self.video = cap
+                    return
+            cap.release()
+
+        print("Nie udało się otworzyć kamery (Auto-Retry)")
+
+    def _release(self) -> None:
+        if self.video is not None:
+            self.video.release()
+            self.video = None
+
+    def _run(self) -> None:
+        try:
+            while self._running:
+                if self.video is None or not self.video.isOpened():
+                    self._open()
+                    continue
+
+                success, frame = self.video.read()
+                if not success or frame is None:
+                    # Błąd odczytu: zamknij i spróbuj otworzyć ponownie
+                    self.read_errors += 1
+                    self._release()
+                    with self._cond:
+                        self._frame = None
+                    continue
+
+                frame.flags.writeable = False
+                with self._cond:
+                    if self._frame is not None and self._consumed_seq < self._seq:
+                        self.frames_dropped += 1
+                    self._seq += 1
+                    self._frame = frame
+                    self.frames_captured += 1
+                    self._cond.notify_all()
+        finally:
+            self._release()
+
+    # --- Consumers ---
+
+    def read_latest(self, after_seq: int | None = None, timeout: float = 1.0) -> tuple[int, np.ndarray | None]:
+        """Return ``(seq, frame)`` for the newest frame (``frame`` is read-only).
+
+        With ``after_seq`` the call waits up to ``timeout`` seconds for a frame newer
+        than the one the consumer already has. Without it, it only waits for the
+        very first frame after the camera was opened.
+        """
+        self.start()
+        with self._cond:
+            min_seq = after_seq if after_seq is not None else 0
+            if self._frame is None or self._seq <= min_seq:
+                self._cond.wait_for(
+                    lambda: not self._running or (self._frame is not None and self._seq > min_seq),
+                    timeout,
+                )
+            if self._frame is None:
+                return self._seq, None
+            if after_seq is not None and self._seq <= after_seq:
+                self.frames_duplicated += 1
+            self._consumed_seq = self._seq
+            return self._seq, self._frame
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "running": self._running,
+                "opened": self.video is not None,
+                "seq": self._seq,
+                "frames_captured": self.frames_captured,
+                "frames_dropped": self.frames_dropped,
+                "frames_duplicated": self.frames_duplicated,
+                "read_errors": self.read_errors,
+            }
@@ -0,0 +1,121 @@
+"""app.services.doors
+
+Registry of the doors (entrances) served by this host.
+
+Each door has its own camera source, capture thread, analysis pool, state
+machine (`VideoCamera`) and MJPEG broadcaster. All doors share the face model
+(`face_model_manager`), the QR index and the audit writer. Doors are configured
+with ``ACS_DOORS``, e.g. ``main=0,garage=1,lab=rtsp://10.0.0.5/stream``; when it
+is empty a single door ``main`` scans the first two local devices as before.
+
+Every door runs its OpenCV work on its own threads (OpenCV releases the GIL), so
+doors proceed in parallel. `balance_opencv_threads` splits OpenCV's internal
+thread pool between the doors so that N doors do not oversubscribe the cores.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from typing import Callable
+
+import cv2
+
+from app.services.broadcast import FrameBroadcaster
+
+DEFAULT_DOOR_ID = "main"
+
+
+def parse_door_sources(spec: str) -> list[tuple[str, int | str | None]]:
+    """``"main=0,lab=rtsp://..."`` -> ``[("main", 0), ("lab", "rtsp://...")]``."""
+    doors = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        door_id, _, source = item.partition("=")
+        door_id, source = door_id.strip(), source.strip()
+        if not door_id or any(door_id == existing for existing, _ in doors):
+            raise ValueError(f"Invalid or duplicate door id in ACS_DOORS: {item!r}")
+        doors.append((door_id, int(source) if source.isdigit() else (source or None)))
+    return doors or [(DEFAULT_DOOR_ID, None)]
+
+
+def balance_opencv_threads(door_count: int, configured: int = 0) -> int:
+    """Give each door an equal share of the cores for OpenCV's internal parallelism."""
+    threads = configured if configured > 0 else max(1, (os.cpu_count() or 1) // max(1, door_count))
+    if configured > 0 or door_count > 1:
+        cv2.setNumThreads(threads)
+    return threads
+
+
+@dataclass
+class Door:
+    door_id: str
+    source: int | str | None
+    camera: object
+    broadcaster: FrameBroadcaster
+
+    def release(self) -> None:
+        self.camera.release()
+
+    def stats(self) -> dict:
+        return {
+            "door_id": self.door_id,
+            "source": self.source,
+            "state": self.camera.state.value,
+            "capture": self.camera.grabber.stats(),
+            "stream": self.broadcaster.stats(),
+            "analysis": self.camera.analyzer.stats(),
+            "face_tracker": self.camera.face_tracker.stats(),
+            "events": self.camera.events.stats(),
+        }
+
+
+class DoorRegistry:
+    def __init__(self):
+        self._doors: dict[str, Door] = {}
+
+    @classmethod
+    def from_sources(
+        cls,
+        sources: list[tuple[str, int | str | None]],
+        camera_factory: Callable,
+        producer_factory: Callable,
+        queue_size: int = 2,
+        target_fps: float = 0.0,
+    ) -> "DoorRegistry":
+        """Build every door; a door whose camera fails to initialise is skipped (logged)."""
+        registry = cls()
+        for door_id, source in sources:
+            try:
+                camera = camera_factory(door_id=door_id, source=source)
+            except Exception as e:
+                print(f"Error initializing camera for door {door_id!r}: {e}")
+                continue
+            broadcaster = FrameBroadcaster(producer_factory(camera), queue_size=queue_size, target_fps=target_fps)
+            registry._doors[door_id] = Door(door_id, source, camera, broadcaster)
+        return registry
+
+    @property
+    def default(self) -> Door | None:
+        return next(iter(self._doors.values()), None)
+
+    def get(self, door_id: str) -> Door | None:
+        return self._doors.get(door_id)
+
+    def ids(self) -> list[str]:
+        return list(self._doors)
+
+    def __iter__(self):
+        return iter(list(self._doors.values()))
+
+    def __len__(self) -> int:
+        return len(self._doors)
+
+    def release_all(self) -> None:
+        for door in self:
+            door.release()
+
+    def stats(self) -> list[dict]:
+        return [door.stats() for door in self]
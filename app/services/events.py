@@ -0,0 +1,63 @@
+"""app.services.events
+
+Push channel for camera state-machine transitions (Server-Sent Events).
+
+`VideoCamera` publishes a small snapshot every time its state changes
+(IDLE -> QR_SCANNING -> FACE_VERIFICATION -> ACCESS_GRANTED / ACCESS_DENIED).
+The kiosk pages keep one `/api/events` connection open and redirect as soon as
+the verdict arrives, instead of polling the status endpoints.
+
+Subscribers reuse the async queue from `app.services.broadcast`. A new
+subscriber first gets the latest snapshot, so a page that connects after a
+transition still sees the current state.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+
+from app.services.broadcast import AsyncFrameSubscriber
+
+
+class StateEventHub:
+    def __init__(self, queue_size: int = 32):
+        self._queue_size = queue_size
+        self._subscribers: set[AsyncFrameSubscriber] = set()
+        self._lock = threading.Lock()
+        self._last: dict | None = None
+        self.events_published = 0
+
+    def publish(self, event: dict) -> None:
+        # Pushed under the lock so a subscriber never sees events out of order.
+        with self._lock:
+            self._last = event
+            self.events_published += 1
+            for subscriber in self._subscribers:
+                subscriber.push(event)
+
+    def subscribe_async(self, loop: asyncio.AbstractEventLoop | None = None) -> AsyncFrameSubscriber:
+        subscriber = AsyncFrameSubscriber(loop or asyncio.get_running_loop(), self._queue_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._last is not None:
+                subscriber.push(self._last)
+        return subscriber
+
+    def unsubscribe(self, subscriber: AsyncFrameSubscriber) -> None:
+        subscriber.close()
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "events_published": self.events_published,
+                "state": self._last["state"] if self._last else None,
+            }
+
+
+def format_sse(data: dict, event: str = "state") -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,114 @@
+"""app.services.face_detectors
+
+Face-detector backends, selected with ``ACS_FACE_DETECTOR``:
+
+- ``haar`` — OpenCV's ``haarcascade_frontalface_default.xml`` (bundled with cv2).
+- ``lbp``  — an LBP cascade, e.g. ``lbpcascade_frontalface_improved.xml`` from the
+  OpenCV sources. The pip wheels do not bundle it: copy it into ``ACS_FACE_MODEL_DIR``
+  (``LBP_CASCADE_PATH``) or point ``ACS_FACE_DETECTOR_MODEL`` at it.
+  Integer features, usually several times faster than Haar and a bit less accurate.
+- ``dnn``  — a local OpenCV DNN model: a YuNet ``.onnx`` file (via ``cv2.FaceDetectorYN``)
+  or the res10 SSD Caffe model (``.caffemodel`` + ``ACS_FACE_DETECTOR_CONFIG`` ``.prototxt``).
+
+Every backend exposes the cascade API — ``detectMultiScale(gray, scaleFactor,
+minNeighbors, minSize=, maxSize=)`` returning an ``N x 4`` array of ``(x, y, w, h)``
+boxes — so `facial_recognition.detect_faces` and the ROI tracker work unchanged.
+``tests/benchmark_face_detectors.py`` compares latency and detection rate.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from app.core.config import FACE_MODEL_DIR
+
+DETECTOR_BACKENDS = ("haar", "lbp", "dnn")
+HAAR_CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+LBP_CASCADE_PATH = os.path.join(FACE_MODEL_DIR, "lbpcascade_frontalface_improved.xml")
+
+
+def _load_cascade(path: str) -> cv2.CascadeClassifier:
+    if not os.path.isfile(path):
+        raise RuntimeError(f"Face cascade not found: {path!r} (set ACS_FACE_DETECTOR_MODEL)")
+    cascade = cv2.CascadeClassifier(path)
+    if cascade.empty():
+        raise RuntimeError(f"Could not load face cascade from {path!r}")
+    return cascade
+
+
+class DnnFaceDetector:
+    """OpenCV DNN face detector behind the `cv2.CascadeClassifier` interface.
+
+    ``scaleFactor`` / ``minNeighbors`` have no meaning for a network and are ignored;
+    ``minSize`` / ``maxSize`` filter the boxes like they do for a cascade.
+    """
+
+    def __init__(self, model_path: str, config_path: str = "", confidence: float = 0.6, input_size: int = 300):
+        if not os.path.isfile(model_path):
+            raise RuntimeError(f"DNN face model not found: {model_path!r}")
+        self.confidence = confidence
+        self.input_size = input_size
+        # A network keeps per-call state (input blob, YuNet input size): one caller at a time.
+        self._lock = threading.Lock()
+        self._yunet = None
+        self._net = None
+        if model_path.lower().endswith(".onnx"):
+            self._yunet = cv2.FaceDetectorYN.create(model_path, "", (input_size, input_size), confidence)
+        else:
+            self._net = cv2.dnn.readNet(model_path, config_path)
+
+    def _detect_raw(self, image_bgr: np.ndarray) -> list[tuple[float, float, float, float]]:
+        h, w = image_bgr.shape[:2]
+        with self._lock:
+            if self._yunet is not None:
+                self._yunet.setInputSize((w, h))
+                _, faces = self._yunet.detect(image_bgr)
+                return [] if faces is None else [tuple(face[:4]) for face in faces]
+
+            blob = cv2.dnn.blobFromImage(
+                image_bgr, 1.0, (self.input_size, self.input_size), (104.0, 177.0, 123.0)
+            )
+            self._net.setInput(blob)
+            out = self._net.forward()
+
+        boxes = []
+        # SSD output: [1, 1, N, 7] = (image_id, label, confidence, x0, y0, x1, y1) in 0..1
+        for det in out.reshape(-1, 7):
+            if det[2] < self.confidence:
+                continue
+            x0, y0, x1, y1 = det[3] * w, det[4] * h, det[5] * w, det[6] * h
+            boxes.append((x0, y0, x1 - x0, y1 - y0))
+        return boxes
+
+    def detectMultiScale(self, image, scaleFactor=1.1, minNeighbors=3, minSize=(0, 0), maxSize=(0, 0)):
+        image_bgr = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+        h, w = image_bgr.shape[:2]
+        boxes = []
+        for x, y, bw, bh in self._detect_raw(image_bgr):
+            x0, y0 = max(0, int(x)), max(0, int(y))
+            x1, y1 = min(w, int(x + bw)), min(h, int(y + bh))
+            bw, bh = x1 - x0, y1 - y0
+            if bw <= 0 or bh <= 0 or bw < minSize[0] or bh < minSize[1]:
+                continue
+            if maxSize[0] and (bw > maxSize[0] or bh > maxSize[1]):
+                continue
+            boxes.append((x0, y0, bw, bh))
+        return np.array(boxes, dtype=np.int32).reshape(-1, 4)
+
+
+def create_face_detector(backend: str = "haar", model_path: str = "", config_path: str = "", confidence: float = 0.6):
+    """Build the detector for ``backend``; raises ValueError/RuntimeError if it cannot be used."""
+    backend = backend.lower()
+    if backend == "haar":
+        return _load_cascade(model_path or HAAR_CASCADE_PATH)
+    if backend == "lbp":
+        return _load_cascade(model_path or LBP_CASCADE_PATH)
+    if backend == "dnn":
+        if not model_path:
+            raise RuntimeError("ACS_FACE_DETECTOR=dnn needs ACS_FACE_DETECTOR_MODEL (.onnx or .caffemodel)")
+        return DnnFaceDetector(model_path, config_path, confidence)
+    raise ValueError(f"Unknown face detector {backend!r}, expected one of {', '.join(DETECTOR_BACKENDS)}")
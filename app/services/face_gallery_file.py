@@ -0,0 +1,157 @@
+"""app.services.face_gallery_file
+
+LBPH face gallery in one memory-mapped file, shared by several server processes.
+
+With ``uvicorn --workers N`` every process used to train its own copy of the
+gallery from SQLite (64 KB of float32 histograms per template). When
+``ACS_FACE_GALLERY_DIR`` is set, the process that rebuilds the model publishes
+the gallery (feature-major histograms, labels, per-face sums) together with the
+label table (names and emp_ids) to ``gallery-v<format>-<checksum>.bin`` in that directory, and every process
+maps the file read-only: its pages are held once in the OS page cache, however
+many processes use them.
+
+Layout: magic, little-endian uint64 header length, JSON header (parameters,
+label table, DB fingerprint, array offsets), then the arrays, each aligned to
+``ALIGNMENT`` bytes so they can be viewed in place.
+
+Regeneration is an atomic swap. The new file is written under a temporary name
+and renamed, then the small ``current.json`` pointer is replaced to name it.
+Processes that poll the pointer switch to the new file; their mappings of the
+old one stay valid until released. Unreferenced files are removed once they are
+old enough that no concurrent rebuild can be about to point at them (on Windows
+a file that is still mapped cannot be removed and is retried on a later publish).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+
+import numpy as np
+
+from app.services.lbph_gallery import LBPHGallery
+
+GALLERY_MAGIC = b"ACSGAL\x00\x02"  # last byte = format version
+ALIGNMENT = 64
+POINTER_FILE = "current.json"
+# Unreferenced gallery files younger than this are kept: a concurrent rebuild may be about to publish them.
+STALE_AFTER_SECONDS = 60.0
+
+
+def gallery_file_name(fingerprint: dict) -> str:
+    """Files are named after the DB state they were built from, so equal rebuilds share one file."""
+    return f"gallery-v{GALLERY_MAGIC[-1]}-{fingerprint['photo_checksum']}.bin"
+
+
+def is_gallery_file(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.startswith("gallery-") and name.endswith(".bin")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _write_gallery(
+    f, gallery: LBPHGallery, known_names: list[str], known_emp_ids: list[int], fingerprint: dict
+) -> None:
+    by_feature, labels, sums = (np.ascontiguousarray(a) for a in gallery.arrays)
+    arrays = {"by_feature": by_feature, "labels": labels, "sums": sums}
+    header = {
+        "params": gallery.params,
+        "feature_kind": gallery.feature_kind,
+        "known_names": known_names,
+        "known_emp_ids": known_emp_ids,
+        "fingerprint": fingerprint,
+        "arrays": {},
+    }
+    # The offsets are part of the header, whose length depends on them: reserve room for them first.
+    for name, array in arrays.items():
+        header["arrays"][name] = {"offset": 0, "dtype": array.dtype.str, "shape": list(array.shape)}
+    header_size = len(json.dumps(header, ensure_ascii=False).encode("utf-8")) + 32 * len(arrays)
+    offset = _aligned(len(GALLERY_MAGIC) + 8 + header_size)
+    for name, array in arrays.items():
+        header["arrays"][name]["offset"] = offset
+        offset = _aligned(offset + array.nbytes)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8").ljust(header_size)
+
+    f.write(GALLERY_MAGIC)
+    f.write(len(header_bytes).to_bytes(8, "little"))
+    f.write(header_bytes)
+    for name, array in arrays.items():
+        f.write(b"\0" * (header["arrays"][name]["offset"] - f.tell()))
+        if array.nbytes:
+            f.write(memoryview(array).cast("B"))
+
+
+def write_gallery_file(
+    directory: str, gallery: LBPHGallery, known_names: list[str], known_emp_ids: list[int], fingerprint: dict
+) -> str:
+    """Publish ``gallery`` in ``directory`` and point ``current.json`` at it; returns the file path."""
+    os.makedirs(directory, exist_ok=True)
+    file_name = gallery_file_name(fingerprint)
+    path = os.path.join(directory, file_name)
+    # Another process may already have published the same DB state.
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            _write_gallery(f, gallery, known_names, known_emp_ids, fingerprint)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    pointer_path = os.path.join(directory, POINTER_FILE)
+    tmp_pointer_path = f"{pointer_path}.{os.getpid()}.tmp"
+    with open(tmp_pointer_path, "w", encoding="utf-8") as f:
+        json.dump({"file": file_name, "fingerprint": fingerprint}, f, ensure_ascii=False)
+    os.replace(tmp_pointer_path, pointer_path)
+
+    _remove_stale(directory, keep=file_name)
+    return path
+
+
+def _remove_stale(directory: str, keep: str) -> None:
+    now = time.time()
+    for name in os.listdir(directory):
+        if not is_gallery_file(name) or name == keep:
+            continue
+        path = os.path.join(directory, name)
+        try:
+            if now - os.path.getmtime(path) >= STALE_AFTER_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def read_current(directory: str) -> str | None:
+    """Name of the currently published gallery file, or ``None``."""
+    try:
+        with open(os.path.join(directory, POINTER_FILE), encoding="utf-8") as f:
+            return json.load(f)["file"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def map_gallery_file(path: str) -> tuple[LBPHGallery, list[str], list[int], dict]:
+    """Map a gallery file read-only: ``(gallery, known_names, known_emp_ids, fingerprint)``.
+
+    The gallery's arrays are views of the mapping, so nothing is copied and the
+    file's pages are shared with every other process mapping it.
+    """
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    if len(data) < len(GALLERY_MAGIC) + 8 or bytes(data[: len(GALLERY_MAGIC)]) != GALLERY_MAGIC:
+        raise ValueError(f"{path} is not a face gallery file (or has another format version)")
+    start = len(GALLERY_MAGIC) + 8
+    header_size = int.from_bytes(bytes(data[len(GALLERY_MAGIC) : start]), "little")
+    header = json.loads(bytes(data[start : start + header_size]).decode("utf-8"))
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        offset = spec["offset"]
+        arrays[name] = data[offset : offset + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+
+    gallery = LBPHGallery.from_arrays(arrays["by_feature"], arrays["labels"], arrays["sums"], **header["params"])
+    return gallery, list(header["known_names"]), list(header["known_emp_ids"]), header["fingerprint"]
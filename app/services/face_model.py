@@ -0,0 +1,520 @@
+"""app.services.face_model
+
+Resident LBPH face model shared by the camera pipeline (`LBPHGallery` or
+OpenCV's LBPH, see ``ACS_FACE_MATCHER``).
+
+The recognizer is trained once and then kept up to date from change
+notifications sent by the admin endpoints instead of being retrained on a
+timer:
+- a newly enrolled face is appended with ``recognizer.update()``,
+- deletes / edits mark the model stale and trigger a full rebuild on a
+  background thread; the previous model keeps serving until the new one is ready.
+
+Every full rebuild is also written to disk (``FACE_MODEL_DIR``) together with
+the label table (``known_names`` and ``known_emp_ids``) and a fingerprint of the
+employees table, so a restart can load the snapshot instead of retraining when
+nothing has changed.
+
+With ``ACS_FACE_GALLERY_DIR`` set (several server processes, numpy matcher) the
+snapshot is the shared gallery file instead (`app.services.face_gallery_file`):
+rebuilds publish it, every process serves a read-only mapping of it, and
+processes switch to a file published by another process when they poll it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+from sqlalchemy import text
+
+from app.core.config import FACE_GALLERY_DIR, FACE_GALLERY_POLL_SECONDS, FACE_MATCHER, FACE_MODEL_DIR
+from app.core.database import SessionLocal
+from app.services.face_gallery_file import read_current
+from app.services.facial_recognition import (
+    LBPH_MODEL_SUFFIX,
+    _create_lbph_recognizer,
+    load_lbph_from_gallery_file,
+    publish_lbph_gallery,
+    train_lbph_from_db,
+)
+from app.services.lbph_gallery import LBPHGallery
+
+# Bump when the snapshot layout changes; older snapshots are then ignored.
+SNAPSHOT_FORMAT_VERSION = 2
+SNAPSHOT_META_FILE = "meta.json"
+
+# Galleries shared between processes through FACE_GALLERY_DIR (LBPHGallery only).
+SHARED_GALLERY = bool(FACE_GALLERY_DIR) and FACE_MATCHER == "numpy"
+
+
+def compute_db_fingerprint() -> dict:
+    """Fingerprint of the face data: max emp_id, template count, template checksum.
+
+    Templates are never edited in place (only added / deleted), so their ids stand
+    in for their content; only employees without templates have their photo hashed.
+    """
+    db = SessionLocal()
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        count = 0
+        max_id = 0
+        templates = db.execute(
+            text(
+                "SELECT t.id, e.emp_id, e.emp_name, length(t.face) FROM face_templates t"
+                " JOIN employees e ON e.emp_id = t.emp_id ORDER BY t.id"
+            )
+        )
+        for template_id, emp_id, emp_name, size in templates:
+            count += 1
+            max_id = max(max_id, emp_id)
+            digest.update(f"t{template_id}|{emp_id}|{emp_name}|{size}|".encode("utf-8"))
+        photos = db.execute(
+            text(
+                "SELECT emp_id, emp_name, emp_photo FROM employees e WHERE emp_photo IS NOT NULL"
+                " AND NOT EXISTS (SELECT 1 FROM face_templates t WHERE t.emp_id = e.emp_id) ORDER BY emp_id"
+            )
+        )
+        for emp_id, emp_name, emp_photo in photos:
+            count += 1
+            max_id = max(max_id, emp_id)
+            digest.update(f"{emp_id}|{emp_name}|{len(emp_photo)}|".encode("utf-8"))
+            digest.update(emp_photo)
+        return {"max_emp_id": max_id, "count": count, "photo_checksum": digest.hexdigest()}
+    finally:
+        db.close()
+
+
+def write_snapshot(
+    recognizer, known_names: list[str], known_emp_ids: list[int], fingerprint: dict, directory: str = FACE_MODEL_DIR
+) -> None:
+    """Write the model atomically: model file first, then meta.json pointing at it."""
+    os.makedirs(directory, exist_ok=True)
+    model_file = f"lbph-{fingerprint['photo_checksum']}{LBPH_MODEL_SUFFIX}"
+    model_path = os.path.join(directory, model_file)
+    tmp_model_path = model_path + ".tmp" + LBPH_MODEL_SUFFIX
+    recognizer.write(tmp_model_path)
+    os.replace(tmp_model_path, model_path)
+
+    meta = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "opencv_version": cv2.__version__,
+        "matcher": FACE_MATCHER,
+        "model_file": model_file,
+        "fingerprint": fingerprint,
+        "known_names": known_names,
+        "known_emp_ids": known_emp_ids,
+    }
+    meta_path = os.path.join(directory, SNAPSHOT_META_FILE)
+    tmp_meta_path = meta_path + ".tmp"
+    with open(tmp_meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp_meta_path, meta_path)
+
+    # Old model files are no longer referenced by meta.json.
+    for name in os.listdir(directory):
+        if name.startswith("lbph-") and name != model_file:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def read_snapshot(directory: str = FACE_MODEL_DIR, expected_fingerprint: dict | None = None):
+    """Return ``(recognizer, known_names, known_emp_ids)`` from disk, or ``None`` if missing/stale."""
+    meta_path = os.path.join(directory, SNAPSHOT_META_FILE)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return None
+    if meta.get("opencv_version") != cv2.__version__:
+        return None
+    if meta.get("matcher", "opencv") != FACE_MATCHER:
+        return None
+    if expected_fingerprint is not None and meta.get("fingerprint") != expected_fingerprint:
+        return None
+
+    model_path = os.path.join(directory, meta["model_file"])
+    if not os.path.exists(model_path):
+        return None
+    recognizer = _create_lbph_recognizer()
+    recognizer.read(model_path)
+    return recognizer, list(meta["known_names"]), list(meta["known_emp_ids"])
+
+
+class FaceModelManager:
+    def __init__(self):
+        # RLock: the frame loop holds it around predict() and may call get() inside.
+        self.lock = threading.RLock()
+        self.recognizer = None
+        self.known_names: list[str] = []
+        # emp_id of every label: employees may share a name.
+        self.known_emp_ids: list[int] = []
+        self.last_error: str | None = None
+
+        self._initialized = False
+        self._rebuild_pending = False
+        self._rebuild_thread: threading.Thread | None = None
+        # Incremental updates since the last snapshot was written.
+        self._snapshot_dirty = False
+        # Bumped on every model change; worker processes reload when it differs.
+        self.model_version = 0
+        self._exported: tuple[int, str] | None = None
+        self._export_lock = threading.Lock()
+        # 1:1 verification galleries per emp_id, valid for one model version.
+        self._verification_cache: dict[int, LBPHGallery | None] = {}
+        self._verification_version = -1
+        # Shared gallery file currently served (None: private in-memory model) and polling state.
+        self._gallery_file: str | None = None
+        self._gallery_checked = 0.0
+        self._gallery_failed: str | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.recognizer is not None
+
+    @property
+    def rebuilding(self) -> bool:
+        return self._rebuild_thread is not None
+
+    def get(self):
+        """Return ``(recognizer, known_names)`` or ``None`` if no model is trained yet.
+
+        The first call starts the initial build in the background; afterwards the
+        model only changes in response to notifications.
+        """
+        with self.lock:
+            if not self._initialized:
+                self._initialized = True
+                self.request_rebuild()
+            if SHARED_GALLERY:
+                self._poll_gallery_file()
+            if self.recognizer is None:
+                return None
+            return self.recognizer, self.known_names
+
+    def request_rebuild(self) -> None:
+        """Schedule a full retrain from the database (coalesces repeated requests)."""
+        with self.lock:
+            self._initialized = True
+            self._rebuild_pending = True
+            if self._rebuild_thread is None:
+                self._rebuild_thread = threading.Thread(
+                    target=self._rebuild_worker, name="face-model-rebuild", daemon=True
+                )
+                self._rebuild_thread.start()
+
+    def _rebuild_worker(self) -> None:
+        while True:
+            with self.lock:
+                if not self._rebuild_pending:
+                    self._rebuild_thread = None
+                    return
+                self._rebuild_pending = False
+
+            # Training runs outside the lock so the stream keeps using the old model.
+            try:
+                fingerprint = compute_db_fingerprint()
+                # Another process may already have published a gallery of this DB state.
+                if SHARED_GALLERY and self._adopt_gallery_file(expected_fingerprint=fingerprint):
+                    continue
+                recognizer, known_names, known_emp_ids = train_lbph_from_db()
+                error = None
+            except Exception as e:
+                recognizer, known_names, known_emp_ids = None, [], []
+                error = str(e)
+
+            gallery_file = None
+            if recognizer is not None:
+                recognizer, gallery_file = self._persist_rebuild(recognizer, known_names, known_emp_ids, fingerprint)
+
+            with self.lock:
+                self.recognizer = recognizer
+                self.known_names = known_names
+                self.known_emp_ids = known_emp_ids
+                self.last_error = error
+                self._gallery_file = gallery_file
+                self._snapshot_dirty = False
+                self.model_version += 1
+            if error:
+                print(f"Face model rebuild failed: {error}")
+            else:
+                print(f"Face model rebuilt ({len(known_names)} faces)")
+
+    def _persist_rebuild(self, recognizer, known_names: list[str], known_emp_ids: list[int], fingerprint: dict):
+        """Write the rebuilt model; returns ``(recognizer, gallery_file)`` to serve.
+
+        A published shared gallery is served from its mapping, so the private copy can be dropped.
+        """
+        try:
+            # Only persist if no employee changed while we were training.
+            if compute_db_fingerprint() != fingerprint:
+                return recognizer, None
+            if not SHARED_GALLERY:
+                write_snapshot(recognizer, known_names, known_emp_ids, fingerprint)
+                return recognizer, None
+            publish_lbph_gallery(recognizer, known_names, known_emp_ids, fingerprint)
+            loaded = load_lbph_from_gallery_file()
+            if loaded is not None and loaded[3] == fingerprint:
+                return loaded[0], loaded[4]
+        except Exception as e:
+            print(f"Could not write face model snapshot: {e}")
+        return recognizer, None
+
+    # --- Shared gallery file (several server processes) ---
+
+    def _adopt_gallery_file(self, expected_fingerprint: dict | None = None) -> bool:
+        """Serve the published shared gallery, if there is one (and it matches ``expected_fingerprint``)."""
+        try:
+            loaded = load_lbph_from_gallery_file()
+        except Exception as e:
+            self._gallery_failed = read_current(FACE_GALLERY_DIR)
+            print(f"Could not map shared face gallery: {e}")
+            return False
+        if loaded is None:
+            return False
+        recognizer, known_names, known_emp_ids, fingerprint, file_name = loaded
+        if expected_fingerprint is not None and fingerprint != expected_fingerprint:
+            return False
+
+        with self.lock:
+            self._initialized = True
+            self.recognizer = recognizer
+            self.known_names = known_names
+            self.known_emp_ids = known_emp_ids
+            self.last_error = None
+            self._snapshot_dirty = False
+            self._gallery_file = file_name
+            self.model_version += 1
+        print(f"Face model mapped from shared gallery {file_name} ({len(known_names)} faces)")
+        return True
+
+    def _poll_gallery_file(self) -> None:
+        """Switch to a gallery published by another process (rate-limited; lock held)."""
+        now = time.monotonic()
+        if now - self._gallery_checked < FACE_GALLERY_POLL_SECONDS or self.rebuilding:
+            return
+        self._gallery_checked = now
+        file_name = read_current(FACE_GALLERY_DIR)
+        if file_name is None or file_name in (self._gallery_file, self._gallery_failed):
+            return
+        self._adopt_gallery_file()
+
+    # --- Snapshot (startup / shutdown) ---
+
+    def load_snapshot(self) -> bool:
+        """Load the persisted model if it still matches the DB; otherwise rebuild in background."""
+        if SHARED_GALLERY:
+            try:
+                loaded = self._adopt_gallery_file(expected_fingerprint=compute_db_fingerprint())
+            except Exception as e:
+                print(f"Could not read shared face gallery: {e}")
+                loaded = False
+            if not loaded:
+                print("Shared face gallery missing or stale, rebuilding")
+                self.request_rebuild()
+            return loaded
+
+        try:
+            snapshot = read_snapshot(expected_fingerprint=compute_db_fingerprint())
+        except Exception as e:
+            print(f"Could not read face model snapshot: {e}")
+            snapshot = None
+
+        if snapshot is None:
+            print("Face model snapshot missing or stale, rebuilding")
+            self.request_rebuild()
+            return False
+
+        recognizer, known_names, known_emp_ids = snapshot
+        with self.lock:
+            self._initialized = True
+            self.recognizer = recognizer
+            self.known_names = known_names
+            self.known_emp_ids = known_emp_ids
+            self.last_error = None
+            self._snapshot_dirty = False
+            self.model_version += 1
+        print(f"Face model loaded from snapshot ({len(known_names)} faces)")
+        return True
+
+    def save_snapshot(self) -> None:
+        """Persist incremental updates (called on shutdown)."""
+        if SHARED_GALLERY:
+            # Incremental updates already scheduled a rebuild that publishes the shared file.
+            return
+        with self.lock:
+            if not self._snapshot_dirty or self.recognizer is None:
+                return
+            try:
+                write_snapshot(self.recognizer, self.known_names, self.known_emp_ids, compute_db_fingerprint())
+                self._snapshot_dirty = False
+            except Exception as e:
+                print(f"Could not write face model snapshot: {e}")
+
+    def export_for_workers(self, directory: str):
+        """Write the current model for worker processes (app.services.face_pool).
+
+        Returns ``(model_version, model_path)`` or ``None`` if no model is trained
+        yet. The file is only rewritten when the model changed; the label table
+        is stored next to it as ``<model_path>.names.json``. A model served from
+        the shared gallery file is not copied: workers map that file too.
+
+        The NumPy gallery is written outside ``self.lock`` (tens of MB for a
+        thousand faces), so predict() on the other doors does not wait for it.
+        """
+        # One export at a time; doors that need the same version wait here, not on self.lock.
+        with self._export_lock:
+            with self.lock:
+                if self.get() is None:
+                    return None
+                if self._gallery_file is not None:
+                    return self.model_version, os.path.join(FACE_GALLERY_DIR, self._gallery_file)
+                if self._exported is not None and self._exported[0] == self.model_version:
+                    return self._exported
+                version, known_names = self.model_version, self.known_names
+                if not isinstance(self.recognizer, LBPHGallery):
+                    # OpenCV's update() changes the model in place: write it under the lock.
+                    return self._write_worker_model(directory, self.recognizer, known_names, version)
+                # update() swaps the gallery's arrays instead of changing them, so this view
+                # stays the model of `version` after the lock is released.
+                recognizer = LBPHGallery.from_arrays(*self.recognizer.arrays, **self.recognizer.params)
+            return self._write_worker_model(directory, recognizer, known_names, version)
+
+    def _write_worker_model(self, directory: str, recognizer, known_names: list[str], version: int):
+        os.makedirs(directory, exist_ok=True)
+        model_path = os.path.join(directory, f"worker-lbph-{version}{LBPH_MODEL_SUFFIX}")
+        recognizer.write(model_path + ".tmp" + LBPH_MODEL_SUFFIX)
+        with open(model_path + ".names.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(known_names, f, ensure_ascii=False)
+        os.replace(model_path + ".names.json.tmp", model_path + ".names.json")
+        os.replace(model_path + ".tmp" + LBPH_MODEL_SUFFIX, model_path)
+
+        with self.lock:
+            previous = self._exported
+            self._exported = (version, model_path)
+        if previous is not None:
+            # Keep the previous version one round longer: a worker may have been sent it just now.
+            for name in os.listdir(directory):
+                if name.startswith("worker-lbph-") and not name.startswith(
+                    (os.path.basename(model_path), os.path.basename(previous[1]))
+                ):
+                    try:
+                        os.remove(os.path.join(directory, name))
+                    except OSError:
+                        pass
+        return version, model_path
+
+    def verification_model(self, emp_id: int) -> LBPHGallery | None:
+        """Gallery holding only employee ``emp_id``'s face templates, all with label 0, or ``None``.
+
+        Used for 1:1 verification after a QR scan: the probe is scored against the
+        claimed employee only, so the cost does not grow with the roster. Keyed on
+        emp_id, not the name: a namesake's templates must not verify the QR owner.
+        Cached until the model changes.
+        """
+        with self.lock:
+            if self.get() is None:
+                return None
+            if self._verification_version != self.model_version:
+                self._verification_cache = {}
+                self._verification_version = self.model_version
+            if emp_id in self._verification_cache:
+                return self._verification_cache[emp_id]
+
+            labels = [label for label, known in enumerate(self.known_emp_ids) if known == emp_id]
+            gallery = None
+            if labels and isinstance(self.recognizer, LBPHGallery):
+                gallery = self.recognizer.subset(labels, as_label=0)
+            elif labels:
+                # OpenCV LBPH: same histograms, exposed in training (= label) order.
+                histograms = self.recognizer.getHistograms()
+                gallery = LBPHGallery.from_histograms([histograms[i] for i in labels], [0] * len(labels))
+            self._verification_cache[emp_id] = gallery
+            return gallery
+
+    def emp_id_for_name(self, name: str) -> int | None:
+        """emp_id of the only employee called ``name`` in the model, ``None`` if unknown or ambiguous.
+
+        1:N identification only yields a name; namesakes cannot be told apart that way.
+        """
+        with self.lock:
+            emp_ids = {emp_id for known, emp_id in zip(self.known_names, self.known_emp_ids) if known == name}
+        return emp_ids.pop() if len(emp_ids) == 1 else None
+
+    def export_verifier_for_workers(self, directory: str, emp_id: int) -> str | None:
+        """Write employee ``emp_id``'s verification gallery for worker processes.
+
+        Returns the file path, or ``None`` if the employee has no templates. The
+        file is named after the model version and the emp_id, so it is written
+        once and workers can cache it by path; files of older versions are
+        removed, except the previous version's (a worker may still be sent one).
+        """
+        with self.lock:
+            version = self.model_version
+            gallery = self.verification_model(emp_id)
+        if gallery is None:
+            return None
+        path = os.path.join(directory, f"worker-verify-{version}-{emp_id}.npz")
+        if os.path.exists(path):
+            return path
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        gallery.write(tmp_path)
+        os.replace(tmp_path, path)
+        for name in os.listdir(directory):
+            if not name.startswith("worker-verify-"):
+                continue
+            try:
+                stale = int(name.split("-")[2]) < version - 1
+            except ValueError:
+                continue
+            if stale:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+        return path
+
+    # --- Change notifications (called after the DB commit) ---
+
+    def notify_face_added(self, name: str, face_200x200_gray: np.ndarray, emp_id: int) -> None:
+        """A face template was inserted (new employee, or another capture of an existing one)."""
+        with self.lock:
+            if self.recognizer is None or self.rebuilding:
+                # Nothing to update yet, or a rebuild may have read the DB before our commit.
+                self.request_rebuild()
+                return
+            label = len(self.known_names)
+            try:
+                self.recognizer.update([face_200x200_gray], np.array([label], dtype=np.int32))
+            except Exception as e:
+                print(f"Incremental face model update failed ({e}), rebuilding")
+                self.request_rebuild()
+                return
+            # New list object: callers may still hold a reference to the old one.
+            self.known_names = [*self.known_names, name or "Unknown"]
+            self.known_emp_ids = [*self.known_emp_ids, emp_id]
+            self._snapshot_dirty = True
+            self._gallery_file = None
+            self.model_version += 1
+            print(f"Face model updated with: {name}")
+            if SHARED_GALLERY:
+                # Republish for the other processes (and serve the shared mapping again).
+                self.request_rebuild()
+
+    def notify_employees_changed(self) -> None:
+        """Employees were deleted or their photos edited; labels must be rebuilt."""
+        self.request_rebuild()
+
+
+face_model_manager = FaceModelManager()
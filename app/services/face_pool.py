@@ -0,0 +1,246 @@
+"""app.services.face_pool
+
+Optional worker-process pool for face detection + LBPH recognition.
+
+With several doors, Haar detection, LBPH predict and the per-frame NumPy work
+all compete for one interpreter. When ``ACS_FACE_PROCESS_WORKERS`` > 0 the
+analysis threads hand frames to worker processes instead:
+
+- frames travel through pre-allocated `multiprocessing.shared_memory` slots
+  (one per in-flight frame), so only a slot name and a shape are pickled;
+- every worker keeps its own cascade and its own recognizer, loaded from the
+  file written by `FaceModelManager.export_for_workers` (or mapped from the
+  shared gallery file, see `app.services.face_gallery_file`) and reloaded when
+  the model version changes;
+- 1:1 verification galleries are files too (`FaceModelManager.export_verifier_for_workers`):
+  a frame only carries their path, and a worker loads each one once, without the full model;
+- workers run `detect_and_recognize` unchanged and return its result tuple.
+
+The pool starts lazily on first use and is shut down from the FastAPI lifespan.
+"""
+
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from app.core.config import (
+    FACE_MODEL_DIR,
+    FACE_PROCESS_SLOT_BYTES,
+    FACE_PROCESS_SLOT_TIMEOUT,
+    FACE_PROCESS_WORKERS,
+)
+
+# --- Worker process side ---
+
+_worker_shm: dict[str, shared_memory.SharedMemory] = {}
+_worker_model: dict = {"version": None, "recognizer": None, "names": []}
+_worker_verifiers: dict[str, object] = {}
+
+
+def _attach_slot(name: str) -> shared_memory.SharedMemory:
+    shm = _worker_shm.get(name)
+    if shm is None:
+        # Spawned workers share the parent's resource tracker, which unlinks the slot once at shutdown.
+        shm = shared_memory.SharedMemory(name=name)
+        _worker_shm[name] = shm
+    return shm
+
+
+def _worker_init() -> None:
+    import cv2
+
+    # One OpenCV thread per worker: parallelism comes from the processes.
+    cv2.setNumThreads(1)
+
+
+def _worker_detect(
+    slot: str,
+    shape: tuple,
+    model_version: int | None,
+    model_path: str | None,
+    threshold: float,
+    search_region=None,
+    downscale=1.0,
+    verifier=None,
+):
+    from app.services.face_gallery_file import is_gallery_file, map_gallery_file
+    from app.services.facial_recognition import _create_lbph_recognizer, detect_and_recognize
+    from app.services.lbph_gallery import LBPHGallery
+
+    if verifier is not None:
+        # 1:1 verification: the claimed employee's gallery, the full model is not needed.
+        verifier_path, name = verifier
+        recognizer = _worker_verifiers.get(verifier_path)
+        if recognizer is None:
+            recognizer = LBPHGallery()
+            recognizer.read(verifier_path)
+            if len(_worker_verifiers) >= 64:  # one file per (model version, employee)
+                _worker_verifiers.clear()
+            _worker_verifiers[verifier_path] = recognizer
+        names = [name]
+    else:
+        if _worker_model["version"] != model_version:
+            if is_gallery_file(model_path):
+                recognizer, names, _emp_ids, _fingerprint = map_gallery_file(model_path)
+            else:
+                recognizer = _create_lbph_recognizer()
+                recognizer.read(model_path)
+                with open(model_path + ".names.json", encoding="utf-8") as f:
+                    names = json.load(f)
+            _worker_model.update(version=model_version, recognizer=recognizer, names=names)
+        recognizer, names = _worker_model["recognizer"], _worker_model["names"]
+
+    shm = _attach_slot(slot)
+    frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    try:
+        return detect_and_recognize(
+            frame,
+            recognizer=recognizer,
+            known_names=names,
+            threshold=threshold,
+            search_region=search_region,
+            downscale=downscale,
+        )
+    finally:
+        del frame  # release the buffer export before the slot is reused
+
+
+# --- Server side ---
+
+class FaceProcessPool:
+    def __init__(
+        self,
+        workers: int,
+        model_dir: str = FACE_MODEL_DIR,
+        slot_bytes: int = FACE_PROCESS_SLOT_BYTES,
+        slot_timeout: float = FACE_PROCESS_SLOT_TIMEOUT,
+    ):
+        self.workers = max(1, workers)
+        self.model_dir = os.path.join(model_dir, "workers")
+        self.slot_bytes = slot_bytes
+        self.slot_timeout = slot_timeout
+        self._executor: ProcessPoolExecutor | None = None
+        self._slots: list[shared_memory.SharedMemory] = []
+        self._free: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.frames = 0
+        self.oversized = 0
+        self.errors = 0
+        self.last_latency = 0.0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                return
+            # spawn: workers must not inherit the server's threads / camera handles.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_worker_init,
+            )
+            # Two slots per worker so the next frame can be copied in while one is processed.
+            for _ in range(self.workers * 2):
+                shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes)
+                self._slots.append(shm)
+                self._free.put(shm)
+            print(f"Face process pool started ({self.workers} workers)")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            slots, self._slots = self._slots, []
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for shm in slots:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._free = queue.Queue()
+
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.dtype == np.uint8 and frame.nbytes <= self.slot_bytes
+
+    def detect_and_recognize(
+        self,
+        frame: np.ndarray,
+        model: tuple[int, str] | None,
+        threshold: float,
+        search_region=None,
+        downscale: float = 1.0,
+        verifier=None,
+    ):
+        """Same result as `facial_recognition.detect_and_recognize`, computed in a worker.
+
+        ``model`` is ``(model_version, model_path)`` from `FaceModelManager.export_for_workers`
+        (``None`` with a ``verifier``).
+        ``search_region`` / ``downscale`` are passed through (the tracker itself stays in
+        the server process). ``verifier`` is an optional ``(gallery_path, name)`` pair from
+        `FaceModelManager.export_verifier_for_workers`, used instead of the full model for
+        1:1 verification. Blocks the calling (analysis) thread until the worker answers;
+        raises `TimeoutError` (counted in ``errors``) when no slot frees up within
+        ``slot_timeout`` seconds.
+        """
+        if not self.fits(frame):
+            with self._lock:
+                self.oversized += 1
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes}-byte slot")
+
+        self.start()
+        started = time.monotonic()
+        try:
+            shm = self._free.get(timeout=self.slot_timeout)
+        except queue.Empty:
+            with self._lock:
+                self.errors += 1
+            raise TimeoutError(f"No free frame slot within {self.slot_timeout} s") from None
+        try:
+            np.ndarray(frame.shape, dtype=np.uint8, buffer=shm.buf)[...] = frame
+            future = self._executor.submit(
+                _worker_detect,
+                shm.name,
+                frame.shape,
+                *(model or (None, None)),
+                threshold,
+                search_region,
+                downscale,
+                verifier,
+            )
+            result = future.result()
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            self._free.put(shm)
+
+        with self._lock:
+            self.frames += 1
+            self.last_latency = time.monotonic() - started
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._executor is not None,
+                "frames": self.frames,
+                "oversized_frames": self.oversized,
+                "errors": self.errors,
+                "last_latency_ms": round(self.last_latency * 1000.0, 2),
+            }
+
+
+face_process_pool = FaceProcessPool(FACE_PROCESS_WORKERS) if FACE_PROCESS_WORKERS > 0 else None
@@ -0,0 +1,201 @@
+"""app.services.face_templates
+
+Face enrollment templates (``face_templates`` table).
+
+An employee can be enrolled from several captures (different days, lighting,
+glasses, ...). Each capture is one row with the normalised 200x200 face (JPEG, plus the raw
+grayscale pixels), a quality score and its LBPH histogram. Model loads never
+decode or resize a template: the NumPy matcher reads the stored histograms and
+the OpenCV recognizer trains on `np.frombuffer` views of the raw pixels. Rows
+missing either (backfilled from ``employees.emp_photo``, or stored with another
+histogram layout) are computed from the JPEG once and written back.
+
+Employees with a photo but no template row (added outside the admin API) still
+get their ``emp_photo`` as a single template.
+"""
+
+from __future__ import annotations
+
+import cv2
+import numpy as np
+from sqlalchemy import text
+
+from app.services.lbph_gallery import LBPHGallery
+
+# Feature extractor; histogram() keeps no state, so one instance serves every thread.
+_extractor = LBPHGallery()
+FEATURE_KIND = _extractor.feature_kind
+
+FACE_SHAPE = (200, 200)  # crop_and_normalize output
+FACE_RAW_BYTES = FACE_SHAPE[0] * FACE_SHAPE[1]
+
+# Quality = sharpness x contrast, each saturating at a level typical for a good capture.
+QUALITY_SHARPNESS = 300.0   # variance of the Laplacian
+QUALITY_CONTRAST = 40.0     # standard deviation of the gray levels
+
+# Templates in model label order (employee, then capture), plus employees that only have emp_photo.
+_TEMPLATE_ROWS_SQL = (
+    "SELECT t.id, e.emp_id, e.emp_name, t.face, t.face_raw, t.features, t.feature_kind, t.quality"
+    " FROM face_templates t JOIN employees e ON e.emp_id = t.emp_id"
+    " UNION ALL"
+    " SELECT NULL, e.emp_id, e.emp_name, e.emp_photo, NULL, NULL, NULL, NULL FROM employees e"
+    " WHERE e.emp_photo IS NOT NULL"
+    " AND NOT EXISTS (SELECT 1 FROM face_templates t WHERE t.emp_id = e.emp_id)"
+    " ORDER BY 2, 1"
+)
+
+
+def face_quality(face: np.ndarray) -> float:
+    """0..1 score of a normalised face: blurry or flat (badly lit) captures score low."""
+    sharpness = cv2.Laplacian(face, cv2.CV_64F).var()
+    contrast = float(face.std())
+    return round(min(1.0, sharpness / QUALITY_SHARPNESS) * min(1.0, contrast / QUALITY_CONTRAST), 3)
+
+
+def decode_face(blob: bytes) -> np.ndarray | None:
+    image = cv2.imdecode(np.frombuffer(blob, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None
+    # Templates are stored at 200x200 already; older photos may not be.
+    return cv2.resize(image, FACE_SHAPE[::-1])
+
+
+def raw_face(blob: bytes | None) -> np.ndarray | None:
+    """Read-only 200x200 view over stored raw pixels (no copy); None if absent or malformed."""
+    if blob is None or len(blob) != FACE_RAW_BYTES:
+        return None
+    return np.frombuffer(blob, dtype=np.uint8).reshape(FACE_SHAPE)
+
+
+def keep_photo_as_template(db, emp_id: int) -> None:
+    """Turn the employee's ``emp_photo`` into a template if they have none yet (as migration 5 does).
+
+    Call before adding a capture for an existing employee: once a template row
+    exists, ``emp_photo`` is no longer loaded as a fallback, so the original
+    enrollment would silently drop out of the gallery. The caller commits.
+    """
+    db.execute(
+        text(
+            "INSERT INTO face_templates (emp_id, face, created_at)"
+            " SELECT emp_id, emp_photo, COALESCE(created_at, CURRENT_TIMESTAMP) FROM employees e"
+            " WHERE emp_id = :emp_id AND emp_photo IS NOT NULL"
+            " AND NOT EXISTS (SELECT 1 FROM face_templates t WHERE t.emp_id = e.emp_id)"
+        ),
+        {"emp_id": emp_id},
+    )
+
+
+def add_face_template(db, emp_id: int, face: np.ndarray) -> dict:
+    """Insert one capture (normalised 200x200 gray face) for ``emp_id``; the caller commits."""
+    face = np.ascontiguousarray(face, dtype=np.uint8)
+    if face.shape != FACE_SHAPE:
+        raise ValueError(f"Expected a {FACE_SHAPE} face, got {face.shape}")
+    ok, buffer = cv2.imencode(".jpg", face)
+    if not ok:
+        raise RuntimeError("Could not encode face image")
+    quality = face_quality(face)
+    result = db.execute(
+        text(
+            "INSERT INTO face_templates (emp_id, face, face_raw, features, feature_kind, quality)"
+            " VALUES (:emp_id, :face, :face_raw, :features, :kind, :quality)"
+        ),
+        {
+            "emp_id": emp_id,
+            "face": buffer.tobytes(),
+            "face_raw": face.tobytes(),
+            "features": _extractor.histogram(face).tobytes(),
+            "kind": FEATURE_KIND,
+            "quality": quality,
+        },
+    )
+    return {"id": result.lastrowid, "quality": quality}
+
+
+def list_face_templates(db, emp_id: int) -> list[dict]:
+    rows = db.execute(
+        text("SELECT id, quality, created_at FROM face_templates WHERE emp_id = :emp_id ORDER BY id"),
+        {"emp_id": emp_id},
+    )
+    return [{"id": row[0], "quality": row[1], "created_at": row[2]} for row in rows]
+
+
+def delete_face_template(db, emp_id: int, template_id: int) -> bool:
+    result = db.execute(
+        text("DELETE FROM face_templates WHERE id = :id AND emp_id = :emp_id"),
+        {"id": template_id, "emp_id": emp_id},
+    )
+    return result.rowcount > 0
+
+
+def load_template_faces(db) -> tuple[list[np.ndarray], list[str], list[int]]:
+    """200x200 faces (read-only views over the fetched rows), employee names and ids, in model label order.
+
+    Templates without raw pixels are decoded once and written back (committed here).
+    """
+    faces: list[np.ndarray] = []
+    names: list[str] = []
+    emp_ids: list[int] = []
+    decoded = []
+    for template_id, emp_id, emp_name, face_blob, face_raw, *_ in db.execute(text(_TEMPLATE_ROWS_SQL)):
+        face = raw_face(face_raw)
+        if face is None:
+            face = decode_face(face_blob) if face_blob else None
+            if face is None:
+                continue
+            if template_id is not None:
+                decoded.append({"id": template_id, "face_raw": face.tobytes()})
+        faces.append(face)
+        names.append(emp_name or "Unknown")
+        emp_ids.append(emp_id)
+
+    if decoded:
+        db.execute(text("UPDATE face_templates SET face_raw = :face_raw WHERE id = :id"), decoded)
+        db.commit()
+        print(f"Stored raw faces for {len(decoded)} templates")
+    return faces, names, emp_ids
+
+
+def load_template_features(db) -> tuple[list[np.ndarray], list[str], list[int]]:
+    """LBPH histograms, employee names and ids in model label order, without decoding stored templates.
+
+    Missing features (and raw faces) are computed from the JPEG and written back (committed here).
+    """
+    histograms: list[np.ndarray] = []
+    names: list[str] = []
+    emp_ids: list[int] = []
+    computed = []
+    for template_id, emp_id, emp_name, face_blob, face_raw, features, kind, quality in db.execute(
+        text(_TEMPLATE_ROWS_SQL)
+    ):
+        if features and kind == FEATURE_KIND:
+            histogram = np.frombuffer(features, dtype=np.float32)
+        else:
+            face = raw_face(face_raw)
+            if face is None:
+                face = decode_face(face_blob) if face_blob else None
+            if face is None:
+                continue
+            histogram = _extractor.histogram(face)
+            if template_id is not None:
+                computed.append({
+                    "id": template_id,
+                    "face_raw": face.tobytes(),
+                    "features": histogram.tobytes(),
+                    "kind": FEATURE_KIND,
+                    "quality": quality if quality is not None else face_quality(face),
+                })
+        histograms.append(histogram)
+        names.append(emp_name or "Unknown")
+        emp_ids.append(emp_id)
+
+    if computed:
+        db.execute(
+            text(
+                "UPDATE face_templates SET face_raw = :face_raw, features = :features,"
+                " feature_kind = :kind, quality = :quality WHERE id = :id"
+            ),
+            computed,
+        )
+        db.commit()
+        print(f"Computed face features for {len(computed)} templates")
+    return histograms, names, emp_ids
@@ -0,0 +1,102 @@
+"""app.services.face_tracker
+
+Region-of-interest tracking for face detection.
+
+During a verification session the person stands in front of one camera and
+barely moves, yet Haar detection used to scan the whole 640x480 frame at every
+scale on each analysed frame. `FaceTracker` remembers the last face box and
+hands out a `SearchRegion`: the box expanded by a margin, with a narrow band of
+face sizes around the last one. `facial_recognition.detect_faces` then scans only
+that crop, at only those scales.
+
+A full-frame scan still runs every ``full_every`` analyses (someone else may
+have stepped in) and whenever the face is lost; `detect_and_recognize` retries
+the full frame immediately when the region comes back empty.
+"""
+
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class SearchRegion:
+    x: int
+    y: int
+    w: int
+    h: int
+    min_face: int   # smallest face side to look for (px, full-frame scale)
+    max_face: int   # largest face side to look for
+
+
+class FaceTracker:
+    def __init__(self, margin: float = 0.5, full_every: int = 10, size_band: tuple[float, float] = (0.7, 1.4)):
+        self.margin = margin
+        self.full_every = max(1, full_every)
+        self.size_band = size_band
+        self._lock = threading.Lock()
+        self._box: tuple[int, int, int, int] | None = None
+        self._since_full = 0
+        # Session the box belongs to (see reset()); results of earlier sessions are ignored.
+        self._session: int | None = None
+
+        # Metrics
+        self.full_scans = 0
+        self.roi_scans = 0
+        self.lost = 0
+
+    def search_region(self, frame_shape) -> SearchRegion | None:
+        """Where to look in the next frame; ``None`` means scan the full frame."""
+        frame_h, frame_w = frame_shape[:2]
+        with self._lock:
+            if self._box is None or self._since_full >= self.full_every:
+                self._since_full = 0
+                self.full_scans += 1
+                return None
+            self._since_full += 1
+            self.roi_scans += 1
+            x, y, w, h = self._box
+
+        side = max(w, h)
+        mx, my = int(w * self.margin), int(h * self.margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(frame_w, x + w + mx), min(frame_h, y + h + my)
+        return SearchRegion(
+            x0, y0, x1 - x0, y1 - y0,
+            min_face=int(side * self.size_band[0]),
+            max_face=int(side * self.size_band[1]),
+        )
+
+    def update(self, boxes, session: int | None = None) -> None:
+        """Feed back the ``(x, y, w, h)`` boxes found in the frame; the largest one is followed.
+
+        ``session`` is the session the frame was analysed in; boxes from a session
+        that `reset` has since replaced are dropped.
+        """
+        with self._lock:
+            if session is not None and self._session is not None and session != self._session:
+                return
+            if boxes:
+                self._box = tuple(int(v) for v in max(boxes, key=lambda b: b[2] * b[3])[:4])
+            elif self._box is not None:
+                self._box = None
+                self.lost += 1
+
+    def reset(self, session: int | None = None) -> None:
+        with self._lock:
+            self._box = None
+            self._since_full = 0
+            self._session = session
+
+    def stats(self) -> dict:
+        with self._lock:
+            scans = self.full_scans + self.roi_scans
+            return {
+                "tracking": self._box is not None,
+                "box": list(self._box) if self._box else None,
+                "full_scans": self.full_scans,
+                "roi_scans": self.roi_scans,
+                "roi_ratio": round(self.roi_scans / scans, 3) if scans else 0.0,
+                "lost": self.lost,
+            }
@@ -4,10 +4,16 @@ Face recognition for access control.
 
 Two usage styles:
 - CLI (run this file): enroll / recognize using OpenCV windows.
-- Server/video streaming: call `recognize_and_annotate_frame(...)` on frames.
+- Server/video streaming: call `recognize_and_annotate_frame(...)` on frames, or
+  `detect_and_recognize(...)` + `draw_face_detections(...)` to analyse a frame on
+  one thread and draw the result on another.
+- Both accept a search region from `app.services.face_tracker.FaceTracker`, so
+  consecutive frames only scan around the last face instead of the full frame.
 
 Important:
-- LBPH recognizer is in `cv2.face` and requires `opencv-contrib-python`.
+- The recognizer is OpenCV's LBPH from `cv2.face`, which requires `opencv-contrib-python`
+  (``ACS_FACE_MATCHER=opencv``, default), or `app.services.lbph_gallery.LBPHGallery`
+  (``ACS_FACE_MATCHER=numpy``). Both compute the same features and distances.
 """
 
 from __future__ import annotations
@@ -20,38 +26,121 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 import time
+from contextlib import nullcontext
 
 import cv2
 import numpy as np
 from sqlalchemy import text
 
+from app.core.config import (
+    FACE_DETECTOR_BACKEND,
+    FACE_DETECTOR_CONFIDENCE,
+    FACE_DETECTOR_CONFIG,
+    FACE_DETECTOR_MODEL,
+    FACE_GALLERY_DIR,
+    FACE_MATCHER,
+)
 from app.core.database import SessionLocal
+from app.services.face_detectors import HAAR_CASCADE_PATH, create_face_detector
+from app.services.face_gallery_file import map_gallery_file, read_current, write_gallery_file
+from app.services.face_tracker import FaceTracker, SearchRegion
+from app.services.face_templates import (
+    add_face_template,
+    keep_photo_as_template,
+    load_template_faces,
+    load_template_features,
+)
+from app.services.lbph_gallery import LBPHGallery
+
+
+def _load_face_detector():
+    try:
+        return create_face_detector(
+            FACE_DETECTOR_BACKEND, FACE_DETECTOR_MODEL, FACE_DETECTOR_CONFIG, FACE_DETECTOR_CONFIDENCE
+        )
+    except Exception as e:
+        print(f"Face detector {FACE_DETECTOR_BACKEND!r} unavailable ({e}), using the Haar cascade")
+        return cv2.CascadeClassifier(HAAR_CASCADE_PATH)
+
+
+# Haar / LBP cascade or DNN model, all with the cascade `detectMultiScale` API (see face_detectors).
+FACE_CASCADE = _load_face_detector()
 
-CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-FACE_CASCADE = cv2.CascadeClassifier(CASCADE_PATH)
+# Smallest image side the cascades can work on (their training window is 24x24).
+CASCADE_WINDOW = 24
+# Uploaded photos are searched at most at this size; the face is cut from the original.
+CROP_DETECT_MAX_SIDE = 640
 
 
 def _lbph_available() -> bool:
     return hasattr(cv2, "face") and hasattr(cv2.face, "LBPHFaceRecognizer_create")
 
 
+# Model file extension for snapshots / worker exports of the configured recognizer.
+LBPH_MODEL_SUFFIX = ".npz" if FACE_MATCHER == "numpy" else ".yml"
+
+
 def _create_lbph_recognizer():
+    if FACE_MATCHER == "numpy":
+        return LBPHGallery()
     if not _lbph_available():
         raise RuntimeError(
             "OpenCV LBPH is not available (cv2.face missing). "
-            "Install opencv-contrib-python and uninstall opencv-python/opencv-python-headless."
+            "Install opencv-contrib-python and uninstall opencv-python/opencv-python-headless, "
+            "or set ACS_FACE_MATCHER=numpy."
         )
     return cv2.face.LBPHFaceRecognizer_create()
 
 
+def detect_faces(
+    gray: np.ndarray,
+    scale_factor: float = 1.3,
+    min_neighbors: int = 5,
+    min_size: int = 100,
+    region: SearchRegion | None = None,
+    downscale: float = 1.0,
+) -> list[tuple[int, int, int, int]]:
+    """Face detection in ``region`` (or the whole image), optionally on a downscaled copy.
+
+    ``downscale`` < 1 scans a smaller pyramid level (e.g. 0.5 = a quarter of the
+    pixels). Boxes are always returned in full-image coordinates.
+    """
+    offset_x = offset_y = 0
+    max_size = 0
+    if region is not None:
+        offset_x, offset_y = region.x, region.y
+        gray = gray[region.y : region.y + region.h, region.x : region.x + region.w]
+        min_size = max(min_size, region.min_face)
+        max_size = region.max_face
+
+    if downscale < 1.0:
+        gray = cv2.resize(gray, None, fx=downscale, fy=downscale, interpolation=cv2.INTER_AREA)
+        min_size = int(min_size * downscale)
+        max_size = int(max_size * downscale)
+
+    min_size = max(CASCADE_WINDOW, min_size)
+    if min(gray.shape[:2]) < min_size:
+        return []
+    kwargs = {"minSize": (min_size, min_size)}
+    if max_size >= min_size:
+        kwargs["maxSize"] = (max_size, max_size)
+    faces = FACE_CASCADE.detectMultiScale(gray, scale_factor, min_neighbors, **kwargs)
+
+    return [
+        (int(x / downscale) + offset_x, int(y / downscale) + offset_y, int(w / downscale), int(h / downscale))
+        for (x, y, w, h) in faces
+    ]
+
+
 def crop_and_normalize(image: np.ndarray) -> np.ndarray:
     if len(image.shape) == 3:
         gray_img = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     else:
         gray_img = image
    
-    # Wykrywanie twarzy
-    faces = FACE_CASCADE.detectMultiScale(gray_img, 1.1, 5, minSize=(60, 60))
+    # Wykrywanie twarzy (duże zdjęcia przeszukujemy w zmniejszonej kopii)
+    downscale = min(1.0, CROP_DETECT_MAX_SIDE / max(gray_img.shape[:2]))
+    faces = detect_faces(gray_img, 1.1, 5, min_size=60, downscale=downscale)
     
     if len(faces) > 0:
         # Wybierz największą twarz (najbliższą kamery)
@@ -69,75 +158,95 @@ def crop_and_normalize(image: np.ndarray) -> np.ndarray:
 
 
 def load_faces_from_db():
+    """200x200 face templates and employee names (labels = list positions)."""
     db = SessionLocal()
-    faces: list[np.ndarray] = []
-    names: list[str] = []
     try:
-        # Pobieramy tylko te wiersze, które mają zdjęcie
-        result = db.execute(text("SELECT emp_name, emp_photo FROM employees WHERE emp_photo IS NOT NULL"))
-        for emp_name, emp_photo in result:
-            if not emp_photo: continue
-            
-            # Dekodowanie BLOBa do obrazu
-            img_array = np.frombuffer(emp_photo, dtype=np.uint8)
-            img = cv2.imdecode(img_array, cv2.IMREAD_GRAYSCALE)
-            
-            if img is None: continue
-            
-            # Tutaj zakładamy, że w bazie są już "gotowe maski", 
-            # ale dla pewności możemy przepuścić przez normalizację
-            try:
-                # Jeśli zdjęcie w bazie jest już 200x200, resize nic nie zepsuje
-                face = cv2.resize(img, (200, 200)) 
-                faces.append(face)
-                names.append(emp_name or "Unknown")
-            except Exception:
-                pass
+        # Kilka szablonów na pracownika (face_templates); pracownicy bez szablonów -> emp_photo
+        faces, names, _emp_ids = load_template_faces(db)
         return faces, names
     finally:
         db.close()
 
 
 def train_lbph_from_db():
-    known_faces, known_names = load_faces_from_db()
-    if len(known_faces) == 0:
+    """Return ``(recognizer, known_names, known_emp_ids)``; label i is template i of employee known_emp_ids[i]."""
+    db = SessionLocal()
+    try:
+        if FACE_MATCHER == "numpy":
+            # Zapisane histogramy zamiast dekodowania JPEG i liczenia cech od nowa
+            histograms, known_names, known_emp_ids = load_template_features(db)
+        else:
+            known_faces, known_names, known_emp_ids = load_template_faces(db)
+    finally:
+        db.close()
+    if len(known_names) == 0:
         raise RuntimeError("No faces in database. Add users with emp_photo first.")
 
-    recognizer = _create_lbph_recognizer()
     labels = np.arange(len(known_names), dtype=np.int32)
+    if FACE_MATCHER == "numpy":
+        return LBPHGallery.from_histograms(histograms, labels), known_names, known_emp_ids
+    recognizer = _create_lbph_recognizer()
     recognizer.train(known_faces, labels)
-    return recognizer, known_names
+    return recognizer, known_names, known_emp_ids
+
+
+def publish_lbph_gallery(
+    recognizer, known_names, known_emp_ids, fingerprint: dict, directory: str = FACE_GALLERY_DIR
+) -> str:
+    """Write the gallery to the shared memory-mapped file other processes load (numpy matcher only)."""
+    if not isinstance(recognizer, LBPHGallery):
+        raise RuntimeError("The shared face gallery file needs ACS_FACE_MATCHER=numpy")
+    return write_gallery_file(directory, recognizer, known_names, known_emp_ids, fingerprint)
+
+
+def load_lbph_from_gallery_file(directory: str = FACE_GALLERY_DIR):
+    """Map the published gallery read-only, shared with every process that maps it.
+
+    Returns ``(recognizer, known_names, known_emp_ids, fingerprint, file_name)`` or ``None`` if nothing is published.
+    """
+    file_name = read_current(directory)
+    if file_name is None:
+        return None
+    # Bez kopiowania: tablice galerii to widoki na zmapowany plik
+    recognizer, known_names, known_emp_ids, fingerprint = map_gallery_file(os.path.join(directory, file_name))
+    return recognizer, known_names, known_emp_ids, fingerprint, file_name
 
 
 def save_face_to_db(name: str, face_image: np.ndarray):
-    """Save/update a face photo in the database for the given name."""
+    """Add a face template for the given name; creates the employee if there is none."""
     db = SessionLocal()
     try:
-        ok, buffer = cv2.imencode(".jpg", face_image)
-        if not ok:
-            raise RuntimeError("Could not encode face image")
-
         existing = db.execute(
             text("SELECT emp_id FROM employees WHERE emp_name = :name ORDER BY emp_id DESC LIMIT 1"),
             {"name": name},
         ).first()
 
         if existing:
-            db.execute(
-                text("UPDATE employees SET emp_photo = :photo WHERE emp_id = :id"),
-                {"photo": buffer.tobytes(), "id": existing[0]},
-            )
+            emp_id = existing[0]
+            keep_photo_as_template(db, emp_id)
         else:
-            db.execute(
+            ok, buffer = cv2.imencode(".jpg", face_image)
+            if not ok:
+                raise RuntimeError("Could not encode face image")
+            emp_id = db.execute(
                 text("INSERT INTO employees (emp_name, emp_photo) VALUES (:name, :photo)"),
                 {"name": name, "photo": buffer.tobytes()},
-            )
+            ).lastrowid
+        add_face_template(db, emp_id, face_image)
 
         db.commit()
         print(f"✓ Saved face for: {name}")
     finally:
         db.close()
 
+    # Imported lazily: face_model depends on this module.
+    from app.services.face_model import face_model_manager
+    from app.services.qr_index import qr_index
+
+    face_model_manager.notify_face_added(name, face_image, emp_id)
+    if not existing:
+        qr_index.invalidate()
+
 
 def enroll_face(name: str):
     """Capture a face from webcam and save to database."""
@@ -157,7 +266,7 @@ def enroll_face(name: str):
                 break
 
             gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = FACE_CASCADE.detectMultiScale(gray, 1.3, 5, minSize=(100, 100))
+            faces = detect_faces(gray, 1.3, 5, min_size=100)
 
             for (x, y, w, h) in faces:
                 cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
@@ -189,18 +298,32 @@ def enroll_face(name: str):
         cap.release()
         cv2.destroyAllWindows()
 
-def recognize_and_annotate_frame(frame_bgr, recognizer, known_names, threshold=90.0, now=None):
-    if now is None: now = time.time()
-    
+def detect_and_recognize(
+    frame_bgr, recognizer, known_names, threshold=90.0, predict_lock=None, search_region=None, downscale=1.0
+):
+    """Detect faces and run LBPH predict without drawing on the frame.
+
+    Returns ``(final_name, best_conf, detections, face_count)`` where ``detections``
+    is a list of ``(x, y, w, h, display_name, confidence)`` tuples for
+    `draw_face_detections`. The frame is only read, so a shared read-only frame is fine.
+    When ``predict_lock`` is given only ``recognizer.predict`` runs under it, so
+    several cameras can run detection on a shared model in parallel.
+    ``search_region`` (from `FaceTracker.search_region`) limits detection to the area
+    around the last face; if nothing is found there the full frame is scanned.
+    """
     gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
 
-    faces = FACE_CASCADE.detectMultiScale(gray, 1.3, 5, minSize=(100, 100))
+    faces = detect_faces(gray, 1.3, 5, min_size=100, region=search_region, downscale=downscale)
+    if not faces and search_region is not None:
+        # Twarz wyszła z ROI -> od razu pełna klatka
+        faces = detect_faces(gray, 1.3, 5, min_size=100, downscale=downscale)
     
     # Liczba wykrytych twarzy (używane w video.py do logowania prób)
     face_count = len(faces)
     
     best_name = "Unknown"
     best_conf = 999.0
+    detections = []
 
     for (x, y, w, h) in faces:
         try:
@@ -213,25 +336,49 @@ def recognize_and_annotate_frame(frame_bgr, recognizer, known_names, threshold=9
             face_img = cv2.resize(face_roi, (200, 200))
 
             # 3. Predykcja
-            label, confidence = recognizer.predict(face_img)
+            with predict_lock or nullcontext():
+                label, confidence = recognizer.predict(face_img)
             
             if confidence < best_conf:
                 best_conf = confidence
                 if 0 <= label < len(known_names):
                     best_name = known_names[label]
 
-            # Rysowanie
-            color = (0, 255, 0) if confidence < threshold else (0, 0, 255)
             text_name = best_name if confidence < threshold else "Unknown"
-            text = f"{text_name} ({confidence:.1f})"
-            cv2.rectangle(frame_bgr, (x, y), (x + w, y + h), color, 2)
-            cv2.putText(frame_bgr, text, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+            detections.append((int(x), int(y), int(w), int(h), text_name, float(confidence)))
             
         except Exception as e:
             print(f"Błąd przetwarzania twarzy: {e}")
             continue
     final_name = best_name if best_conf < threshold else "Unknown"
 
+    return final_name, best_conf, detections, face_count
+
+
+def draw_face_detections(frame_bgr, detections, threshold=90.0):
+    """Draw boxes/labels returned by `detect_and_recognize` onto a writable frame."""
+    for (x, y, w, h, text_name, confidence) in detections:
+        color = (0, 255, 0) if confidence < threshold else (0, 0, 255)
+        text = f"{text_name} ({confidence:.1f})"
+        cv2.rectangle(frame_bgr, (x, y), (x + w, y + h), color, 2)
+        cv2.putText(frame_bgr, text, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+    return frame_bgr
+
+
+def recognize_and_annotate_frame(frame_bgr, recognizer, known_names, threshold=90.0, now=None, tracker=None):
+    if now is None: now = time.time()
+
+    final_name, best_conf, detections, face_count = detect_and_recognize(
+        frame_bgr,
+        recognizer,
+        known_names,
+        threshold=threshold,
+        search_region=tracker.search_region(frame_bgr.shape) if tracker else None,
+    )
+    if tracker:
+        tracker.update([d[:4] for d in detections])
+    draw_face_detections(frame_bgr, detections, threshold=threshold)
+
     return final_name, best_conf, frame_bgr, face_count
 
 
@@ -239,7 +386,7 @@ def recognize_faces():
     """Start webcam and recognize faces from database (OpenCV window)."""
     print("Loading faces from database...")
     try:
-        recognizer, known_names = train_lbph_from_db()
+        recognizer, known_names, _emp_ids = train_lbph_from_db()
     except Exception as e:
         print(f"Error: {e}")
         return
@@ -253,9 +400,7 @@ def recognize_faces():
         return
 
     threshold = 80.0
-    last_name = "Unknown"
-    last_conf = 999.0
-    last_seen = 0.0
+    tracker = FaceTracker()
 
     try:
         while True:
@@ -268,11 +413,9 @@ def recognize_faces():
                 recognizer=recognizer,
                 known_names=known_names,
                 threshold=threshold,
-                last_state=(last_name, last_conf, last_seen),
                 now=time.time(),
+                tracker=tracker,
             )
-            if name != "Unknown":
-                last_name, last_conf, last_seen = name, conf, time.time()
 
             cv2.imshow("Access Control - Face Recognition", annotated)
             if cv2.waitKey(1) & 0xFF == ord("q"):
@@ -5,18 +5,28 @@ import qrcode
 from qrcode.image.pure import PyPNGImage
 
 
-def build_qr_payload(name: str) -> str:
+def build_qr_payload(name: str, token: str | None = None) -> str:
     """Build QR payload as: <name>|<random_hash>.
 
-    The random part is intentionally not used for DB lookup right now; lookup uses
-    the name prefix so older QR codes without the separator still work.
+    The random part is stored as `employees.qr_token` and is what the lookup
+    uses; the name prefix is only a fallback for older QR codes without it.
+    Pass the stored ``token`` to reprint an existing employee's badge.
     """
-    random_hash = secrets.token_hex(8)  # 16 hex chars
+    random_hash = token or secrets.token_hex(8)  # 16 hex chars
     return f"{name}|{random_hash}"
 
 
-def generate_qr_code_blob(name: str) -> bytes:
-    payload = build_qr_payload(name)
+def qr_payload_token(payload: str | None) -> str | None:
+    """Return the random hash part of a payload, or None for name-only QR codes."""
+    parts = (payload or "").split("|", 1)
+    if len(parts) < 2:
+        return None
+    return parts[1].strip() or None
+
+
+def generate_qr_code_blob(name: str, payload: str | None = None) -> bytes:
+    if payload is None:
+        payload = build_qr_payload(name)
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -34,8 +44,9 @@ def generate_qr_code_blob(name: str) -> bytes:
     return buffer.getvalue()
 
 
-def generate_qr_code_file(name: str, filepath: str) -> None:
-    payload = build_qr_payload(name)
+def generate_qr_code_file(name: str, filepath: str, payload: str | None = None) -> None:
+    if payload is None:
+        payload = build_qr_payload(name)
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -0,0 +1,220 @@
+"""app.services.qr_index
+
+In-memory lookup of QR payloads to employees.
+
+The employees table is loaded once (and again after `invalidate()`, which the
+admin endpoints call after every write), so validating a decoded QR code is a
+dictionary hit instead of a database round-trip. Recently decoded payloads are
+additionally kept in a short debounce cache, which covers the case of a badge
+being held in front of the camera for several seconds.
+
+Payloads are resolved by their random part (`employees.qr_token`, unique).
+The name prefix is only used for employees that have no token yet (QR codes
+generated before tokens existed), so duplicate names no longer collide.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from app.core.database import SessionLocal
+from app.services.qr_generator import qr_payload_token
+
+
+def qr_payload_name(qr_text: str | None) -> str:
+    # QR payload format: "<name>|<random_hash>" (older QR codes may be just "<name>")
+    return (qr_text or "").split("|", 1)[0].strip()
+
+
+def find_employee_by_token(db, token: str):
+    """Indexed lookup on `employees.qr_token`; returns ``(emp_id, emp_name)`` or None."""
+    return db.execute(
+        text("SELECT emp_id, emp_name FROM employees WHERE qr_token = :token"),
+        {"token": token},
+    ).first()
+
+
+def backfill_qr_tokens() -> int:
+    """Fill `qr_token` for rows created before the column existed.
+
+    Decodes the stored `emp_qr_code` PNG and keeps the random part of its payload.
+    Returns the number of rows updated.
+    """
+    import cv2
+    import numpy as np
+    from pyzbar.pyzbar import decode
+
+    db = SessionLocal()
+    updated = 0
+    try:
+        rows = db.execute(
+            text("SELECT emp_id, emp_qr_code FROM employees WHERE qr_token IS NULL AND emp_qr_code IS NOT NULL")
+        ).fetchall()
+        for emp_id, qr_png in rows:
+            img = cv2.imdecode(np.frombuffer(qr_png, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if img is None:
+                continue
+            token = None
+            for obj in decode(img):
+                token = qr_payload_token(obj.data.decode("utf-8", errors="replace"))
+                if token:
+                    break
+            if not token:
+                continue
+            try:
+                db.execute(
+                    text("UPDATE employees SET qr_token = :token WHERE emp_id = :id"),
+                    {"token": token, "id": emp_id},
+                )
+                db.commit()
+                updated += 1
+            except IntegrityError:
+                db.rollback()
+                print(f"QR token of employee {emp_id} already used by another row, skipped")
+        if updated:
+            print(f"Backfilled qr_token for {updated} employees")
+        return updated
+    finally:
+        db.close()
+
+
+class QrIndex:
+    def __init__(self, debounce_seconds: float = 2.0, max_payloads: int = 4096):
+        self.debounce_seconds = debounce_seconds
+        self.max_payloads = max_payloads
+        self._lock = threading.Lock()
+        self._by_name: dict[str, dict] | None = None
+        self._by_token: dict[str, dict] = {}
+        self._by_payload: dict[str, dict] = {}
+        self._recent: dict[str, tuple[float, dict | None]] = {}
+        # Bumped by invalidate(): results read from the DB before it are not installed.
+        self._generation = 0
+
+        # Metrics
+        self.loads = 0
+        self.debounce_hits = 0
+
+    def load(self) -> None:
+        """(Re)load the name index from the employees table."""
+        with self._lock:
+            generation = self._generation
+        db = SessionLocal()
+        try:
+            rows = db.execute(
+                text("SELECT emp_id, emp_name, qr_token FROM employees WHERE emp_name IS NOT NULL ORDER BY emp_id")
+            ).fetchall()
+        finally:
+            db.close()
+
+        by_name: dict[str, dict] = {}
+        by_token: dict[str, dict] = {}
+        for emp_id, emp_name, qr_token in rows:
+            record = {"emp_id": emp_id, "emp_name": emp_name, "has_token": qr_token is not None}
+            # Duplicate names: the newest row wins (same as ORDER BY emp_id DESC LIMIT 1).
+            by_name[emp_name] = record
+            if qr_token:
+                by_token[qr_token] = record
+
+        with self._lock:
+            if self._generation != generation:
+                return  # invalidated while we were reading: these rows may already be stale
+            self._by_name = by_name
+            self._by_token = by_token
+            self._by_payload = {}
+            self._recent = {}
+            self.loads += 1
+
+    def invalidate(self) -> None:
+        """Drop everything; the next lookup reloads from the database."""
+        with self._lock:
+            self._generation += 1
+            self._by_name = None
+            self._by_token = {}
+            self._by_payload = {}
+            self._recent = {}
+
+    def _resolve(self, qr_text: str) -> dict | None:
+        token = qr_payload_token(qr_text)
+        if token:
+            record = self._by_token.get(token)
+            if record is not None:
+                return record
+        # Name fallback only for employees whose badge predates qr_token.
+        record = self._by_name.get(qr_payload_name(qr_text))
+        if record is not None and not record["has_token"]:
+            return record
+        return None
+
+    def lookup(self, qr_text: str | None) -> dict | None:
+        """Return ``{"emp_id", "emp_name", ...}`` for a decoded QR payload, or ``None``."""
+        if not qr_text:
+            return None
+        now = time.monotonic()
+
+        with self._lock:
+            recent = self._recent.get(qr_text)
+            if recent is not None and recent[0] > now:
+                self.debounce_hits += 1
+                return recent[1]
+            loaded = self._by_name is not None
+
+        if not loaded:
+            self.load()
+
+        with self._lock:
+            if self._by_name is None:
+                return None  # invalidated concurrently; do not cache a false miss
+            generation = self._generation
+            record = self._by_payload.get(qr_text) or self._resolve(qr_text)
+
+        token = qr_payload_token(qr_text)
+        if record is None and token:
+            # Token unknown to the cache (e.g. row inserted by generate_qr_codes.py
+            # in another process): one indexed query, then it is cached.
+            db = SessionLocal()
+            try:
+                row = find_employee_by_token(db, token)
+            finally:
+                db.close()
+            if row is not None:
+                record = {"emp_id": row[0], "emp_name": row[1], "has_token": True}
+
+        with self._lock:
+            if self._generation != generation:
+                return None  # invalidated during the lookup; the record may be a deleted employee
+            if record is not None:
+                if token and record["has_token"]:
+                    self._by_token[token] = record
+                if len(self._by_payload) < self.max_payloads:
+                    self._by_payload[qr_text] = record
+
+            if len(self._recent) >= self.max_payloads:
+                self._recent = {k: v for k, v in self._recent.items() if v[0] > now}
+            self._recent[qr_text] = (now + self.debounce_seconds, record)
+            return record
+
+    def employee_by_name(self, emp_name: str) -> dict | None:
+        with self._lock:
+            loaded = self._by_name is not None
+        if not loaded:
+            self.load()
+        with self._lock:
+            return (self._by_name or {}).get(emp_name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self._by_name is not None,
+                "employees": len(self._by_name or {}),
+                "tokens": len(self._by_token),
+                "payloads": len(self._by_payload),
+                "loads": self.loads,
+                "debounce_hits": self.debounce_hits,
+            }
+
+
+qr_index = QrIndex()
@@ -1,3 +1,4 @@
+import asyncio
 import threading
 import cv2
 import numpy as np
@@ -5,10 +6,31 @@ import time
 import platform
 from enum import Enum
 from pyzbar.pyzbar import decode
-from sqlalchemy import text, insert
-from app.core.database import SessionLocal
-from app.services.facial_recognition import train_lbph_from_db, recognize_and_annotate_frame
-from app.models.qr_image import unauthorized_access, good_entries
+from app.core.config import (
+    ANALYSIS_EVERY_N_FRAMES,
+    ANALYSIS_MAX_HZ,
+    ANALYSIS_WORKERS,
+    DOORS,
+    FACE_DETECT_DOWNSCALE,
+    FACE_MAX_FAILED_ATTEMPTS,
+    FACE_VERIFICATION_MODE,
+    FACE_VERIFY_THRESHOLD,
+    FACE_TRACK_FULL_EVERY,
+    FACE_TRACK_MARGIN,
+    OPENCV_THREADS,
+    STREAM_QUEUE_SIZE,
+    STREAM_TARGET_FPS,
+)
+from app.services.facial_recognition import detect_and_recognize, draw_face_detections
+from app.services.face_model import face_model_manager
+from app.services.face_pool import face_process_pool
+from app.services.face_tracker import FaceTracker
+from app.services.qr_index import qr_index
+from app.services.audit import audit_writer
+from app.services.capture import FrameGrabber
+from app.services.doors import DEFAULT_DOOR_ID, DoorRegistry, balance_opencv_threads, parse_door_sources
+from app.services.events import StateEventHub, format_sse
+from app.services.analysis import AnalysisResult, FaceDetection, FrameAnalyzer, QrDetection
 
 class CameraState(Enum):
     IDLE = "IDLE"
@@ -17,18 +39,27 @@ class CameraState(Enum):
     ACCESS_GRANTED = "ACCESS_GRANTED"
     ACCESS_DENIED = "ACCESS_DENIED"
 
+# Próg pewności LBPH (mniej = lepiej) i jak długo rysujemy ostatni wynik analizy.
+FACE_THRESHOLD = 80.0
+RESULT_OVERLAY_TTL = 1.0
+
 class VideoCamera:
-    def __init__(self):
-        self.video = None
+    def __init__(self, door_id: str = DEFAULT_DOOR_ID, source: int | str | None = None):
         self.lock = threading.Lock()
+        self.door_id = door_id
+        
+        # --- KAMERA: osobny wątek przechwytywania, tu tylko czytamy ostatnią klatkę ---
+        # source=None -> pierwsze dwa urządzenia lokalne (0/1); inaczej indeks, plik albo URL strumienia
+        self.grabber = FrameGrabber(source)
+        self._stream_seq = 0
         
-        # --- PRÓBA OTWARCIA KAMERY (Skanowanie indeksów) ---
         # --- STAN SYSTEMU ---
         self.state = CameraState.IDLE
         self.state_start_time = 0
         
         # --- DANE SESJI ---
         self.target_employee = None
+        self.target_emp_id = None
         self.verified_employee = None
         self.last_qr_text = None
         
@@ -41,72 +72,94 @@ class VideoCamera:
         self.face_failed_attempts = 0
         self.unauthorized_logged = False
         
-        # Cache
-        self.last_detection_time = 0
-        self.face_model = None
-        self.face_model_loaded_at = 0.0
+        # Analiza w tle: co N klatek (albo max X Hz), wyniki trafiają do maszyny stanów
         self.frame_count = 0
-        self.process_every_n_frames = 4
-
-        self.last_open_attempt_time = 0
-        
-    def _open_camera(self):
-        """Prywatna metoda do otwierania kamery."""
-        # Zabezpieczenie przed spamowaniem próbami otwarcia (max raz na 2 sekundy)
-        if time.time() - self.last_open_attempt_time < 2.0:
-            return
+        self.process_every_n_frames = ANALYSIS_EVERY_N_FRAMES
+        self.session_id = 0
+        self.last_result = None
+        self.analyzer = FrameAnalyzer(
+            self._analyze_frame,
+            self._apply_analysis_result,
+            every_n_frames=self.process_every_n_frames,
+            max_hz=ANALYSIS_MAX_HZ,
+            max_workers=ANALYSIS_WORKERS,
+        )
+        # Po znalezieniu twarzy kolejne klatki przeszukujemy tylko wokół niej
+        self.face_tracker = FaceTracker(margin=FACE_TRACK_MARGIN, full_every=FACE_TRACK_FULL_EVERY)
 
-        self.last_open_attempt_time = time.time()
-        backend =  cv2.CAP_ANY
-        
-        # Próbujemy tylko /dev/video0 dla uproszczenia (lub pętlą jeśli wolisz)
-        for index in range(2): 
-            cap = cv2.VideoCapture(index, backend)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret and frame is not None and frame.size > 0:
-                    print(f"Kamera otwarta (index={index})")
-                    self.video = cap
-                    return
-                else:
-                    cap.release()
+        # Przejścia maszyny stanów wypychane do stron kiosku (SSE /api/events)
+        self.events = StateEventHub()
+        self._publish_state()
         
-        print("Nie udało się otworzyć kamery (Auto-Retry)")
+    def release(self):
+        self.grabber.stop()
+        self.analyzer.shutdown()
 
     def __del__(self):
-            if self.video.isOpened():
-                self.video.release()
+        self.release()
 
     def reset_to_idle(self):
         with self.lock:
             self._reset_session_state()
             self.state = CameraState.IDLE
             self.state_start_time = time.time()
+            self._publish_state()
             print("Camera reset to IDLE state")
     def start_qr_scanning(self):
         with self.lock:
             self._reset_session_state()
             self.state = CameraState.QR_SCANNING
             self.state_start_time = time.time()
+            self._publish_state()
             print("Started QR scanning mode")
         
-    def set_target_employee(self, employee_name: str):
+    def set_target_employee(self, employee_name: str, emp_id: int | None = None):
         with self.lock:
-            self.target_employee = employee_name
-            self.state = CameraState.FACE_VERIFICATION
-            self.face_failed_attempts = 0
-            self.state_start_time = time.time()
-            print(f"Target employee set to: {employee_name}, switched to FACE_VERIFICATION mode")
+            self._set_target_employee(employee_name, emp_id)
+
+    def _set_target_employee(self, employee_name: str, emp_id: int | None = None):
+        self.target_employee = employee_name
+        self.target_emp_id = emp_id
+        self.state = CameraState.FACE_VERIFICATION
+        self.face_failed_attempts = 0
+        self.state_start_time = time.time()
+        self._new_session()
+        self._publish_state()
+        print(f"Target employee set to: {employee_name}, switched to FACE_VERIFICATION mode")
+
+    def _publish_state(self):
+        """Wysyła migawkę stanu do subskrybentów; wołane pod self.lock po każdej zmianie stanu."""
+        self.events.publish(self.get_state_event())
+
+    def get_state_event(self):
+        return {
+            "state": self.state.value,
+            "session": self.session_id,
+            "target": self.target_employee,
+            "employee": self.verified_employee,
+            "qr_verified": self.qr_verified,
+            "face_verified": self.face_verified,
+            "blocked": self.face_blocked,
+            "timestamp": time.time(),
+        }
+
+    def _new_session(self):
+        # Wyniki analizy z poprzedniej sesji/stanu są odrzucane.
+        self.session_id += 1
+        self.last_result = None
+        self.face_tracker.reset(self.session_id)
 
     def _reset_session_state(self):
         """Czyści zmienne sesyjne (prywatna metoda)."""
         self.qr_verified = False
         self.face_verified = False
         self.target_employee = None
+        self.target_emp_id = None
         self.verified_employee = None
         self.face_blocked = False
         self.face_failed_attempts = 0
         self.unauthorized_logged = False
+        self._new_session()
 
     def get_qr_status(self):
         return {
@@ -124,45 +177,40 @@ class VideoCamera:
 
     def get_raw_frame(self):
         """
-        To jest serce 'Leniwego Ładowania'.
-        Jeśli kamera nie działa, spróbuj ją włączyć TERAZ.
+        Zwraca najnowszą klatkę z wątku przechwytywania (tylko do odczytu).
+        Kamera jest otwierana leniwie przy pierwszym wywołaniu.
         """
-        with self.lock:
-            # 1. Jeśli nie ma uchwytu wideo lub jest zamknięty -> Otwórz
-            if self.video is None or not self.video.isOpened():
-                self._open_camera()
-            
-            # 2. Jeśli nadal None (bo się nie udało), zwróć None
-            if self.video is None or not self.video.isOpened():
-                return None
-
-            # 3. Pobierz klatkę
-            success, image = self.video.read()
-            if not success:
-                # Jeśli błąd odczytu, zamknij i spróbuj ponownie przy następnym wywołaniu
-                self.video.release()
-                self.video = None
-                return None
-                
-            return image
+        _seq, frame = self.grabber.read_latest()
+        return frame
 
     def get_jpg_frame(self):
-        """Pobiera klatkę przetworzoną (z ramkami) jako JPEG (dla streamu)."""
-        frame = self.get_raw_frame()
+        """Pobiera klatkę z nałożonym ostatnim wynikiem analizy jako JPEG (dla streamu)."""
+        # Czekamy na klatkę nowszą niż ostatnio zakodowana, więc tempo streamu = tempo kamery.
+        seq, frame = self.grabber.read_latest(after_seq=self._stream_seq)
         if frame is None:
             return None
+        self._stream_seq = seq
+        self.frame_count += 1
+
+        # Analiza (QR / twarz) idzie do puli wątków co N klatek; tu tylko rysujemy.
+        if self.state in (CameraState.QR_SCANNING, CameraState.FACE_VERIFICATION) and not self.face_blocked:
+            self.analyzer.submit(frame, seq, (self.session_id, self.state, self.target_employee, self.target_emp_id))
+
+        # Klatka jest współdzielona (read-only) - kopiujemy przed rysowaniem.
+        frame = frame.copy()
         
         if self.state == CameraState.IDLE:
             cv2.putText(frame, "Camera Idle", (10, 30),
                        cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 0), 2)
-            
-        elif self.state == CameraState.QR_SCANNING:
-            frame = self.process_qr_logic(frame)
 
-        elif self.state == CameraState.FACE_VERIFICATION:
-            # Tutaj był błąd: przekazywałeś 'processed_frame', którego nie było.
-            # Teraz przekazujemy 'frame', który zdefiniowaliśmy na początku.
-            frame = self.process_face_logic(frame)
+        elif self.state == CameraState.FACE_VERIFICATION and self.face_blocked:
+            cv2.putText(frame, "ACCESS BLOCKED", (10, 60),
+                       cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
+            cv2.putText(frame, "Restart from QR scan", (10, 95),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+
+        elif self.state in (CameraState.QR_SCANNING, CameraState.FACE_VERIFICATION):
+            self._draw_analysis_overlay(frame)
             
         elif self.state in [CameraState.ACCESS_GRANTED, CameraState.ACCESS_DENIED]:
             self._draw_result_overlay(frame)
@@ -171,89 +219,214 @@ class VideoCamera:
 
         ret, jpeg = cv2.imencode('.jpg', frame)
         return jpeg.tobytes()
-    
-    def process_qr_logic(self, frame):
-            objects = decode(frame)
-            for obj in objects:
-                qr_text = obj.data.decode('utf-8')
-                self.last_qr_text = qr_text
-                
-                employee_name = find_employee_by_qr_data(qr_text)
-                
-                if employee_name and employee_name != "Not Found":
-                    self.qr_verified = True
-                    self.verified_employee = employee_name
-                
-                pts = obj.polygon
-                if pts:
-                    pts = np.array([(int(pt.x), int(pt.y)) for pt in pts], np.int32)
-                    cv2.polylines(frame, [pts], True, (0, 255, 0), 2)
-                
-                if employee_name != "Not Found":
-                    cv2.putText(frame, f"Employee: {employee_name}", (10, 30),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    self.set_target_employee(employee_name)
-                    self.qr_verified = True
-                    self.verified_employee = employee_name
+
+    # --- Analiza (wątek FrameAnalyzer) ---
+
+    def _analyze_frame(self, frame, seq, context):
+        session_id, state, target_employee, target_emp_id = context
+        if state == CameraState.QR_SCANNING:
+            return self._analyze_qr(frame, seq, session_id)
+        if state == CameraState.FACE_VERIFICATION:
+            return self._analyze_face(frame, seq, session_id, target_employee, target_emp_id)
+        return None
+
+    def _analyze_qr(self, frame, seq, session_id):
+        result = AnalysisResult(kind="qr", seq=seq, session_id=session_id, frame=frame)
+        for obj in decode(frame):
+            qr_text = obj.data.decode('utf-8')
+            polygon = [(int(pt.x), int(pt.y)) for pt in obj.polygon] if obj.polygon else []
+            record = qr_index.lookup(qr_text)
+            result.qr_codes.append(QrDetection(
+                text=qr_text,
+                employee=record["emp_name"] if record else "Not Found",
+                polygon=polygon,
+                emp_id=record["emp_id"] if record else None,
+            ))
+        return result
+
+    def _analyze_face(self, frame, seq, session_id, target_employee=None, target_emp_id=None):
+        result = AnalysisResult(kind="face", seq=seq, session_id=session_id, frame=frame)
+
+        # Model jest trzymany w pamięci i aktualizowany przez endpointy admina
+        # (face_model_manager), więc nie trenujemy go tutaj w pętli klatek.
+        with face_model_manager.lock:
+            model = face_model_manager.get()
+            if model is None:
+                result.message = "Loading face model..." if face_model_manager.rebuilding else "No face data in DB"
+                return result
+        recognizer, known_names = model
+        threshold = FACE_THRESHOLD
+        predict_lock = face_model_manager.lock
+        verifying = FACE_VERIFICATION_MODE == "1:1" and bool(target_employee) and target_emp_id is not None
+        if verifying:
+            # 1:1: porównujemy tylko z szablonami pracownika z kodu QR (koszt nie zależy od liczby
+            # pracowników, brak odrzuceń przez podobną osobę z galerii). Galeria jest prywatna -> bez blokady.
+            # Po emp_id, nie po imieniu: imiennik nie może otworzyć drzwi za właściciela kodu.
+            gallery = face_model_manager.verification_model(target_emp_id)
+            if gallery is None:
+                # Bez szablonów nie ma czego weryfikować - żadnego powrotu do 1:N (imiennik by przeszedł).
+                if face_model_manager.rebuilding:
+                    result.message = "Loading face model..."
                 else:
-                    cv2.putText(frame, "QR Not in Database", (10, 30),
-                               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                    result.message = "No face templates for this employee"
+                    result.no_templates = True
+                return result
+            recognizer, known_names = gallery, [target_employee]
+            threshold = FACE_VERIFY_THRESHOLD
+            predict_lock = None
+        result.threshold = threshold
 
-            return frame
-    
-    def process_face_logic(self, frame):
-            current_time = time.time()
-            
-            if self.face_model is None or (current_time - self.face_model_loaded_at) > 10:
-                try:
-                    self.face_model = train_lbph_from_db()
-                    self.face_model_loaded_at = current_time
-                except Exception as e:
-                    print(f"Error training model: {e}")
-                    cv2.putText(frame, "No face data in DB", (10, 30),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    return frame
-            
-            recognizer, known_names = self.face_model
-            
-            if self.face_blocked:
-                blocked_frame = frame.copy()
-                cv2.putText(blocked_frame, "ACCESS BLOCKED", (10, 60),
-                           cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
-                cv2.putText(blocked_frame, "Restart from QR scan", (10, 95),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-                return blocked_frame
-            
-            detected_name, confidence, annotated_frame, face_count = recognize_and_annotate_frame(
+        search_region = self.face_tracker.search_region(frame.shape)
+        pooled = None
+        if face_process_pool is not None and face_process_pool.fits(frame):
+            # Osobne procesy (ACS_FACE_PROCESS_WORKERS): klatka idzie przez shared memory.
+            try:
+                model_ref = verifier = None
+                if verifying:
+                    # Worker dostaje tylko ścieżkę galerii pracownika (zapisaną raz na wersję modelu),
+                    # pełnego modelu wtedy nie eksportujemy ani nie ładujemy.
+                    verifier_path = face_model_manager.export_verifier_for_workers(
+                        face_process_pool.model_dir, target_emp_id
+                    )
+                    if verifier_path is None:
+                        raise RuntimeError(f"No face templates for employee {target_emp_id}")
+                    verifier = (verifier_path, target_employee)
+                else:
+                    model_ref = face_model_manager.export_for_workers(face_process_pool.model_dir)
+                pooled = face_process_pool.detect_and_recognize(
+                    frame,
+                    model_ref,
+                    threshold,
+                    search_region=search_region,
+                    downscale=FACE_DETECT_DOWNSCALE,
+                    verifier=verifier,
+                )
+            except Exception as e:
+                print(f"Face process pool error, analysing in-process: {e}")
+
+        if pooled is not None:
+            detected_name, confidence, detections, face_count = pooled
+        else:
+            # Model jest wspólny dla wszystkich drzwi: detekcja idzie równolegle,
+            # pod blokadą jest tylko predict (admin może w tym czasie robić update()).
+            detected_name, confidence, detections, face_count = detect_and_recognize(
                 frame,
                 recognizer=recognizer,
                 known_names=known_names,
-                threshold=80.0,
-                now=current_time
+                threshold=threshold,
+                predict_lock=predict_lock,
+                search_region=search_region,
+                downscale=FACE_DETECT_DOWNSCALE,
             )
-            
-            if detected_name == self.target_employee:
-                self.state = CameraState.ACCESS_GRANTED
-                self.state_start_time = current_time
-                self.face_verified = True
-                self.verified_employee = detected_name
-                _log_good_entry(employee_name=detected_name)
-                cv2.putText(annotated_frame, f"✓ MATCH: {detected_name}", (10, 60),
-                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 3)
-            elif detected_name != "Unknown" or (face_count > 0 and detected_name == "Unknown"):
-                self.face_failed_attempts += 1
-                cv2.putText(annotated_frame, f"✗ Wrong person: {detected_name}", (10, 60),
+        # Klatka z poprzedniej sesji nie może ustawić ROI dla nowej osoby
+        self.face_tracker.update([d[:4] for d in detections], session=session_id)
+
+        result.faces = [FaceDetection(box=(x, y, w, h), name=name, confidence=conf)
+                        for (x, y, w, h, name, conf) in detections]
+        result.detected_name = detected_name
+        if detected_name != "Unknown":
+            # 1:1 dopasowuje tylko do właściciela kodu; 1:N zna tylko imię (imienników nie rozróżnia).
+            result.detected_emp_id = target_emp_id if verifying else face_model_manager.emp_id_for_name(detected_name)
+        result.confidence = confidence
+        result.face_count = face_count
+        return result
+
+    def _apply_analysis_result(self, result):
+        """Wywoływane z wątku analizy: aktualizuje maszynę stanów."""
+        log_good = None
+        log_denied = None
+        with self.lock:
+            # Wynik z poprzedniej sesji albo starszy niż już zastosowany -> ignorujemy.
+            if result.session_id != self.session_id:
+                return
+            if self.last_result is not None and result.seq < self.last_result.seq:
+                return
+            self.last_result = result
+
+            if result.kind == "qr" and self.state == CameraState.QR_SCANNING:
+                for qr in result.qr_codes:
+                    self.last_qr_text = qr.text
+                    if qr.employee and qr.employee != "Not Found":
+                        # Flagi przed zmianą stanu, żeby zdarzenie FACE_VERIFICATION już je niosło.
+                        self.qr_verified = True
+                        self.verified_employee = qr.employee
+                        self._set_target_employee(qr.employee, qr.emp_id)
+                        self.last_result = result
+                        break
+
+            elif (result.kind == "face" and result.no_templates
+                  and self.state == CameraState.FACE_VERIFICATION and not self.face_blocked):
+                # Właściciel kodu nie ma szablonów twarzy: nie da się go zweryfikować -> odmowa.
+                self.face_blocked = True
+                self.state = CameraState.ACCESS_DENIED
+                self.state_start_time = result.timestamp
+                self._publish_state()
+                if not self.unauthorized_logged:
+                    log_denied = (self.last_qr_text, result.frame)
+                    self.unauthorized_logged = True
+
+            elif (result.kind == "face" and result.message is None
+                  and self.state == CameraState.FACE_VERIFICATION and not self.face_blocked):
+                current_time = result.timestamp
+                detected_name = result.detected_name
+                # Po emp_id, nie po imieniu: imiennik właściciela kodu nie przechodzi.
+                if result.detected_emp_id is not None and result.detected_emp_id == self.target_emp_id:
+                    self.state = CameraState.ACCESS_GRANTED
+                    self.state_start_time = current_time
+                    self.face_verified = True
+                    self.verified_employee = detected_name
+                    self._publish_state()
+                    log_good = (detected_name, self.target_emp_id)
+                elif detected_name != "Unknown" or (result.face_count > 0 and detected_name == "Unknown"):
+                    self.face_failed_attempts += 1
+                    if self.face_failed_attempts >= FACE_MAX_FAILED_ATTEMPTS:
+                        self.face_blocked = True
+                        self.state = CameraState.ACCESS_DENIED
+                        self.state_start_time = current_time
+                        self._publish_state()
+                        if not self.unauthorized_logged:
+                            log_denied = (self.last_qr_text, result.frame)
+                            self.unauthorized_logged = True
+
+        # Zapis do bazy poza blokadą stanu.
+        if log_good:
+            _log_good_entry(employee_name=log_good[0], emp_id=log_good[1])
+        if log_denied:
+            _log_unauthorized_access(*log_denied)
+
+    # --- Rysowanie (wątek streamu) ---
+
+    def _draw_analysis_overlay(self, frame):
+        result = self.last_result
+        if result is None or time.time() - result.timestamp > RESULT_OVERLAY_TTL:
+            return
+
+        if result.message:
+            cv2.putText(frame, result.message, (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+
+        for qr in result.qr_codes:
+            if qr.polygon:
+                pts = np.array(qr.polygon, np.int32)
+                cv2.polylines(frame, [pts], True, (0, 255, 0), 2)
+            if qr.employee != "Not Found":
+                cv2.putText(frame, f"Employee: {qr.employee}", (10, 30),
+                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            else:
+                cv2.putText(frame, "QR Not in Database", (10, 30),
+                           cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+
+        if result.kind == "face" and not result.message:
+            draw_face_detections(
+                frame,
+                [(*f.box, f.name, f.confidence) for f in result.faces],
+                threshold=result.threshold,
+            )
+            if result.face_count > 0 and (result.detected_emp_id is None or result.detected_emp_id != self.target_emp_id):
+                cv2.putText(frame, f"✗ Wrong person: {result.detected_name}", (10, 60),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-                cv2.putText(annotated_frame, f"Expected: {self.target_employee}", (10, 90),
+                cv2.putText(frame, f"Expected: {self.target_employee}", (10, 90),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-                if self.face_failed_attempts >= 20:
-                    self.face_blocked = True
-                    self.state = CameraState.ACCESS_DENIED
-                    self.state_start_time = current_time
-                    if not self.unauthorized_logged:
-                        _log_unauthorized_access(self.last_qr_text, frame)
-                        self.unauthorized_logged = True
-            return annotated_frame
     
     def _draw_result_overlay(self, frame):
             if self.state == CameraState.ACCESS_GRANTED:
@@ -263,76 +436,89 @@ class VideoCamera:
                 cv2.putText(frame, "ACCESS DENIED", (10, 60),
                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 255), 3)
 
-try:
-    camera_instance = VideoCamera()
-except Exception as e:
-    print(f"Error initializing camera: {e}")
-    camera_instance = None
-
-def find_employee_by_qr_data(qr_text: str) -> str:
-    # QR payload format: "<name>|<random_hash>" (older QR codes may be just "<name>")
-    employee_name = (qr_text or "").split("|", 1)[0].strip()
-    if not employee_name:
-        return "Not Found"
-    db = SessionLocal()
+def _log_unauthorized_access(qr_text: str | None, frame_bgr: np.ndarray) -> None:
+    # Zapis (JPEG + INSERT) robi w tle audit_writer - wątek kamery tylko kolejkuje.
+    audit_writer.log_unauthorized_access(qr_text, frame_bgr)
+
+
+def _log_good_entry(employee_name: str, emp_id: int | None = None) -> None:
+    audit_writer.log_good_entry(employee_name, emp_id=emp_id)
+
+def _stream_producer(camera):
+    """Zwraca funkcję dla FrameBroadcaster danych drzwi: jedna klatka -> część MJPEG (raz dla wszystkich widzów)."""
+    def produce():
+        frame_bytes = camera.get_jpg_frame()
+        if not frame_bytes:
+            return None
+        return (b'--frame\r\n'
+                b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+    return produce
+
+
+# Wszystkie drzwi (ACS_DOORS); każde mają własną kamerę, wątki i maszynę stanów.
+door_registry = DoorRegistry.from_sources(
+    parse_door_sources(DOORS),
+    camera_factory=VideoCamera,
+    producer_factory=_stream_producer,
+    queue_size=STREAM_QUEUE_SIZE,
+    target_fps=STREAM_TARGET_FPS,
+)
+balance_opencv_threads(len(door_registry), OPENCV_THREADS)
+
+# Pierwsze drzwi obsługują stare ścieżki bez /doors/{id} (/qr, /video_feed, /api/...).
+default_door = door_registry.default
+camera_instance = default_door.camera if default_door else None
+frame_broadcaster = default_door.broadcaster if default_door else None
+
+
+def generate_frames(door=None):
+    broadcaster = door.broadcaster if door else frame_broadcaster
+    if broadcaster is None:
+        while True:
+            time.sleep(1) # Czekaj na kamerę
+
+    subscriber = broadcaster.subscribe()
     try:
-        result = db.execute(
-            text("SELECT emp_name FROM employees WHERE emp_name = :name"),
-            {"name": employee_name},
-        ).first()
-        
-        if result:
-            return result[0]
-        return "Not Found"
+        while True:
+            part = subscriber.get()
+            if part:
+                yield part
     finally:
-        db.close()
+        broadcaster.unsubscribe(subscriber)
 
-def _log_unauthorized_access(qr_text: str | None, frame_bgr: np.ndarray) -> None:
-    db = SessionLocal()
+
+async def agenerate_frames(door=None):
+    """Asynchroniczna wersja generate_frames() - czeka na klatki bez blokowania wątku."""
+    broadcaster = door.broadcaster if door else frame_broadcaster
+    if broadcaster is None:
+        while True:
+            await asyncio.sleep(1) # Czekaj na kamerę
+
+    subscriber = broadcaster.subscribe_async()
     try:
-        ok, buffer = cv2.imencode('.jpg', frame_bgr)
-        photo_bytes = buffer.tobytes() if ok else None
-        stmt = insert(unauthorized_access).values(
-            qr_text=find_employee_by_qr_data(qr_text),
-            photo=photo_bytes,
-        )
-        db.execute(stmt)
-        db.commit()
-        print(f"Unauthorized access logged (qr_text={qr_text!r})")
-    except Exception as e:
-        db.rollback()
-        print(f"Failed to log unauthorized access: {e}")
+        while True:
+            part = await subscriber.aget()
+            if part:
+                yield part
     finally:
-        db.close()
+        broadcaster.unsubscribe(subscriber)
 
 
-def _log_good_entry(employee_name: str) -> None:
-    db = SessionLocal()
+async def agenerate_state_events(door=None, keepalive: float = 15.0):
+    """Strumień SSE z przejściami stanów kamery (komentarz co `keepalive` s trzyma połączenie)."""
+    camera = door.camera if door else camera_instance
+    if camera is None:
+        return
+
+    subscriber = camera.events.subscribe_async()
     try:
-        emp_id = db.execute(
-            text("SELECT emp_id FROM employees WHERE emp_name = :name ORDER BY emp_id DESC LIMIT 1"),
-            {"name": employee_name},
-        ).scalar()
-        stmt = insert(good_entries).values(
-            emp_id=emp_id,
-            emp_name=employee_name,
-        )
-        db.execute(stmt)
-        db.commit()
-        print(f"Good entry logged (employee={employee_name!r})")
-    except Exception as e:
-        db.rollback()
-        print(f"Failed to log good entry: {e}")
+        while True:
+            event = await subscriber.aget(timeout=keepalive)
+            if event is not None:
+                yield format_sse(event)
+            elif subscriber.closed:
+                return
+            else:
+                yield ": keepalive\n\n"
     finally:
-        db.close()
-
-def generate_frames():
-    while True:
-        if camera_instance:
-            frame_bytes = camera_instance.get_jpg_frame()
-            if frame_bytes:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            time.sleep(0.03) # Ważne dla CPU!
-        else:
-            time.sleep(1) # Czekaj na kamerę
+        camera.events.unsubscribe(subscriber)
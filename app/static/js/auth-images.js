@@ -0,0 +1,58 @@
+// Images behind the admin API need the Authorization header, which <img src> cannot send.
+// Tables render <img data-auth-src="..."> and call loadAuthImages(); each image is fetched
+// only when it scrolls into view (the browser HTTP cache handles repeat visits via ETag).
+
+const authImageObserver = 'IntersectionObserver' in window
+    ? new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                authImageObserver.unobserve(entry.target);
+                fetchAuthImage(entry.target);
+            }
+        });
+    }, { rootMargin: '200px' })
+    : null;
+
+function adminAuthHeaders() {
+    return {
+        'Authorization': 'Basic ' + (sessionStorage.getItem('adminAuth') || btoa('admin:admin1'))
+    };
+}
+
+async function fetchAuthBlobUrl(url) {
+    const response = await fetch(url, { headers: adminAuthHeaders() });
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+    return URL.createObjectURL(await response.blob());
+}
+
+async function fetchAuthImage(img) {
+    try {
+        const oldSrc = img.src;
+        img.src = await fetchAuthBlobUrl(img.dataset.authSrc);
+        if (oldSrc.startsWith('blob:')) URL.revokeObjectURL(oldSrc);
+    } catch (error) {
+        console.error('Load image error:', error);
+    }
+}
+
+function loadAuthImages(root = document) {
+    root.querySelectorAll('img[data-auth-src]').forEach(img => {
+        if (authImageObserver) {
+            authImageObserver.observe(img);
+        } else {
+            fetchAuthImage(img);
+        }
+    });
+}
+
+async function openAuthImage(url) {
+    // Open the window synchronously so popup blockers allow it, then fill it in.
+    const win = window.open('', '_blank');
+    try {
+        const blobUrl = await fetchAuthBlobUrl(url);
+        if (win) win.location = blobUrl;
+    } catch (error) {
+        if (win) win.close();
+        console.error('Open image error:', error);
+    }
+}
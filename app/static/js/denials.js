@@ -3,6 +3,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Load denials data
     loadDenials();
+    updateCounts();
 
     // Add sorting event listeners
     document.querySelectorAll('.sortable').forEach(th => {
@@ -15,48 +16,75 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Global variables for sorting and pagination
 let denialsData = [];
-let currentDenialSort = { column: null, direction: 'asc' };
-let currentPage = 1;
+let currentDenialSort = { column: 'id', direction: 'desc' };
 const itemsPerPage = 8;
+// Keyset pagination: cursors of the pages already visited, and of the next one
+let pageCursors = [null];
+let currentPage = 1;
+let nextCursor = null;
+// Columns the API can sort by; other columns are sorted within the current page
+const serverSortColumns = ['id', 'created_at'];
+
+function authHeaders() {
+    return {
+        'Authorization': 'Basic ' + (sessionStorage.getItem('adminAuth') || btoa('admin:admin1'))
+    };
+}
 
-async function loadDenials() {
-    try {
-        const response = await fetch('/admin/api/failed-attempts', {
-            headers: {
-                'Authorization': 'Basic ' + (sessionStorage.getItem('adminAuth') || btoa('admin:admin1'))
-            }
-        });
-        const data = await response.json();
+async function fetchDenialsPage(params) {
+    const response = await fetch('/admin/api/failed-attempts?' + new URLSearchParams(params), {
+        headers: authHeaders()
+    });
+    const data = await response.json();
+    return response.ok ? data : null;
+}
 
-        if (response.ok && data.failed_attempts) {
+async function loadDenials(page = 1) {
+    try {
+        const params = {
+            limit: itemsPerPage,
+            sort: serverSortColumns.includes(currentDenialSort.column) ? currentDenialSort.column : 'id',
+            order: currentDenialSort.direction
+        };
+        const cursor = pageCursors[page - 1];
+        if (cursor) params.cursor = cursor;
+
+        const data = await fetchDenialsPage(params);
+        if (data && data.failed_attempts) {
             denialsData = data.failed_attempts;
-            currentPage = 1;
+            currentPage = page;
+            nextCursor = data.next_cursor;
+            pageCursors[page] = nextCursor;
+            if (!serverSortColumns.includes(currentDenialSort.column)) {
+                sortPage();
+            }
             renderDenials();
-            updateCounts();
         }
     } catch (error) {
         console.error('Load denials error:', error);
     }
 }
 
-function updateCounts() {
+async function updateCounts() {
     const totalCountEl = document.getElementById('totalDenialsCount');
     const recentCountEl = document.getElementById('recentDenialsCount');
     const badgeCountEl = document.getElementById('attemptCount');
 
-    if (totalCountEl) totalCountEl.textContent = denialsData.length;
-
-    // Filter for last 24 hours
-    const now = new Date();
-    const oneDayAgo = new Date(now.getTime() - 24 * 60 * 60 * 1000);
-
-    const recentDenials = denialsData.filter(attempt => {
-        const attemptTime = new Date(attempt.created_at);
-        return attemptTime >= oneDayAgo;
-    });
-
-    if (recentCountEl) recentCountEl.textContent = recentDenials.length;
-    if (badgeCountEl) badgeCountEl.textContent = recentDenials.length;
+    try {
+        const oneDayAgo = new Date(Date.now() - 24 * 60 * 60 * 1000);
+        const [stats, recent] = await Promise.all([
+            fetch('/admin/api/stats?hours=1&days=1', { headers: authHeaders() }).then(r => r.ok ? r.json() : null),
+            fetchDenialsPage({ limit: 1, include_total: true, date_from: oneDayAgo.toISOString() })
+        ]);
+
+        if (stats && totalCountEl) totalCountEl.textContent = stats.totals.denied;
+        if (recent) {
+            if (recentCountEl) recentCountEl.textContent = recent.total;
+            if (badgeCountEl) badgeCountEl.textContent = recent.total;
+        }
+    } catch (error) {
+        console.error('Load denial counts error:', error);
+    }
 }
 
 function renderDenials() {
@@ -64,50 +92,42 @@ function renderDenials() {
 
     if (denialsData.length === 0) {
         tbody.innerHTML = '<tr><td colspan="4" class="text-center text-muted">No failed attempts found</td></tr>';
+        renderPagination();
         return;
     }
 
-    // Pagination
-    const startIndex = (currentPage - 1) * itemsPerPage;
-    const endIndex = startIndex + itemsPerPage;
-    const paginatedData = denialsData.slice(startIndex, endIndex);
-
-    tbody.innerHTML = paginatedData.map(attempt => `
+    tbody.innerHTML = denialsData.map(attempt => `
         <tr>
             <td>${attempt.id}</td>
             <td>${new Date(attempt.created_at).toLocaleString()}</td>
             <td>${attempt.qr_text || 'Unknown'}</td>
-            <td><img src="data:image/jpeg;base64,${attempt.photo}" alt="Photo" style="max-width: 50px; max-height: 50px;"></td>
+            <td>${attempt.thumbnail_url
+                ? `<img data-auth-src="${attempt.thumbnail_url}" alt="Photo" width="50" height="50" style="object-fit: contain; cursor: pointer;" onclick="openAuthImage('${attempt.photo_url}')">`
+                : '<span class="text-muted">-</span>'}</td>
         </tr>
     `).join('');
 
+    loadAuthImages(tbody);
     renderPagination();
 }
 
 function renderPagination() {
-    const totalPages = Math.ceil(denialsData.length / itemsPerPage);
     let paginationHtml = '';
 
-    if (totalPages > 1) {
+    if (currentPage > 1 || nextCursor) {
         paginationHtml = `
             <nav aria-label="Denials table pagination">
                 <ul class="pagination justify-content-center mt-3">
                     <li class="page-item ${currentPage === 1 ? 'disabled' : ''}">
-                        <a class="page-link" href="#" onclick="changePage(${currentPage - 1})">
+                        <a class="page-link" href="#" onclick="changePage(${currentPage - 1}); return false;">
                             <i class="fas fa-chevron-left"></i>
                         </a>
-                    </li>`;
-
-        for (let i = 1; i <= totalPages; i++) {
-            paginationHtml += `
-                    <li class="page-item ${i === currentPage ? 'active' : ''}">
-                        <a class="page-link" href="#" onclick="changePage(${i})">${i}</a>
-                    </li>`;
-        }
-
-        paginationHtml += `
-                    <li class="page-item ${currentPage === totalPages ? 'disabled' : ''}">
-                        <a class="page-link" href="#" onclick="changePage(${currentPage + 1})">
+                    </li>
+                    <li class="page-item active">
+                        <a class="page-link" href="#" onclick="return false;">${currentPage}</a>
+                    </li>
+                    <li class="page-item ${nextCursor ? '' : 'disabled'}">
+                        <a class="page-link" href="#" onclick="changePage(${currentPage + 1}); return false;">
                             <i class="fas fa-chevron-right"></i>
                         </a>
                     </li>
@@ -127,10 +147,8 @@ function renderPagination() {
 }
 
 function changePage(page) {
-    const totalPages = Math.ceil(denialsData.length / itemsPerPage);
-    if (page < 1 || page > totalPages) return;
-    currentPage = page;
-    renderDenials();
+    if (page < 1 || (page > currentPage && !nextCursor)) return;
+    loadDenials(page);
 }
 
 function sortDenials(column) {
@@ -148,24 +166,24 @@ function sortDenials(column) {
     const activeTh = document.querySelector(`[data-column="${column}"]`);
     activeTh.classList.add(currentDenialSort.direction);
 
-    // Sort data
+    if (serverSortColumns.includes(column)) {
+        // New ordering = new cursors; start again from the first page
+        pageCursors = [null];
+        loadDenials(1);
+    } else {
+        sortPage();
+        renderDenials();
+    }
+}
+
+function sortPage() {
+    const column = currentDenialSort.column;
     denialsData.sort((a, b) => {
         let aVal = a[column];
         let bVal = b[column];
 
-        if (column === 'id') {
-            aVal = parseInt(aVal);
-            bVal = parseInt(bVal);
-        } else if (column === 'created_at') {
-            aVal = new Date(aVal);
-            bVal = new Date(bVal);
-        }
-
         if (aVal < bVal) return currentDenialSort.direction === 'asc' ? -1 : 1;
         if (aVal > bVal) return currentDenialSort.direction === 'asc' ? 1 : -1;
         return 0;
     });
-
-    currentPage = 1;
-    renderDenials();
-}
\ No newline at end of file
+}
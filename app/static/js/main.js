@@ -268,7 +268,14 @@ function sortUsers(column) {
 
 async function loadAttempts() {
     try {
-        const response = await fetch('/admin/api/failed-attempts', {
+        // Only the latest page of the last 24 hours; the total comes from the API
+        const oneDayAgo = new Date(Date.now() - 24 * 60 * 60 * 1000);
+        const params = new URLSearchParams({
+            limit: 10,
+            include_total: true,
+            date_from: oneDayAgo.toISOString()
+        });
+        const response = await fetch('/admin/api/failed-attempts?' + params, {
             headers: {
                 'Authorization': 'Basic ' + (sessionStorage.getItem('adminAuth') || btoa('admin:admin1'))
             }
@@ -280,18 +287,11 @@ async function loadAttempts() {
             const countEl = document.getElementById('attemptCount');
             const cardCountEl = document.getElementById('failedAttemptsCount');
             
-            // Filter attempts from last 24 hours
-            //const now = new Date();
-            //const oneDayAgo = new Date(now.getTime() - 24 * 60 * 60 * 1000);
-            
-            const last24hAttempts = data.failed_attempts.filter(attempt => {
-                const attemptTime = new Date(attempt.created_at);
-                return attemptTime
-            });
+            const last24hAttempts = data.failed_attempts;
             
             // Update both counters
-            if (countEl) countEl.textContent = last24hAttempts.length;
-            if (cardCountEl) cardCountEl.textContent = last24hAttempts.length;
+            if (countEl) countEl.textContent = data.total;
+            if (cardCountEl) cardCountEl.textContent = data.total;
 
             if (last24hAttempts.length === 0) {
                 tbody.innerHTML = '<tr><td colspan="4" class="text-center text-muted">No failed attempts in the last 24 hours</td></tr>';
@@ -303,9 +303,12 @@ async function loadAttempts() {
                     <td>${attempt.id}</td>
                     <td>${new Date(attempt.created_at).toLocaleString()}</td>
                     <td>${attempt.qr_text || 'Unknown'}</td>
-                    <td><img src="data:image/jpeg;base64,${attempt.photo}" alt="Photo" style="max-width: 50px; max-height: 50px;"></td>
+                    <td>${attempt.thumbnail_url
+                        ? `<img data-auth-src="${attempt.thumbnail_url}" alt="Photo" width="50" height="50" style="object-fit: contain; cursor: pointer;" onclick="openAuthImage('${attempt.photo_url}')">`
+                        : '<span class="text-muted">-</span>'}</td>
                 </tr>
             `).join('');
+            loadAuthImages(tbody);
         }
     } catch (error) {
         console.error('Load attempts error:', error);
@@ -334,16 +337,16 @@ async function deleteUser(id, name) {
 
 async function loadSuccessfulAccessCount() {
     try {
-        const response = await fetch('/admin/api/good-entries', {
+        const response = await fetch('/admin/api/stats?hours=24&days=1', {
             headers: {
                 'Authorization': 'Basic ' + (sessionStorage.getItem('adminAuth') || btoa('admin:admin1'))
             }
         });
         const data = await response.json();
 
-        if (response.ok && data.good_entries) {
+        if (response.ok && data.totals) {
             const countEl = document.getElementById('successfulAccessCount');
-            if (countEl) countEl.textContent = data.good_entries.length;
+            if (countEl) countEl.textContent = data.totals.granted;
         }
     } catch (error) {
         console.error('Load successful access count error:', error);
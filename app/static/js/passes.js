@@ -3,6 +3,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Load passes data
     loadPasses();
+    updateCounts();
 
     // Add sorting event listeners
     document.querySelectorAll('.sortable').forEach(th => {
@@ -15,48 +16,75 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // Global variables for sorting and pagination
 let passesData = [];
-let currentPassSort = { column: null, direction: 'asc' };
-let currentPage = 1;
+let currentPassSort = { column: 'id', direction: 'desc' };
 const itemsPerPage = 8;
+// Keyset pagination: cursors of the pages already visited, and of the next one
+let pageCursors = [null];
+let currentPage = 1;
+let nextCursor = null;
+// Columns the API can sort by; other columns are sorted within the current page
+const serverSortColumns = ['id', 'created_at'];
+
+function authHeaders() {
+    return {
+        'Authorization': 'Basic ' + (sessionStorage.getItem('adminAuth') || btoa('admin:admin1'))
+    };
+}
 
-async function loadPasses() {
-    try {
-        const response = await fetch('/admin/api/good-entries', {
-            headers: {
-                'Authorization': 'Basic ' + (sessionStorage.getItem('adminAuth') || btoa('admin:admin1'))
-            }
-        });
-        const data = await response.json();
+async function fetchPassesPage(params) {
+    const response = await fetch('/admin/api/good-entries?' + new URLSearchParams(params), {
+        headers: authHeaders()
+    });
+    const data = await response.json();
+    return response.ok ? data : null;
+}
 
-        if (response.ok && data.good_entries) {
+async function loadPasses(page = 1) {
+    try {
+        const params = {
+            limit: itemsPerPage,
+            sort: serverSortColumns.includes(currentPassSort.column) ? currentPassSort.column : 'id',
+            order: currentPassSort.direction
+        };
+        const cursor = pageCursors[page - 1];
+        if (cursor) params.cursor = cursor;
+
+        const data = await fetchPassesPage(params);
+        if (data && data.good_entries) {
             passesData = data.good_entries;
-            currentPage = 1;
+            currentPage = page;
+            nextCursor = data.next_cursor;
+            pageCursors[page] = nextCursor;
+            if (!serverSortColumns.includes(currentPassSort.column)) {
+                sortPage();
+            }
             renderPasses();
-            updateCounts();
         }
     } catch (error) {
         console.error('Load passes error:', error);
     }
 }
 
-function updateCounts() {
+async function updateCounts() {
     const totalCountEl = document.getElementById('totalPassesCount');
     const recentCountEl = document.getElementById('recentPassesCount');
     const badgeCountEl = document.getElementById('passesCount');
 
-    if (totalCountEl) totalCountEl.textContent = passesData.length;
-
-    // Filter for last 24 hours
-    const now = new Date();
-    const oneDayAgo = new Date(now.getTime() - 24 * 60 * 60 * 1000);
-
-    const recentPasses = passesData.filter(entry => {
-        const entryTime = new Date(entry.created_at);
-        return entryTime >= oneDayAgo;
-    });
-
-    if (recentCountEl) recentCountEl.textContent = recentPasses.length;
-    if (badgeCountEl) badgeCountEl.textContent = recentPasses.length;
+    try {
+        const oneDayAgo = new Date(Date.now() - 24 * 60 * 60 * 1000);
+        const [stats, recent] = await Promise.all([
+            fetch('/admin/api/stats?hours=1&days=1', { headers: authHeaders() }).then(r => r.ok ? r.json() : null),
+            fetchPassesPage({ limit: 1, include_total: true, date_from: oneDayAgo.toISOString() })
+        ]);
+
+        if (stats && totalCountEl) totalCountEl.textContent = stats.totals.granted;
+        if (recent) {
+            if (recentCountEl) recentCountEl.textContent = recent.total;
+            if (badgeCountEl) badgeCountEl.textContent = recent.total;
+        }
+    } catch (error) {
+        console.error('Load pass counts error:', error);
+    }
 }
 
 function renderPasses() {
@@ -64,15 +92,11 @@ function renderPasses() {
 
     if (passesData.length === 0) {
         tbody.innerHTML = '<tr><td colspan="4" class="text-center text-muted">No successful access events found</td></tr>';
+        renderPagination();
         return;
     }
 
-    // Pagination
-    const startIndex = (currentPage - 1) * itemsPerPage;
-    const endIndex = startIndex + itemsPerPage;
-    const paginatedData = passesData.slice(startIndex, endIndex);
-
-    tbody.innerHTML = paginatedData.map(entry => `
+    tbody.innerHTML = passesData.map(entry => `
         <tr>
             <td>${entry.id}</td>
             <td>${new Date(entry.created_at).toLocaleString()}</td>
@@ -85,29 +109,22 @@ function renderPasses() {
 }
 
 function renderPagination() {
-    const totalPages = Math.ceil(passesData.length / itemsPerPage);
     let paginationHtml = '';
 
-    if (totalPages > 1) {
+    if (currentPage > 1 || nextCursor) {
         paginationHtml = `
             <nav aria-label="Passes table pagination">
                 <ul class="pagination justify-content-center mt-3">
                     <li class="page-item ${currentPage === 1 ? 'disabled' : ''}">
-                        <a class="page-link" href="#" onclick="changePage(${currentPage - 1})">
+                        <a class="page-link" href="#" onclick="changePage(${currentPage - 1}); return false;">
                             <i class="fas fa-chevron-left"></i>
                         </a>
-                    </li>`;
-
-        for (let i = 1; i <= totalPages; i++) {
-            paginationHtml += `
-                    <li class="page-item ${i === currentPage ? 'active' : ''}">
-                        <a class="page-link" href="#" onclick="changePage(${i})">${i}</a>
-                    </li>`;
-        }
-
-        paginationHtml += `
-                    <li class="page-item ${currentPage === totalPages ? 'disabled' : ''}">
-                        <a class="page-link" href="#" onclick="changePage(${currentPage + 1})">
+                    </li>
+                    <li class="page-item active">
+                        <a class="page-link" href="#" onclick="return false;">${currentPage}</a>
+                    </li>
+                    <li class="page-item ${nextCursor ? '' : 'disabled'}">
+                        <a class="page-link" href="#" onclick="changePage(${currentPage + 1}); return false;">
                             <i class="fas fa-chevron-right"></i>
                         </a>
                     </li>
@@ -127,10 +144,8 @@ function renderPagination() {
 }
 
 function changePage(page) {
-    const totalPages = Math.ceil(passesData.length / itemsPerPage);
-    if (page < 1 || page > totalPages) return;
-    currentPage = page;
-    renderPasses();
+    if (page < 1 || (page > currentPage && !nextCursor)) return;
+    loadPasses(page);
 }
 
 function sortPasses(column) {
@@ -148,24 +163,29 @@ function sortPasses(column) {
     const activeTh = document.querySelector(`[data-column="${column}"]`);
     activeTh.classList.add(currentPassSort.direction);
 
-    // Sort data
+    if (serverSortColumns.includes(column)) {
+        // New ordering = new cursors; start again from the first page
+        pageCursors = [null];
+        loadPasses(1);
+    } else {
+        sortPage();
+        renderPasses();
+    }
+}
+
+function sortPage() {
+    const column = currentPassSort.column;
     passesData.sort((a, b) => {
         let aVal = a[column];
         let bVal = b[column];
 
-        if (column === 'id' || column === 'emp_id') {
+        if (column === 'emp_id') {
             aVal = parseInt(aVal) || 0;
             bVal = parseInt(bVal) || 0;
-        } else if (column === 'created_at') {
-            aVal = new Date(aVal);
-            bVal = new Date(bVal);
         }
 
         if (aVal < bVal) return currentPassSort.direction === 'asc' ? -1 : 1;
         if (aVal > bVal) return currentPassSort.direction === 'asc' ? 1 : -1;
         return 0;
     });
-
-    currentPage = 1;
-    renderPasses();
-}
\ No newline at end of file
+}
@@ -1,9 +1,12 @@
 from app.core.database import engine
+from app.core.migrations import run_migrations
 from app.models.qr_image import metadata
 
 
 def main():
     metadata.create_all(engine)
+    version = run_migrations(engine)
+    print("Schema version:", version)
     print("Created tables:", list(metadata.tables.keys()))
 
 
@@ -0,0 +1,52 @@
+"""Export an audit table as CSV or NDJSON.
+
+    python export_audit.py good_entries --format csv -o good_entries.csv
+    python export_audit.py unauthorized_access --format ndjson --gzip --from 2026-01-01 --to 2026-01-31 -o denials.ndjson.gz
+
+Rows are streamed from the database, so memory use does not depend on the table size.
+Without -o the export is written to stdout.
+"""
+
+import argparse
+import sys
+
+from app.core import database
+from app.services.audit_export import EXPORT_FORMATS, iter_export
+from app.services.audit_query import AUDIT_TABLES
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export good_entries / unauthorized_access.")
+    parser.add_argument("table", choices=sorted(AUDIT_TABLES))
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--gzip", action="store_true", help="gzip-compress the output")
+    parser.add_argument("--from", dest="date_from", help="ISO date/datetime (UTC), inclusive")
+    parser.add_argument("--to", dest="date_to", help="ISO date (inclusive) or datetime (exclusive), UTC")
+    parser.add_argument("--employee", help="employee id or name")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        chunks = iter_export(
+            database.engine, args.table, args.format,
+            compress=args.gzip, date_from=args.date_from, date_to=args.date_to, employee=args.employee,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        print(f"Wrote {written} bytes to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
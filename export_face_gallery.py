@@ -0,0 +1,36 @@
+"""Publish the face gallery file shared by several server processes.
+
+    ACS_FACE_GALLERY_DIR=data/face_model/gallery python export_face_gallery.py
+
+Builds the LBPH gallery from the face templates in the database and publishes it
+to the gallery directory (see app.services.face_gallery_file). Running servers
+switch to it on their next poll; servers started afterwards map it instead of
+training. Requires the numpy matcher (ACS_FACE_MATCHER=numpy, the default).
+"""
+
+import argparse
+import sys
+
+from app.core.config import FACE_GALLERY_DIR, FACE_MATCHER
+from app.services.face_model import compute_db_fingerprint
+from app.services.facial_recognition import publish_lbph_gallery, train_lbph_from_db
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish the shared memory-mapped face gallery.")
+    parser.add_argument("--dir", default=FACE_GALLERY_DIR, help="gallery directory (default: ACS_FACE_GALLERY_DIR)")
+    args = parser.parse_args(argv)
+    if not args.dir:
+        parser.error("set ACS_FACE_GALLERY_DIR or pass --dir")
+    if FACE_MATCHER != "numpy":
+        parser.error("the shared gallery file needs ACS_FACE_MATCHER=numpy")
+
+    fingerprint = compute_db_fingerprint()
+    recognizer, known_names, known_emp_ids = train_lbph_from_db()
+    path = publish_lbph_gallery(recognizer, known_names, known_emp_ids, fingerprint, directory=args.dir)
+    print(f"Published {len(known_names)} face templates to {path}", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
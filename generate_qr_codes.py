@@ -1,11 +1,14 @@
 import os
 from datetime import datetime
-from sqlalchemy import insert, select
+from sqlalchemy import insert, select, update
 from app.core.database import engine, SessionLocal
 from app.models.qr_image import employees
+from app.services.qr_index import qr_index
 from app.services.qr_generator import (
+    build_qr_payload,
     generate_qr_code_blob,
     generate_qr_code_file,
+    qr_payload_token,
 )
 
 
@@ -23,25 +26,41 @@ def generate_and_store_qr_codes(
     
     try:
         for i, emp_name in enumerate(employee_names[:num_employees]):
-            qr_blob = generate_qr_code_blob(emp_name)
+            # Check if employee already exists by name (newest row, as the QR lookup does)
+            exists_stmt = (
+                select(employees.c.emp_id, employees.c.qr_token)
+                .where(employees.c.emp_name == emp_name)
+                .order_by(employees.c.emp_id.desc())
+            )
+            existing = db.execute(exists_stmt).first()
+
+            # Same payload for the PNG file and the DB blob, so both carry the stored token.
+            # A reprinted badge keeps the stored token: the lookup no longer accepts the name alone.
+            qr_payload = build_qr_payload(emp_name, token=existing.qr_token if existing else None)
+            qr_blob = generate_qr_code_blob(emp_name, payload=qr_payload)
             
             qr_filename = f"{emp_name.replace(' ', '_')}.png"
             qr_filepath = os.path.join(qr_output_folder, qr_filename)
-            generate_qr_code_file(emp_name, qr_filepath)
-            
-            # Check if employee already exists by name
-            exists_stmt = select(employees.c.emp_id).where(employees.c.emp_name == emp_name)
-            existing = db.execute(exists_stmt).first()
+            generate_qr_code_file(emp_name, qr_filepath, payload=qr_payload)
 
-            if existing:
-                # Do not modify existing DB record
+            if existing and existing.qr_token:
                 print(f"• Skipped DB insert: employee '{emp_name}' already exists")
                 print(f"  → Regenerated PNG at: {qr_filepath}")
+            elif existing:
+                # Badge from before qr_token: store the new token together with the new code
+                db.execute(
+                    update(employees)
+                    .where(employees.c.emp_id == existing.emp_id)
+                    .values(emp_qr_code=qr_blob, qr_token=qr_payload_token(qr_payload))
+                )
+                print(f"• Employee '{emp_name}' already exists, stored a QR token for the new badge")
+                print(f"  → Regenerated PNG at: {qr_filepath}")
             else:
                 stmt = insert(employees).values(
                     emp_name=emp_name,
                     emp_qr_code=qr_blob,
                     emp_photo=None,
+                    qr_token=qr_payload_token(qr_payload),
                 )
                 db.execute(stmt)
                 print(f"✓ Generated QR for '{emp_name}'")
@@ -49,6 +68,7 @@ def generate_and_store_qr_codes(
                 print(f"  → Stored blob in database")
         
         db.commit()
+        qr_index.invalidate()
         print(f"\n✓ Successfully generated and stored {len(employee_names[:num_employees])} QR codes!")
         
     except Exception as e:
@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from app.core.config import FACE_DETECTOR_CONFIDENCE, FACE_DETECTOR_CONFIG, FACE_DETECTOR_MODEL
+from app.services.face_detectors import DETECTOR_BACKENDS, LBP_CASCADE_PATH, create_face_detector
+
+ROOT = Path(__file__).resolve().parent.parent
+IMAGE_DIRS = [ROOT / "faces", ROOT / "tests" / "fixtures" / "faces"]
+FRAME_MAX_SIDE = 640  # camera-sized input
+REPEATS = 5
+
+
+def _load_images():
+    """Grayscale images (one face each) scaled to camera size."""
+    images = []
+    for directory in IMAGE_DIRS:
+        if not directory.is_dir():
+            continue
+        for path in sorted(directory.iterdir()):
+            if path.suffix.lower() not in (".jpg", ".jpeg", ".png"):
+                continue
+            gray = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                continue
+            scale = min(1.0, FRAME_MAX_SIDE / max(gray.shape))
+            if scale < 1.0:
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            images.append((path.name, gray))
+    return images
+
+
+def _benchmark_detector(detector, images):
+    latencies = []
+    detected = 0
+    for _name, gray in images:
+        faces = detector.detectMultiScale(gray, 1.1, 5, minSize=(60, 60))
+        detected += len(faces) > 0
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            detector.detectMultiScale(gray, 1.1, 5, minSize=(60, 60))
+            latencies.append(time.perf_counter() - start)
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "detection_rate": detected / len(images),
+        "mean_ms": float(latencies_ms.mean()),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+
+def benchmark_face_detectors(models: dict):
+    print("\n" + "=" * 70)
+    print("FACE DETECTOR BACKENDS: LATENCY AND DETECTION RATE")
+    print("=" * 70 + "\n")
+
+    images = _load_images()
+    if not images:
+        print("No images found in faces/ or tests/fixtures/faces/")
+        return
+    print(f"  {len(images)} images (longest side <= {FRAME_MAX_SIDE}px), {REPEATS} timed runs each\n")
+    print(f"  {'backend':<8} {'detected':>9} {'mean':>10} {'p95':>10}")
+
+    for backend in DETECTOR_BACKENDS:
+        model_path, config_path = models.get(backend, ("", ""))
+        try:
+            detector = create_face_detector(backend, model_path, config_path, FACE_DETECTOR_CONFIDENCE)
+        except Exception as e:
+            print(f"  {backend:<8} skipped: {e}")
+            continue
+        result = _benchmark_detector(detector, images)
+        print(f"  {backend:<8} {result['detection_rate']:>8.0%} "
+              f"{result['mean_ms']:>8.2f}ms {result['p95_ms']:>8.2f}ms")
+
+    print("\n  Select one with ACS_FACE_DETECTOR (+ ACS_FACE_DETECTOR_MODEL / _CONFIG).")
+    print("=" * 70 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare face detector backends")
+    parser.add_argument("--lbp-model", default=LBP_CASCADE_PATH, help="LBP cascade XML")
+    parser.add_argument("--dnn-model", default=FACE_DETECTOR_MODEL, help="YuNet .onnx or SSD .caffemodel")
+    parser.add_argument("--dnn-config", default=FACE_DETECTOR_CONFIG, help=".prototxt for a Caffe model")
+    args = parser.parse_args()
+
+    try:
+        benchmark_face_detectors({
+            "lbp": (args.lbp_model, ""),
+            "dnn": (args.dnn_model, args.dnn_config),
+        })
+    except Exception as e:
+        print(f"\nError: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from app.services.face_pool import FaceProcessPool
+from app.services.facial_recognition import (
+    LBPH_MODEL_SUFFIX,
+    _create_lbph_recognizer,
+    crop_and_normalize,
+    detect_and_recognize,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+FACE_DIRS = [ROOT / "faces", ROOT / "tests" / "fixtures" / "faces"]
+DOORS = 4
+FRAMES_PER_DOOR = 40
+THRESHOLD = 80.0
+
+
+def _load_faces():
+    """Employee photos from faces/ (and test fixtures) as BGR images."""
+    images, names = [], []
+    for directory in FACE_DIRS:
+        if not directory.is_dir():
+            continue
+        for path in sorted(directory.glob("*.jpg")):
+            image = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                images.append(image)
+                names.append(path.stem)
+    return images, names
+
+
+def _train(images, names):
+    recognizer = _create_lbph_recognizer()
+    faces = [crop_and_normalize(image) for image in images]
+    recognizer.train(faces, np.arange(len(faces)))
+    return recognizer
+
+
+def _camera_frames(images, count):
+    """640x480 frames with an employee photo pasted in, like a door camera."""
+    frames = []
+    for i in range(count):
+        photo = images[i % len(images)]
+        scale = 360.0 / max(photo.shape[:2])
+        photo = cv2.resize(photo, None, fx=scale, fy=scale)
+        h, w = photo.shape[:2]
+        frame = np.random.randint(0, 40, (480, 640, 3), dtype=np.uint8)
+        y, x = (480 - h) // 2, (640 - w) // 2
+        frame[y:y + h, x:x + w] = photo
+        frames.append(frame)
+    return frames
+
+
+def _run_doors(frames, analyse):
+    """One thread per door, each analysing its own frames back to back (like FrameAnalyzer)."""
+    def door():
+        for frame in frames:
+            analyse(frame)
+
+    threads = [threading.Thread(target=door) for _ in range(DOORS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return DOORS * len(frames) / elapsed
+
+
+def benchmark_process_pool():
+    print("\n" + "=" * 70)
+    print(f"FACE ANALYSIS THROUGHPUT: {DOORS} DOORS, IN-PROCESS VS WORKER PROCESSES")
+    print("=" * 70 + "\n")
+
+    images, names = _load_faces()
+    if not images:
+        print("No face images found")
+        return
+    recognizer = _train(images, names)
+    frames = _camera_frames(images, FRAMES_PER_DOOR)
+    print(f"  {len(images)} employees, {FRAMES_PER_DOOR} frames per door, {os.cpu_count()} CPUs\n")
+
+    predict_lock = threading.Lock()
+    fps = _run_doors(frames, lambda frame: detect_and_recognize(
+        frame, recognizer=recognizer, known_names=names, threshold=THRESHOLD, predict_lock=predict_lock,
+    ))
+    print(f"  in-process threads:   {fps:>8.2f} FPS")
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        model_path = os.path.join(model_dir, f"worker-lbph-1{LBPH_MODEL_SUFFIX}")
+        recognizer.write(model_path)
+        with open(model_path + ".names.json", "w", encoding="utf-8") as f:
+            json.dump(names, f, ensure_ascii=False)
+
+        for workers in (1, 2, 4):
+            pool = FaceProcessPool(workers, model_dir=model_dir, slot_bytes=640 * 480 * 3)
+            try:
+                # Warm up: spawn workers and load the model before timing.
+                for frame in frames[:workers * 2]:
+                    pool.detect_and_recognize(frame, (1, model_path), THRESHOLD)
+                fps = _run_doors(frames, lambda frame: pool.detect_and_recognize(frame, (1, model_path), THRESHOLD))
+                print(f"  {workers} worker process(es): {fps:>8.2f} FPS  "
+                      f"(last latency {pool.stats()['last_latency_ms']} ms)")
+            finally:
+                pool.shutdown()
+
+    print("=" * 70 + "\n")
+
+
+def main():
+    try:
+        benchmark_process_pool()
+    except Exception as e:
+        print(f"\nError: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
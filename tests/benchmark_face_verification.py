@@ -0,0 +1,124 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from app.core.config import FACE_MAX_FAILED_ATTEMPTS
+from app.services.facial_recognition import crop_and_normalize
+from app.services.lbph_gallery import LBPHGallery
+
+ROOT = Path(__file__).resolve().parent.parent
+FACE_DIRS = [ROOT / "faces", ROOT / "tests" / "fixtures" / "faces"]
+PROBES_PER_FACE = 20
+THRESHOLDS = range(60, 91, 2)
+
+
+def _load_templates():
+    """200x200 normalised faces from faces/ (and test fixtures), one template per image."""
+    templates = []
+    for directory in FACE_DIRS:
+        if not directory.is_dir():
+            continue
+        for path in sorted(directory.glob("*.jpg")):
+            image = cv2.imdecode(np.fromfile(str(path), dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                continue
+            try:
+                templates.append(crop_and_normalize(image))
+            except ValueError:
+                print(f"  no face found in {path.name}, skipped")
+    return templates
+
+
+def _camera_probe(face, rng):
+    """The same face as a door camera would crop it: shifted, rotated, rescaled, relit."""
+    angle = rng.uniform(-5, 5)
+    scale = rng.uniform(0.95, 1.05)
+    matrix = cv2.getRotationMatrix2D((100, 100), angle, scale)
+    matrix[:, 2] += rng.uniform(-4, 4, 2)
+    probe = cv2.warpAffine(face, matrix, (200, 200), borderMode=cv2.BORDER_REPLICATE)
+    probe = cv2.convertScaleAbs(probe, alpha=rng.uniform(0.85, 1.15), beta=rng.uniform(-20, 20))
+    return cv2.GaussianBlur(probe, (3, 3), 0)
+
+
+def session_rate(rate: float, attempts: int) -> float:
+    """Chance that at least one of ``attempts`` independent attempts has an event of probability ``rate``."""
+    return 1.0 - (1.0 - rate) ** attempts
+
+
+def calibrate(target_far: float, attempts: int):
+    print("\n" + "=" * 70)
+    print("1:1 FACE VERIFICATION THRESHOLD CALIBRATION")
+    print("=" * 70 + "\n")
+
+    templates = _load_templates()
+    if len(templates) < 2:
+        print("Need at least two face images")
+        return
+    gallery = LBPHGallery()
+    gallery.train(templates, np.arange(len(templates)))
+    verifiers = [gallery.subset([label], as_label=0) for label in range(len(templates))]
+
+    rng = np.random.default_rng(0)
+    genuine, impostor = [], []
+    start = time.perf_counter()
+    for label, face in enumerate(templates):
+        for _ in range(PROBES_PER_FACE):
+            probe = _camera_probe(face, rng)
+            for claimed, verifier in enumerate(verifiers):
+                distance = verifier.predict(probe)[1]
+                (genuine if claimed == label else impostor).append(distance)
+    elapsed = time.perf_counter() - start
+    genuine, impostor = np.array(genuine), np.array(impostor)
+    comparisons = len(genuine) + len(impostor)
+    print(f"  {len(templates)} templates, {len(genuine)} genuine / {len(impostor)} impostor comparisons "
+          f"({elapsed / comparisons * 1000:.2f}ms per 1:1 comparison incl. features)\n")
+
+    # A session is one QR scan: an impostor gets up to `attempts` scored frames before the block,
+    # a genuine user is rejected only if all of them fail. Attempts are treated as independent;
+    # consecutive frames of one person are correlated, so the session rates are estimates.
+    print(f"  Session = up to {attempts} scored attempts (ACS_FACE_MAX_FAILED_ATTEMPTS)\n")
+    print(f"  {'threshold':>9} {'FAR':>8} {'FRR':>8} {'sess FAR':>9} {'sess FRR':>9}")
+    best = None
+    for threshold in THRESHOLDS:
+        far = float(np.mean(impostor < threshold))
+        frr = float(np.mean(genuine >= threshold))
+        session_far = session_rate(far, attempts)
+        session_frr = frr ** attempts
+        print(f"  {threshold:>9} {far:>7.2%} {frr:>7.2%} {session_far:>8.2%} {session_frr:>8.2%}")
+        if session_far <= target_far:
+            best = threshold
+
+    print()
+    if best is None:
+        print(f"  No threshold reaches session FAR <= {target_far:.2%}")
+    else:
+        print(f"  Highest threshold with session FAR <= {target_far:.2%}: {best} (set ACS_FACE_VERIFY_THRESHOLD)")
+    print("=" * 70 + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the 1:1 face verification threshold")
+    parser.add_argument("--far", type=float, default=0.01, help="target false accept rate per session (default 0.01)")
+    parser.add_argument("--attempts", type=int, default=FACE_MAX_FAILED_ATTEMPTS,
+                        help=f"scored attempts per session (default ACS_FACE_MAX_FAILED_ATTEMPTS = {FACE_MAX_FAILED_ATTEMPTS})")
+    args = parser.parse_args()
+    try:
+        calibrate(args.far, args.attempts)
+    except Exception as e:
+        print(f"\nError: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
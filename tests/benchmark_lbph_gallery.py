@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+from app.services.lbph_gallery import LBPHGallery
+from tests.face_fixtures import synthetic_faces
+
+GALLERY_SIZES = (100, 1000, 5000, 10000)
+PREDICTS = 5
+
+
+def _time_predict(predict, probe):
+    predict(probe)  # warm-up
+    start = time.perf_counter()
+    for _ in range(PREDICTS):
+        predict(probe)
+    return (time.perf_counter() - start) / PREDICTS * 1000.0
+
+
+def benchmark_lbph_gallery():
+    print("\n" + "=" * 70)
+    print("LBPH PREDICT: OPENCV VS NUMPY GALLERY")
+    print("=" * 70 + "\n")
+
+    opencv_available = hasattr(cv2, "face")
+    if not opencv_available:
+        print("  cv2.face missing (opencv-contrib), timing the NumPy gallery only\n")
+    print(f"  {'gallery':>8} {'opencv':>10} {'numpy':>10} {'numpy 1:1':>10}")
+
+    faces = synthetic_faces(max(GALLERY_SIZES))
+    probe = faces[7]
+    for size in GALLERY_SIZES:
+        labels = np.arange(size)
+        gallery = LBPHGallery()
+        gallery.train(faces[:size], labels)
+        numpy_ms = _time_predict(gallery.predict, probe)
+        verify_ms = _time_predict(lambda face: gallery.predict(face, labels=[7]), probe)
+
+        opencv_ms = float("nan")
+        if opencv_available:
+            recognizer = cv2.face.LBPHFaceRecognizer_create()
+            recognizer.train(faces[:size], labels)
+            opencv_ms = _time_predict(recognizer.predict, probe)
+
+        print(f"  {size:>8} {opencv_ms:>8.2f}ms {numpy_ms:>8.2f}ms {verify_ms:>8.2f}ms")
+
+    print("=" * 70 + "\n")
+
+
+def main():
+    try:
+        benchmark_lbph_gallery()
+    except Exception as e:
+        print(f"\nError: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
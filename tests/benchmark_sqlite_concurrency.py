@@ -0,0 +1,135 @@
+"""Read/write concurrency of the audit tables: default engine vs tuned engine.
+
+Simulates the camera pipeline (writer threads inserting good_entries, one
+commit per event) while the admin dashboard polls (reader threads running the
+/admin/api/good-entries style query). Run with:
+
+    python tests/benchmark_sqlite_concurrency.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import create_db_engine
+from app.models.qr_image import good_entries, metadata
+
+DURATION_S = 5.0
+WRITERS = 2
+READERS = 4
+SEED_ROWS = 20_000
+
+
+def _baseline_engine(url: str):
+    # What app/core/database.py used before: rollback journal, default pragmas.
+    return create_engine(url, connect_args={"check_same_thread": False})
+
+
+def _seed(engine) -> None:
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(good_entries),
+            [{"emp_id": i % 50, "emp_name": f"Employee {i % 50}"} for i in range(SEED_ROWS)],
+        )
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _run(engine) -> dict:
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"writes": 0, "reads": 0, "errors": 0, "read_latencies": [], "write_latencies": []}
+
+    def writer(worker: int):
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(good_entries).values(emp_id=worker, emp_name=f"Writer {worker}"))
+                with lock:
+                    stats["writes"] += 1
+                    stats["write_latencies"].append(time.perf_counter() - start)
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1
+
+    def reader():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT * FROM good_entries ORDER BY id DESC LIMIT 100")).fetchall()
+                    conn.execute(text("SELECT COUNT(*) FROM good_entries")).scalar()
+                with lock:
+                    stats["reads"] += 1
+                    stats["read_latencies"].append(time.perf_counter() - start)
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    threads += [threading.Thread(target=reader) for _ in range(READERS)]
+    for t in threads:
+        t.start()
+    time.sleep(DURATION_S)
+    stop.set()
+    for t in threads:
+        t.join()
+    return stats
+
+
+def _report(label: str, stats: dict) -> None:
+    print(f"  {label}")
+    print(f"    writes/s:           {stats['writes'] / DURATION_S:>10.1f}")
+    print(f"    reads/s:            {stats['reads'] / DURATION_S:>10.1f}")
+    print(f"    write p50 / p99:    {_percentile(stats['write_latencies'], 0.5) * 1000:>7.2f}ms / "
+          f"{_percentile(stats['write_latencies'], 0.99) * 1000:.2f}ms")
+    print(f"    read  p50 / p99:    {_percentile(stats['read_latencies'], 0.5) * 1000:>7.2f}ms / "
+          f"{_percentile(stats['read_latencies'], 0.99) * 1000:.2f}ms")
+    print(f"    'database is locked' errors: {stats['errors']}")
+
+
+def benchmark_sqlite_concurrency():
+    print("\n" + "=" * 70)
+    print(f"SQLITE CONCURRENCY BENCHMARK ({WRITERS} writers, {READERS} readers, {DURATION_S:.0f}s)")
+    print("=" * 70 + "\n")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for label, factory in (("default engine", _baseline_engine), ("tuned engine (WAL)", create_db_engine)):
+            url = f"sqlite:///{os.path.join(tmpdir, label.split()[0] + '.db')}"
+            engine = factory(url)
+            try:
+                _seed(engine)
+                _report(label, _run(engine))
+            finally:
+                engine.dispose()
+            print()
+
+
+def main():
+    try:
+        benchmark_sqlite_concurrency()
+    except Exception as e:
+        print(f"\nError: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+"""Synthetic faces shared by the LBPH tests and benchmarks."""
+
+import cv2
+import numpy as np
+
+
+def synthetic_faces(count: int, seed: int = 0) -> list[np.ndarray]:
+    """Smooth random 200x200 "faces": blurred noise gives realistic LBP code statistics."""
+    rng = np.random.default_rng(seed)
+    return [
+        cv2.GaussianBlur(rng.integers(0, 256, (200, 200), dtype=np.uint8), (7, 7), 0)
+        for _ in range(count)
+    ]
+
+
+def synthetic_face(seed: int) -> np.ndarray:
+    return synthetic_faces(1, seed=seed)[0]
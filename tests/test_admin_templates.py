@@ -0,0 +1,92 @@
+import asyncio
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import cv2
+import numpy as np
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.qr_image import metadata as core_metadata
+from tests.face_fixtures import synthetic_face
+
+try:
+    from app.api import admin
+except ImportError:  # pyzbar needs the zbar shared library
+    admin = None
+
+
+def _upload(filename: str, data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=filename)
+
+
+def _jpeg(image: np.ndarray) -> bytes:
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def _crop_and_normalize(image):
+    """Stand-in for the Haar detector: a black photo has no face in it."""
+    if not image.any():
+        raise ValueError("No face detected")
+    return synthetic_face(int(image[0, 0, 0]))
+
+
+@unittest.skipUnless(admin, "app.api.admin needs pyzbar and the zbar library")
+class AddUserTemplatesTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmpdir.cleanup)
+        engine = create_engine(f"sqlite:///{os.path.join(self._tmpdir.name, 'test_access_control.db')}")
+        self.addCleanup(engine.dispose)
+        core_metadata.create_all(engine)
+        self._SessionLocal = sessionmaker(bind=engine)
+        with self._SessionLocal() as db:
+            db.execute(
+                text("INSERT INTO employees (emp_id, emp_name, emp_photo) VALUES (1, 'Alice', :photo)"),
+                {"photo": _jpeg(synthetic_face(1))},
+            )
+            db.commit()
+        self.face_model_manager = mock.Mock()
+        for name, value in (
+            ("SessionLocal", self._SessionLocal),
+            ("verify_admin_header", lambda authorization: None),
+            ("crop_and_normalize", _crop_and_normalize),
+            ("face_model_manager", self.face_model_manager),
+        ):
+            patcher = mock.patch.object(admin, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _template_count(self) -> int:
+        with self._SessionLocal() as db:
+            return db.execute(text("SELECT COUNT(*) FROM face_templates")).scalar()
+
+    def test_rejected_uploads_leave_no_trace(self):
+        photos = [_upload("broken.jpg", b"not an image"), _upload("empty.jpg", _jpeg(np.zeros((40, 40, 3), np.uint8)))]
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(admin.add_user_templates(1, photos, authorization="Basic x"))
+
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertIn("broken.jpg", ctx.exception.detail)
+        # Not even the enrollment photo was copied to the templates.
+        self.assertEqual(self._template_count(), 0)
+        self.face_model_manager.notify_face_added.assert_not_called()
+
+    def test_accepted_upload_keeps_the_enrollment_photo(self):
+        photos = [_upload("empty.jpg", _jpeg(np.zeros((40, 40, 3), np.uint8))),
+                  _upload("alice.jpg", _jpeg(np.full((40, 40, 3), 5, np.uint8)))]
+        response = asyncio.run(admin.add_user_templates(1, photos, authorization="Basic x"))
+
+        self.assertTrue(response["success"])
+        self.assertEqual([added["file"] for added in response["added"]], ["alice.jpg"])
+        self.assertEqual([rejected["file"] for rejected in response["rejected"]], ["empty.jpg"])
+        self.assertEqual(self._template_count(), 2)
+        self.face_model_manager.notify_face_added.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
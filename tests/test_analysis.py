@@ -0,0 +1,117 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.services import analysis
+from app.services.analysis import AnalysisResult, FrameAnalyzer
+
+FRAME = np.zeros((4, 4, 3), dtype=np.uint8)
+
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+class StubAnalysis:
+    """`analyze` callable recording the analysed sequence numbers; blocks while `gate` is clear."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.gate.set()
+        self.seqs = []
+        self.results = []
+
+    def analyze(self, frame, seq, context):
+        self.gate.wait(5.0)
+        self.seqs.append(seq)
+        return AnalysisResult(kind="face", seq=seq, session_id=context, frame=frame)
+
+    def on_result(self, result):
+        self.results.append(result)
+
+
+class FakeClock:
+    def __init__(self, now: float = 100.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class FrameAnalyzerTests(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubAnalysis()
+        self._analyzers = []
+
+    def tearDown(self):
+        self.stub.gate.set()
+        for analyzer in self._analyzers:
+            analyzer.shutdown()
+
+    def _analyzer(self, **kwargs) -> FrameAnalyzer:
+        analyzer = FrameAnalyzer(self.stub.analyze, self.stub.on_result, **kwargs)
+        self._analyzers.append(analyzer)
+        return analyzer
+
+    def test_every_n_frames(self):
+        analyzer = self._analyzer(every_n_frames=3)
+        scheduled = []
+        for seq in range(1, 10):
+            scheduled.append(analyzer.submit(FRAME, seq, context=7))
+            # One job at a time: let it finish before the next frame is due.
+            _wait_until(lambda: analyzer.stats()["completed"] == analyzer.stats()["submitted"])
+
+        self.assertEqual(scheduled, [False, False, True] * 3)
+        self.assertEqual(self.stub.seqs, [3, 6, 9])
+        self.assertEqual([r.session_id for r in self.stub.results], [7, 7, 7])
+        self.assertEqual(analyzer.stats()["skipped_busy"], 0)
+
+    def test_max_hz_cadence_uses_the_clock_not_the_frame_count(self):
+        clock = FakeClock()
+        with mock.patch.object(analysis, "time", clock):
+            analyzer = self._analyzer(every_n_frames=100, max_hz=2.0)
+            scheduled = []
+            for t in (0.0, 0.1, 0.3, 0.5, 0.6, 1.2):
+                clock.now = 100.0 + t
+                scheduled.append(analyzer.submit(FRAME, len(scheduled) + 1))
+                _wait_until(lambda: analyzer.stats()["completed"] == analyzer.stats()["submitted"])
+
+        self.assertEqual(scheduled, [True, False, False, True, False, True])
+        self.assertEqual(self.stub.seqs, [1, 4, 6])
+
+    def test_frames_are_skipped_while_all_workers_are_busy(self):
+        analyzer = self._analyzer(every_n_frames=1, max_workers=1)
+        self.stub.gate.clear()
+        self.assertTrue(analyzer.submit(FRAME, 1))
+        self.assertEqual([analyzer.submit(FRAME, seq) for seq in (2, 3, 4)], [False, False, False])
+        self.assertEqual(analyzer.stats()["skipped_busy"], 3)
+
+        self.stub.gate.set()
+        _wait_until(lambda: analyzer.stats()["completed"] == 1)
+        self.assertTrue(analyzer.submit(FRAME, 5))
+        _wait_until(lambda: analyzer.stats()["completed"] == 2)
+        # Skipped frames were dropped, not queued.
+        self.assertEqual(self.stub.seqs, [1, 5])
+
+    def test_shutdown_lets_the_running_job_finish_and_schedules_nothing_more(self):
+        analyzer = self._analyzer(every_n_frames=1)
+        self.stub.gate.clear()
+        self.assertTrue(analyzer.submit(FRAME, 1))
+        analyzer.shutdown()
+        self.assertFalse(analyzer.submit(FRAME, 2))
+
+        self.stub.gate.set()
+        _wait_until(lambda: analyzer.stats()["completed"] == 1)
+        self.assertEqual(self.stub.seqs, [1])
+        self.assertEqual(analyzer.stats()["submitted"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
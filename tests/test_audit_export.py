@@ -0,0 +1,64 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, insert
+
+from app.models.qr_image import metadata as core_metadata
+from app.models.qr_image import good_entries, unauthorized_access
+from app.services.audit_export import iter_export
+
+
+class AuditExportTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._engine = create_engine(f"sqlite:///{os.path.join(self._tmpdir.name, 'test_access_control.db')}")
+        core_metadata.create_all(self._engine)
+        with self._engine.begin() as conn:
+            conn.execute(insert(good_entries), [{"emp_id": i % 5, "emp_name": f"Employee {i % 5}"} for i in range(500)])
+            conn.execute(insert(unauthorized_access), [
+                {"qr_text": "Not Found", "photo": b"\xff\xd8jpeg"},
+                {"qr_text": "Alice", "photo": None},
+            ])
+            conn.exec_driver_sql("UPDATE good_entries SET created_at = '2026-01-01 08:00:00' WHERE id <= 100")
+            conn.exec_driver_sql("UPDATE good_entries SET created_at = '2026-02-01 08:00:00' WHERE id > 100")
+
+    def tearDown(self):
+        self._engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _export(self, *args, **kwargs) -> bytes:
+        # Small chunks so the test crosses chunk boundaries.
+        return b"".join(iter_export(self._engine, *args, chunk_size=256, **kwargs))
+
+    def test_csv_has_header_and_every_row(self):
+        rows = list(csv.reader(io.StringIO(self._export("good_entries", "csv").decode())))
+        self.assertEqual(rows[0], ["id", "emp_id", "emp_name", "created_at"])
+        self.assertEqual([int(r[0]) for r in rows[1:]], list(range(1, 501)))
+
+    def test_gzip_ndjson_with_date_filter(self):
+        data = self._export("good_entries", "ndjson", compress=True, date_from="2026-01-01", date_to="2026-01-31")
+        lines = gzip.decompress(data).decode().splitlines()
+        self.assertEqual(len(lines), 100)
+        self.assertEqual(json.loads(lines[0])["emp_name"], "Employee 0")
+
+    def test_denials_export_omits_photos(self):
+        records = [json.loads(line) for line in self._export("unauthorized_access", "ndjson").decode().splitlines()]
+        self.assertEqual([r["has_photo"] for r in records], [1, 0])
+        self.assertTrue(all("photo" not in r for r in records))
+
+    def test_invalid_arguments_fail_before_streaming(self):
+        with self.assertRaises(ValueError):
+            iter_export(self._engine, "employees")
+        with self.assertRaises(ValueError):
+            iter_export(self._engine, "good_entries", "xml")
+        with self.assertRaises(ValueError):
+            iter_export(self._engine, "good_entries", date_from="last week")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, insert
+
+from app.models.qr_image import metadata as core_metadata
+from app.models.qr_image import good_entries
+from app.services.audit_query import AUDIT_TABLES, count_rows, decode_cursor, fetch_page, parse_date_bound
+
+
+class AuditQueryTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._engine = create_engine(f"sqlite:///{os.path.join(self._tmpdir.name, 'test_access_control.db')}")
+        core_metadata.create_all(self._engine)
+        with self._engine.begin() as conn:
+            # Several rows share a timestamp, so created_at paging must break ties on id.
+            conn.execute(insert(good_entries), [
+                {"emp_id": i % 3, "emp_name": f"Employee {i % 3}"}
+                for i in range(23)
+            ])
+            conn.exec_driver_sql(
+                "UPDATE good_entries SET created_at = '2026-01-0' || (1 + id % 4) || ' 10:00:00'"
+            )
+        self._table = AUDIT_TABLES["good_entries"]
+
+    def tearDown(self):
+        self._engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _all_pages(self, **kwargs) -> list[int]:
+        ids = []
+        cursor = None
+        with self._engine.connect() as conn:
+            while True:
+                rows, cursor = fetch_page(conn, self._table, limit=5, cursor=cursor, **kwargs)
+                ids.extend(row.id for row in rows)
+                if cursor is None:
+                    return ids
+
+    def test_pages_cover_every_row_exactly_once(self):
+        for sort in ("id", "created_at"):
+            for order in ("asc", "desc"):
+                ids = self._all_pages(sort=sort, order=order)
+                self.assertEqual(sorted(ids), list(range(1, 24)), (sort, order))
+
+        self.assertEqual(self._all_pages(sort="id", order="desc")[:3], [23, 22, 21])
+
+    def test_filters(self):
+        with self._engine.connect() as conn:
+            self.assertEqual(count_rows(conn, self._table, date_from="2026-01-02", date_to="2026-01-03"), 12)
+            self.assertEqual(count_rows(conn, self._table, employee="1"), 8)
+            self.assertEqual(count_rows(conn, self._table, employee="Employee 2"), 7)
+
+        ids = self._all_pages(sort="created_at", order="asc", date_from="2026-01-04")
+        self.assertEqual(len(ids), 6)
+
+    def test_invalid_input_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor")
+        with self.assertRaises(ValueError):
+            parse_date_bound("yesterday")
+        with self._engine.connect() as conn, self.assertRaises(ValueError):
+            fetch_page(conn, self._table, sort="emp_name")
+
+    def test_date_bounds_are_naive_utc(self):
+        self.assertEqual(parse_date_bound("2026-01-02T11:00:00+01:00"), "2026-01-02 10:00:00")
+        self.assertEqual(parse_date_bound("2026-01-02", end=True), "2026-01-03 00:00:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from sqlalchemy import create_engine, select
+
+from app.models.qr_image import metadata as core_metadata
+from app.models.qr_image import access_rollups, good_entries, unauthorized_access
+import app.services.audit as audit
+from app.services.access_stats import get_access_stats
+
+
+class StubQrIndex:
+    def lookup(self, qr_text):
+        if qr_text and qr_text.startswith("Alice|"):
+            return {"emp_id": 1, "emp_name": "Alice", "has_token": True}
+        return None
+
+    def employee_by_name(self, emp_name):
+        return {"emp_id": 1, "emp_name": emp_name, "has_token": True}
+
+
+class RecordingAuditWriter(audit.AuditWriter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_sizes = []
+
+    def _write_batch(self, batch):
+        self.batch_sizes.append(len(batch))
+        super()._write_batch(batch)
+
+
+class AuditWriterTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._engine = create_engine(
+            f"sqlite:///{os.path.join(self._tmpdir.name, 'test_access_control.db')}",
+            connect_args={"check_same_thread": False},
+        )
+        core_metadata.create_all(self._engine)
+        self._patch = patch.object(audit, "qr_index", StubQrIndex())
+        self._patch.start()
+
+    def tearDown(self):
+        self._patch.stop()
+        self._engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _rows(self, table):
+        with self._engine.connect() as conn:
+            return conn.execute(select(table)).fetchall()
+
+    def test_events_are_batched_and_flushed(self):
+        writer = RecordingAuditWriter(engine=self._engine, flush_interval=0.2)
+        for i in range(50):
+            writer.log_good_entry("Alice", emp_id=1)
+        writer.log_unauthorized_access("Alice|abc", np.zeros((48, 64, 3), dtype=np.uint8))
+        writer.log_unauthorized_access("Mallory|abc", None)
+
+        self.assertTrue(writer.flush(timeout=10))
+        writer.stop()
+
+        self.assertEqual(len(self._rows(good_entries)), 50)
+        denied = self._rows(unauthorized_access)
+        self.assertEqual(sorted(r.qr_text for r in denied), ["Alice", "Not Found"])
+        self.assertTrue(any(r.photo for r in denied))
+        self.assertTrue(all(bool(r.photo) == bool(r.thumbnail) for r in denied))
+        self.assertEqual(writer.written, 52)
+        self.assertLess(len(writer.batch_sizes), 52)
+
+    def test_rollups_follow_written_events(self):
+        writer = audit.AuditWriter(engine=self._engine, flush_interval=0.2)
+        for name in ("Alice", "Alice", "Bob"):
+            writer.log_good_entry(name)
+        writer.log_unauthorized_access("Mallory|abc", None)
+        writer.stop()
+
+        self.assertTrue(self._rows(access_rollups))
+        with self._engine.connect() as conn:
+            stats = get_access_stats(conn, hours=2, days=1)
+        self.assertEqual(stats["totals"], {"granted": 3, "denied": 1})
+        self.assertEqual(stats["last_hours"], {"granted": 3, "denied": 1})
+        self.assertEqual(stats["daily"][-1]["granted"], 3)
+        self.assertEqual(stats["employees"]["granted"][0], {"emp_name": "Alice", "count": 2})
+        # The unknown QR code counts towards the totals, not as an employee.
+        self.assertEqual(stats["employees"]["denied"], [])
+
+    def test_stop_writes_everything_still_queued(self):
+        writer = audit.AuditWriter(engine=self._engine, flush_interval=5.0)
+        for _ in range(10):
+            writer.log_good_entry("Bob")
+        writer.stop()
+        self.assertEqual(len(self._rows(good_entries)), 10)
+
+    def test_drop_new_policy_when_queue_is_full(self):
+        writer = audit.AuditWriter(engine=self._engine, max_queue=2, policy="drop_new")
+        with patch.object(writer, "start"):
+            self.assertTrue(writer.log_good_entry("A"))
+            self.assertTrue(writer.log_good_entry("B"))
+            self.assertFalse(writer.log_good_entry("C"))
+        self.assertEqual(writer.dropped, 1)
+
+        writer.stop()
+        writer.start()
+        self.assertTrue(writer.flush(timeout=10))
+        writer.stop()
+        self.assertEqual(sorted(r.emp_name for r in self._rows(good_entries)), ["A", "B"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import queue
+import threading
+import time
+import unittest
+
+from app.services.broadcast import FrameBroadcaster
+
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+class FakePipeline:
+    """`produce` callable: returns the next queued frame, counting the frames it encoded."""
+
+    def __init__(self):
+        self.frames = queue.Queue()
+        self.encoded = 0
+
+    def __call__(self):
+        try:
+            frame = self.frames.get(timeout=0.01)
+        except queue.Empty:
+            return None
+        self.encoded += 1
+        return frame
+
+
+def _producer_running() -> bool:
+    return any(thread.name == "mjpeg-broadcast" for thread in threading.enumerate())
+
+
+class FrameBroadcasterTests(unittest.TestCase):
+    def setUp(self):
+        self.pipeline = FakePipeline()
+        self.broadcaster = FrameBroadcaster(self.pipeline, queue_size=2)
+        self._subscribers = []
+
+    def tearDown(self):
+        for subscriber in self._subscribers:
+            self.broadcaster.unsubscribe(subscriber)
+        _wait_until(lambda: not _producer_running())
+
+    def _subscribe(self):
+        subscriber = self.broadcaster.subscribe()
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def test_each_frame_is_encoded_once_for_all_viewers(self):
+        viewers = [self._subscribe() for _ in range(5)]
+        for i in range(3):
+            self.pipeline.frames.put(f"frame-{i}".encode())
+            for viewer in viewers:
+                self.assertEqual(viewer.get(timeout=5.0), f"frame-{i}".encode())
+
+        self.assertEqual(self.pipeline.encoded, 3)
+        stats = self.broadcaster.stats()
+        self.assertEqual(stats["subscribers"], 5)
+        self.assertEqual(stats["frames_produced"], 3)
+        self.assertEqual(stats["frames_dropped_per_subscriber"], [0] * 5)
+
+    def test_slow_viewer_drops_its_oldest_frames_only(self):
+        fast, slow = self._subscribe(), self._subscribe()
+        for i in range(5):
+            self.pipeline.frames.put(f"frame-{i}".encode())
+            self.assertEqual(fast.get(timeout=5.0), f"frame-{i}".encode())
+
+        self.assertEqual((fast.dropped, slow.dropped), (0, 3))
+        # The slow viewer resumes from the newest frames.
+        self.assertEqual([slow.get(timeout=0), slow.get(timeout=0)], [b"frame-3", b"frame-4"])
+        self.assertIsNone(slow.get(timeout=0))
+        self.assertEqual(self.pipeline.encoded, 5)
+
+    def test_async_viewer_is_cleaned_up_and_the_pipeline_stops(self):
+        async def watch():
+            viewer = self.broadcaster.subscribe_async()
+            self.pipeline.frames.put(b"frame-0")
+            first = await viewer.aget(timeout=5.0)
+            # A viewer waiting for the next frame is woken when it is unsubscribed.
+            pending = asyncio.ensure_future(viewer.aget(timeout=5.0))
+            await asyncio.sleep(0.05)
+            self.broadcaster.unsubscribe(viewer)
+            return first, await asyncio.wait_for(pending, 1.0)
+
+        first, after_close = asyncio.run(watch())
+        self.assertEqual(first, b"frame-0")
+        self.assertIsNone(after_close)
+        self.assertEqual(self.broadcaster.subscriber_count, 0)
+        # Nobody is watching: the producer thread exits and frames are no longer encoded.
+        _wait_until(lambda: not _producer_running())
+        self.pipeline.frames.put(b"frame-1")
+        time.sleep(0.05)
+        self.assertEqual(self.pipeline.encoded, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import queue
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.services import capture
+from app.services.capture import FrameGrabber
+
+_FAIL = object()
+
+
+def _frame(value: int) -> np.ndarray:
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in; every instance reads from the same queue of frames."""
+
+    def __init__(self, frames: queue.Queue, stopping):
+        self._frames = frames
+        self._stopping = stopping
+        self.released = False
+
+    def isOpened(self):
+        return not self.released
+
+    def read(self):
+        while True:
+            try:
+                frame = self._frames.get(timeout=0.01)
+            except queue.Empty:
+                if self._stopping():
+                    return False, None
+                continue
+            return (False, None) if frame is _FAIL else (True, frame)
+
+    def release(self):
+        self.released = True
+
+
+class FrameGrabberTests(unittest.TestCase):
+    def setUp(self):
+        self.frames = queue.Queue()
+        self.captures = []
+        self.grabber = FrameGrabber(source=0, retry_interval=0.0)
+
+        def open_capture(source, api):
+            cap = FakeCapture(self.frames, lambda: not self.grabber.stats()["running"])
+            self.captures.append(cap)
+            return cap
+
+        self._patch = mock.patch.object(capture.cv2, "VideoCapture", open_capture)
+        self._patch.start()
+
+    def tearDown(self):
+        self.grabber.stop()
+        self._patch.stop()
+
+    def _feed(self, *frames):
+        for frame in frames:
+            self.frames.put(frame)
+
+    def test_newest_frame_wins_and_replaced_frames_count_as_dropped(self):
+        # The first frame only checks that the device works.
+        frames = [_frame(i) for i in range(4)]
+        self._feed(*frames)
+        self.grabber.start()
+        _wait_until(lambda: self.grabber.stats()["frames_captured"] == 3)
+
+        seq, frame = self.grabber.read_latest()
+        self.assertEqual(seq, 3)
+        self.assertIs(frame, frames[3])
+        self.assertFalse(frame.flags.writeable)
+        self.assertEqual(self.grabber.stats()["frames_dropped"], 2)
+
+        # Nothing newer within the timeout: the same frame again, counted as a duplicate.
+        seq, frame = self.grabber.read_latest(after_seq=3, timeout=0.05)
+        self.assertEqual(seq, 3)
+        self.assertIs(frame, frames[3])
+        self.assertEqual(self.grabber.stats()["frames_duplicated"], 1)
+
+        self._feed(_frame(4))
+        seq, _frame4 = self.grabber.read_latest(after_seq=3)
+        self.assertEqual(seq, 4)
+        stats = self.grabber.stats()
+        self.assertEqual((stats["frames_dropped"], stats["frames_duplicated"]), (2, 1))
+
+    def test_read_error_reopens_the_camera(self):
+        self._feed(_frame(0), _FAIL, _frame(1), _frame(2))
+        self.grabber.start()
+        _wait_until(lambda: self.grabber.stats()["frames_captured"] == 1)
+
+        self.assertEqual(self.grabber.stats()["read_errors"], 1)
+        self.assertEqual(len(self.captures), 2)
+        self.assertTrue(self.captures[0].released)
+        self.assertFalse(self.captures[1].released)
+
+    def test_stop_releases_the_camera(self):
+        self._feed(_frame(0), _frame(1))
+        seq, frame = self.grabber.read_latest()
+        self.assertEqual(seq, 1)
+
+        self.grabber.stop()
+        _wait_until(lambda: not self.grabber.stats()["opened"])
+        self.assertTrue(self.captures[0].released)
+        self.assertFalse(self.grabber.stats()["running"])
+
+
+if __name__ == "__main__":
+    unittest.main()
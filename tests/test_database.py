@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+from app.core.config import SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_SYNCHRONOUS
+from app.core.database import create_db_engine
+
+# PRAGMA synchronous reports the level as a number.
+SYNCHRONOUS_LEVELS = {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3}
+
+
+class CreateDbEngineTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.url = f"sqlite:///{os.path.join(self._tmpdir.name, 'test_access_control.db')}"
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _pragmas(self, engine) -> dict:
+        try:
+            with engine.connect() as conn:
+                return {
+                    name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                    for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size")
+                }
+        finally:
+            engine.dispose()
+
+    def test_file_database_gets_the_configured_pragmas(self):
+        pragmas = self._pragmas(create_db_engine(self.url))
+        self.assertEqual(pragmas["journal_mode"], "wal")
+        self.assertEqual(pragmas["synchronous"], SYNCHRONOUS_LEVELS[SQLITE_SYNCHRONOUS.upper()])
+        self.assertEqual(pragmas["busy_timeout"], SQLITE_BUSY_TIMEOUT_MS)
+        self.assertEqual(pragmas["cache_size"], -SQLITE_CACHE_SIZE_KB)
+
+    def test_every_pooled_connection_is_tuned(self):
+        engine = create_db_engine(self.url, synchronous="FULL", busy_timeout_ms=1234, pool_size=2)
+        try:
+            with engine.connect() as first, engine.connect() as second:
+                for conn in (first, second):
+                    self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 2)
+                    self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), 1234)
+        finally:
+            engine.dispose()
+
+    def test_in_memory_database_keeps_its_journal(self):
+        pragmas = self._pragmas(create_db_engine("sqlite://"))
+        self.assertEqual(pragmas["journal_mode"], "memory")
+        self.assertEqual(pragmas["busy_timeout"], SQLITE_BUSY_TIMEOUT_MS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from fastapi import HTTPException
+
+from app.services.doors import DEFAULT_DOOR_ID, DoorRegistry, parse_door_sources
+
+try:
+    from app.api import routes
+except ImportError:  # pyzbar needs the zbar shared library
+    routes = None
+
+
+class StubCamera:
+    def __init__(self, door_id, source):
+        if source == "broken":
+            raise RuntimeError("no device")
+        self.door_id = door_id
+        self.source = source
+        self.released = False
+
+        self.scans_started = 0
+
+    def start_qr_scanning(self):
+        self.scans_started += 1
+
+    def release(self):
+        self.released = True
+
+
+class DoorRegistryTests(unittest.TestCase):
+    def test_parse_door_sources(self):
+        self.assertEqual(parse_door_sources(""), [(DEFAULT_DOOR_ID, None)])
+        self.assertEqual(
+            parse_door_sources("main=0, garage=1,lab=rtsp://10.0.0.5/stream,test=videos/door.mp4"),
+            [("main", 0), ("garage", 1), ("lab", "rtsp://10.0.0.5/stream"), ("test", "videos/door.mp4")],
+        )
+        with self.assertRaises(ValueError):
+            parse_door_sources("main=0,main=1")
+
+    def test_each_door_gets_its_own_camera_and_broadcaster(self):
+        registry = DoorRegistry.from_sources(
+            [("main", 0), ("broken", "broken"), ("garage", 1)],
+            camera_factory=StubCamera,
+            producer_factory=lambda camera: (lambda: None),
+        )
+        self.assertEqual(registry.ids(), ["main", "garage"])
+        self.assertIs(registry.default, registry.get("main"))
+        self.assertEqual(registry.get("garage").camera.source, 1)
+        self.assertIsNot(registry.get("main").broadcaster, registry.get("garage").broadcaster)
+        self.assertIsNone(registry.get("broken"))
+
+        registry.release_all()
+        self.assertTrue(all(door.camera.released for door in registry))
+
+
+@unittest.skipUnless(routes, "app.api.routes needs pyzbar and the zbar library")
+class DoorRoutesTests(unittest.TestCase):
+    def setUp(self):
+        self.registry = DoorRegistry.from_sources(
+            [("main", 0), ("garage", 1)],
+            camera_factory=StubCamera,
+            producer_factory=lambda camera: (lambda: None),
+        )
+        patcher = mock.patch.object(routes, "door_registry", self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _scans_started(self):
+        return {door.door_id: door.camera.scans_started for door in self.registry}
+
+    def test_scan_routes_only_reach_their_own_door(self):
+        asyncio.run(routes.door_start_scan("garage"))
+        self.assertEqual(self._scans_started(), {"main": 0, "garage": 1})
+
+        asyncio.run(routes.door_face_reset("main"))
+        self.assertEqual(self._scans_started(), {"main": 1, "garage": 1})
+
+        with self.assertRaises(HTTPException) as ctx:
+            asyncio.run(routes.door_face_reset("lab"))
+        self.assertEqual(ctx.exception.status_code, 404)
+        self.assertEqual(self._scans_started(), {"main": 1, "garage": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
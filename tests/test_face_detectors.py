@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from app.services.face_detectors import DnnFaceDetector, create_face_detector
+
+
+class StubDnnDetector(DnnFaceDetector):
+    """DnnFaceDetector with fixed raw network boxes instead of a model file."""
+
+    def __init__(self, raw_boxes):
+        self.raw_boxes = raw_boxes
+
+    def _detect_raw(self, image_bgr):
+        return self.raw_boxes
+
+
+class DnnFaceDetectorTests(unittest.TestCase):
+    def test_boxes_are_clipped_to_the_image(self):
+        detector = StubDnnDetector([(-20.4, -10.0, 100.0, 80.0), (600.0, 400.0, 100.0, 120.0)])
+        boxes = detector.detectMultiScale(np.zeros((480, 640), dtype=np.uint8))
+        self.assertEqual(boxes.dtype, np.int32)
+        self.assertEqual(boxes.tolist(), [[0, 0, 79, 70], [600, 400, 40, 80]])
+
+    def test_boxes_outside_the_image_are_dropped(self):
+        detector = StubDnnDetector([(700.0, 100.0, 50.0, 50.0), (100.0, -90.0, 50.0, 60.0)])
+        boxes = detector.detectMultiScale(np.zeros((480, 640, 3), dtype=np.uint8))
+        self.assertEqual(boxes.shape, (0, 4))
+
+    def test_min_and_max_size_filter_like_a_cascade(self):
+        detector = StubDnnDetector([(10, 10, 40, 40), (100, 100, 80, 80), (200, 100, 200, 200), (10, 300, 80, 30)])
+        gray = np.zeros((480, 640), dtype=np.uint8)
+        boxes = detector.detectMultiScale(gray, 1.1, 5, minSize=(60, 60), maxSize=(150, 150))
+        self.assertEqual(boxes.tolist(), [[100, 100, 80, 80]])
+        # No maxSize (0, 0): only the lower bound applies.
+        boxes = detector.detectMultiScale(gray, minSize=(60, 60))
+        self.assertEqual(boxes.tolist(), [[100, 100, 80, 80], [200, 100, 200, 200]])
+
+
+class CreateFaceDetectorTests(unittest.TestCase):
+    def test_missing_cascade_file_is_reported(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with self.assertRaisesRegex(RuntimeError, "not found"):
+                create_face_detector("lbp", os.path.join(directory, "lbpcascade_frontalface_improved.xml"))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            create_face_detector("hog")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.services import face_gallery_file
+from app.services.face_gallery_file import gallery_file_name, map_gallery_file, read_current, write_gallery_file
+from app.services.lbph_gallery import LBPHGallery
+from tests.face_fixtures import synthetic_faces
+
+
+def _fingerprint(checksum: str, count: int) -> dict:
+    return {"max_emp_id": count, "count": count, "photo_checksum": checksum}
+
+
+class GalleryFileTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.directory = self._tmpdir.name
+        self.faces = synthetic_faces(6)
+        self.gallery = LBPHGallery()
+        self.gallery.train(self.faces, np.arange(6))
+        self.names = ["Alice", "Bob", "Celina", "Dawid", "Ewa", "Łukasz"]
+        self.emp_ids = [1, 2, 3, 4, 5, 6]
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def _publish(self, checksum: str, gallery=None, names=None, emp_ids=None) -> str:
+        gallery = gallery or self.gallery
+        names = names or self.names
+        emp_ids = emp_ids or self.emp_ids
+        return write_gallery_file(self.directory, gallery, names, emp_ids, _fingerprint(checksum, len(names)))
+
+    def test_mapped_gallery_matches_the_in_memory_one(self):
+        path = self._publish("a1")
+        self.assertEqual(read_current(self.directory), os.path.basename(path))
+
+        mapped, names, emp_ids, fingerprint = map_gallery_file(path)
+        self.assertEqual(names, self.names)
+        self.assertEqual(emp_ids, self.emp_ids)
+        self.assertEqual(fingerprint, _fingerprint("a1", 6))
+        self.assertEqual(len(mapped), 6)
+        for face in self.faces[:3]:
+            self.assertEqual(mapped.predict_top_k(face, k=3), self.gallery.predict_top_k(face, k=3))
+        # Views of the read-only mapping, not private copies.
+        by_feature = mapped.arrays[0]
+        self.assertIsInstance(by_feature, np.memmap)
+        self.assertFalse(by_feature.flags.writeable)
+        self.assertEqual(by_feature.ctypes.data % face_gallery_file.ALIGNMENT, 0)
+
+    def test_regeneration_swaps_atomically(self):
+        old_path = self._publish("a1")
+        old, _names, _emp_ids, _old_fingerprint = map_gallery_file(old_path)
+        expected = old.predict(self.faces[2])
+
+        grown = LBPHGallery()
+        grown.train(self.faces + synthetic_faces(2, seed=1), np.arange(8))
+        with mock.patch.object(face_gallery_file, "STALE_AFTER_SECONDS", 0.0):
+            new_path = self._publish(
+                "b2", gallery=grown, names=self.names + ["Filip", "Gosia"], emp_ids=self.emp_ids + [7, 8]
+            )
+
+        self.assertEqual(read_current(self.directory), gallery_file_name(_fingerprint("b2", 8)))
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([os.path.basename(new_path), "current.json"]))
+        # A process still holding the old mapping keeps working until it switches.
+        self.assertEqual(old.predict(self.faces[2]), expected)
+        self.assertEqual(len(map_gallery_file(new_path)[0]), 8)
+
+    def test_republishing_the_same_state_reuses_the_file(self):
+        path = self._publish("a1")
+        before = os.stat(path)
+        self.assertEqual(self._publish("a1"), path)
+        self.assertEqual(os.stat(path).st_mtime_ns, before.st_mtime_ns)
+        self.assertEqual(os.stat(path).st_ino, before.st_ino)
+
+    def test_rejects_other_files(self):
+        path = os.path.join(self.directory, "gallery-v1-bad.bin")
+        with open(path, "wb") as f:
+            f.write(b"not a gallery")
+        with self.assertRaises(ValueError):
+            map_gallery_file(path)
+        self.assertIsNone(read_current(self.directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.models.qr_image import employees
+from app.models.qr_image import metadata as core_metadata
+from app.services import face_model, facial_recognition
+from app.services.face_model import FaceModelManager, compute_db_fingerprint, read_snapshot, write_snapshot
+from app.services.face_templates import add_face_template
+from app.services.lbph_gallery import LBPHGallery
+from tests.face_fixtures import synthetic_face, synthetic_faces
+
+
+def _manager(faces, names, emp_ids=None) -> FaceModelManager:
+    gallery = LBPHGallery()
+    gallery.train(faces, np.arange(len(faces)))
+    manager = FaceModelManager()
+    manager._initialized = True
+    manager.recognizer = gallery
+    manager.known_names = names
+    manager.known_emp_ids = emp_ids or list(range(1, len(names) + 1))
+    manager.model_version = 1
+    return manager
+
+
+def _wait_for_rebuild(manager: FaceModelManager, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while manager.rebuilding:
+        if time.monotonic() > deadline:
+            raise AssertionError("face model rebuild did not finish")
+        time.sleep(0.01)
+
+
+class FaceModelManagerTests(unittest.TestCase):
+    """Resident model against a temporary database (NumPy matcher, snapshots in a temp dir)."""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.model_dir = os.path.join(self._tmpdir.name, "face_model")
+        self._engine = create_engine(
+            f"sqlite:///{os.path.join(self._tmpdir.name, 'test_access_control.db')}",
+            connect_args={"check_same_thread": False},
+        )
+        core_metadata.create_all(self._engine)
+        self._SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
+        self._patches = [
+            mock.patch.object(face_model, "SessionLocal", self._SessionLocal),
+            mock.patch.object(facial_recognition, "SessionLocal", self._SessionLocal),
+            mock.patch.object(face_model, "FACE_MATCHER", "numpy"),
+            mock.patch.object(facial_recognition, "FACE_MATCHER", "numpy"),
+            mock.patch.object(face_model, "SHARED_GALLERY", False),
+            mock.patch.object(face_model, "write_snapshot", functools.partial(write_snapshot, directory=self.model_dir)),
+            mock.patch.object(face_model, "read_snapshot", functools.partial(read_snapshot, directory=self.model_dir)),
+        ]
+        for patch in self._patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self._patches):
+            patch.stop()
+        self._engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _add_employee(self, name: str, face: np.ndarray) -> int:
+        with self._SessionLocal() as db:
+            emp_id = db.execute(insert(employees).values(emp_name=name)).inserted_primary_key[0]
+            add_face_template(db, emp_id, face)
+            db.commit()
+        return emp_id
+
+    def _built_manager(self) -> FaceModelManager:
+        manager = FaceModelManager()
+        manager.request_rebuild()
+        _wait_for_rebuild(manager)
+        self.assertIsNone(manager.last_error)
+        return manager
+
+    def test_added_face_is_recognized_without_a_rebuild(self):
+        self._add_employee("Alice", synthetic_face(1))
+        self._add_employee("Bob", synthetic_face(2))
+        manager = self._built_manager()
+        version = manager.model_version
+
+        face = synthetic_face(3)
+        emp_id = self._add_employee("Celina", face)
+        with mock.patch.object(manager, "request_rebuild") as request_rebuild:
+            manager.notify_face_added("Celina", face, emp_id)
+        request_rebuild.assert_not_called()
+
+        recognizer, known_names = manager.get()
+        label, distance = recognizer.predict(face)
+        self.assertEqual(known_names[label], "Celina")
+        self.assertEqual(manager.known_emp_ids[label], emp_id)
+        self.assertAlmostEqual(distance, 0.0, places=4)
+        self.assertEqual(manager.model_version, version + 1)
+
+    def test_snapshot_of_another_db_state_is_ignored_and_rebuilt(self):
+        self._add_employee("Alice", synthetic_face(1))
+        manager = self._built_manager()
+        # The rebuild wrote a snapshot matching the DB: a restart loads it.
+        self.assertTrue(FaceModelManager().load_snapshot())
+
+        self._add_employee("Bob", synthetic_face(2))
+        self.assertIsNone(face_model.read_snapshot(expected_fingerprint=compute_db_fingerprint()))
+        restarted = FaceModelManager()
+        self.assertFalse(restarted.load_snapshot())
+        self.assertTrue(restarted.rebuilding)
+        _wait_for_rebuild(restarted)
+        self.assertEqual(restarted.known_names, ["Alice", "Bob"])
+        self.assertEqual(len(manager.known_names), 1)
+
+    def test_snapshot_of_another_matcher_is_ignored(self):
+        self._add_employee("Alice", synthetic_face(1))
+        self._built_manager()
+        fingerprint = compute_db_fingerprint()
+        self.assertIsNotNone(face_model.read_snapshot(expected_fingerprint=fingerprint))
+        # Switching ACS_FACE_MATCHER: the NumPy snapshot is not read by the OpenCV recognizer.
+        with mock.patch.object(face_model, "FACE_MATCHER", "opencv"):
+            self.assertIsNone(face_model.read_snapshot(expected_fingerprint=fingerprint))
+
+    def test_update_during_a_rebuild_is_not_lost(self):
+        self._add_employee("Alice", synthetic_face(1))
+        training = threading.Event()
+        release = threading.Event()
+        real_train = face_model.train_lbph_from_db
+
+        def slow_train():
+            # Reads the DB before the enrollment below is committed.
+            model = real_train()
+            training.set()
+            release.wait(5.0)
+            return model
+
+        manager = self._built_manager()
+        with mock.patch.object(face_model, "train_lbph_from_db", slow_train):
+            manager.notify_employees_changed()
+            self.assertTrue(training.wait(5.0))
+            face = synthetic_face(2)
+            emp_id = self._add_employee("Bob", face)
+            manager.notify_face_added("Bob", face, emp_id)
+            release.set()
+            _wait_for_rebuild(manager)
+
+        self.assertEqual(manager.known_names, ["Alice", "Bob"])
+        self.assertEqual(manager.known_emp_ids[manager.recognizer.predict(face)[0]], emp_id)
+
+
+class ExportForWorkersTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.faces = synthetic_faces(3)
+
+    def tearDown(self):
+        self._tmpdir.cleanup()
+
+    def test_gallery_is_written_without_holding_the_model_lock(self):
+        manager = _manager(self.faces[:2], ["Alice", "Bob"])
+        lock_free = []
+        real_write = LBPHGallery.write
+
+        def write(gallery, path):
+            # Another door's predict() must be able to take the lock meanwhile,
+            # and an enrollment landing now must not leak into this version's file.
+            def other_door():
+                acquired = manager.lock.acquire(timeout=1.0)
+                lock_free.append(acquired)
+                if acquired:
+                    manager.notify_face_added("Celina", self.faces[2], 3)
+                    manager.lock.release()
+
+            thread = threading.Thread(target=other_door)
+            thread.start()
+            thread.join()
+            real_write(gallery, path)
+
+        with mock.patch.object(LBPHGallery, "write", write):
+            version, path = manager.export_for_workers(self._tmpdir.name)
+
+        self.assertEqual(lock_free, [True])
+        self.assertEqual(version, 1)
+        exported = LBPHGallery()
+        exported.read(path)
+        self.assertEqual(len(exported), 2)
+        with open(path + ".names.json", encoding="utf-8") as f:
+            self.assertEqual(json.load(f), ["Alice", "Bob"])
+
+        # The enrollment bumped the version: the next call exports it.
+        version, path = manager.export_for_workers(self._tmpdir.name)
+        self.assertEqual(version, 2)
+        self.assertTrue(os.path.exists(path))
+
+
+class VerificationModelTests(unittest.TestCase):
+    def test_employees_with_the_same_name_are_verified_apart(self):
+        faces = synthetic_faces(4)
+        # Two employees called Bob (emp_id 7 and 9) and Alice in between.
+        manager = _manager(faces[:3], ["Bob", "Alice", "Bob"], [7, 8, 9])
+
+        first, second = manager.verification_model(7), manager.verification_model(9)
+        self.assertEqual((len(first), len(second)), (1, 1))
+        self.assertAlmostEqual(first.predict(faces[0])[1], 0.0, places=4)
+        self.assertAlmostEqual(second.predict(faces[2])[1], 0.0, places=4)
+        # The other Bob's face is scored against the QR owner's templates only.
+        self.assertGreater(first.predict(faces[2])[1], 1.0)
+        self.assertIsNone(manager.verification_model(42))
+
+        # A capture of the second Bob goes to his gallery, not the first one's.
+        manager.notify_face_added("Bob", faces[3], 9)
+        self.assertEqual(len(manager.verification_model(7)), 1)
+        self.assertEqual(len(manager.verification_model(9)), 2)
+
+    def test_verifier_is_exported_once_per_model_version(self):
+        faces = synthetic_faces(3)
+        manager = _manager(faces[:2], ["Alice", "Bob"], [7, 9])
+        with tempfile.TemporaryDirectory() as directory:
+            path = manager.export_verifier_for_workers(directory, 9)
+            self.assertEqual(manager.export_verifier_for_workers(directory, 9), path)
+            verifier = LBPHGallery()
+            verifier.read(path)
+            self.assertEqual(len(verifier), 1)
+            self.assertAlmostEqual(verifier.predict(faces[1])[1], 0.0, places=4)
+            self.assertIsNone(manager.export_verifier_for_workers(directory, 42))
+
+            # Two model changes later the first file is gone.
+            manager.notify_face_added("Bob", faces[2], 9)
+            manager.notify_face_added("Bob", faces[2], 9)
+            newest = manager.export_verifier_for_workers(directory, 9)
+            self.assertNotEqual(newest, path)
+            self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
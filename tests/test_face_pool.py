@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from multiprocessing import shared_memory
+from unittest import mock
+
+import numpy as np
+
+from app.services import face_pool
+from app.services.face_pool import FaceProcessPool
+from app.services.lbph_gallery import LBPHGallery
+from tests.face_fixtures import synthetic_faces
+
+
+class FaceProcessPoolTests(unittest.TestCase):
+    def test_waiting_for_a_slot_times_out_as_an_error(self):
+        pool = FaceProcessPool(1, model_dir=tempfile.gettempdir(), slot_bytes=64, slot_timeout=0.05)
+        self.addCleanup(pool.shutdown)
+        pool.start()
+        # Both slots are taken by frames in flight.
+        taken = [pool._free.get_nowait() for _ in range(2)]
+        self.addCleanup(lambda: [pool._free.put(shm) for shm in taken])
+
+        with self.assertRaises(TimeoutError):
+            pool.detect_and_recognize(np.zeros((4, 4, 3), dtype=np.uint8), (1, "unused"), 80.0)
+        self.assertEqual(pool.stats()["errors"], 1)
+        self.assertEqual(pool.stats()["frames"], 0)
+
+
+class WorkerDetectTests(unittest.TestCase):
+    """`_worker_detect` run in this process, as a worker would run it."""
+
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmpdir.cleanup)
+        self.shm = shared_memory.SharedMemory(create=True, size=32 * 32 * 3)
+        self.addCleanup(self.shm.unlink)
+        self.addCleanup(self.shm.close)
+        for name, value in (
+            ("_worker_shm", {}),
+            ("_worker_verifiers", {}),
+            ("_worker_model", {"version": None, "recognizer": None, "names": []}),
+        ):
+            patcher = mock.patch.object(face_pool, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: [shm.close() for shm in face_pool._worker_shm.values()])
+
+    def test_verifier_is_loaded_once_without_the_full_model(self):
+        verifier = LBPHGallery()
+        verifier.train(synthetic_faces(1), [0])
+        path = f"{self._tmpdir.name}/worker-verify-3-7.npz"
+        verifier.write(path)
+
+        with mock.patch.object(LBPHGallery, "read", autospec=True, side_effect=LBPHGallery.read) as read:
+            for _ in range(2):
+                result = face_pool._worker_detect(
+                    self.shm.name, (32, 32, 3), None, None, 76.0, verifier=(path, "Bob")
+                )
+                self.assertEqual(result[3], 0)  # no face in a blank frame
+        # Read for the first frame only, and the full model was never loaded.
+        self.assertEqual(read.call_count, 1)
+        self.assertEqual(list(face_pool._worker_verifiers), [path])
+        self.assertIsNone(face_pool._worker_model["version"])
+
+
+if __name__ == "__main__":
+    unittest.main()
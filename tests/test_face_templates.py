@@ -0,0 +1,134 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.qr_image import metadata as core_metadata
+from app.services.face_templates import (
+    FEATURE_KIND,
+    add_face_template,
+    delete_face_template,
+    keep_photo_as_template,
+    list_face_templates,
+    load_template_faces,
+    load_template_features,
+    raw_face,
+)
+from app.services.lbph_gallery import LBPHGallery
+from tests.face_fixtures import synthetic_face
+
+
+def _jpeg(face: np.ndarray) -> bytes:
+    return cv2.imencode(".jpg", face)[1].tobytes()
+
+
+class FaceTemplateTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self._tmpdir.name, "test_access_control.db")
+        self._engine = create_engine(f"sqlite:///{db_path}")
+        core_metadata.create_all(self._engine)
+        self.db = sessionmaker(bind=self._engine)()
+        self.db.execute(
+            text("INSERT INTO employees (emp_id, emp_name, emp_photo) VALUES (1, 'Alice', :a), (2, 'Bob', :b)"),
+            {"a": _jpeg(synthetic_face(1)), "b": _jpeg(synthetic_face(2))},
+        )
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        self._engine.dispose()
+        self._tmpdir.cleanup()
+
+    def test_add_list_and_delete(self):
+        first = add_face_template(self.db, 1, synthetic_face(1))
+        second = add_face_template(self.db, 1, synthetic_face(3))
+        self.db.commit()
+
+        templates = list_face_templates(self.db, 1)
+        self.assertEqual([t["id"] for t in templates], [first["id"], second["id"]])
+        self.assertTrue(all(0.0 <= t["quality"] <= 1.0 for t in templates))
+        self.assertEqual(list_face_templates(self.db, 2), [])
+
+        self.assertFalse(delete_face_template(self.db, 2, first["id"]))
+        self.assertTrue(delete_face_template(self.db, 1, first["id"]))
+        self.db.commit()
+        self.assertEqual([t["id"] for t in list_face_templates(self.db, 1)], [second["id"]])
+
+    def test_employees_without_templates_fall_back_to_emp_photo(self):
+        add_face_template(self.db, 1, synthetic_face(1))
+        add_face_template(self.db, 1, synthetic_face(3))
+        self.db.commit()
+
+        faces, names, emp_ids = load_template_faces(self.db)
+        self.assertEqual(names, ["Alice", "Alice", "Bob"])
+        self.assertEqual(emp_ids, [1, 1, 2])
+        self.assertTrue(all(face.shape == (200, 200) for face in faces))
+
+        histograms, feature_names, feature_emp_ids = load_template_features(self.db)
+        self.assertEqual(feature_names, names)
+        self.assertEqual(feature_emp_ids, emp_ids)
+        self.assertEqual(len(histograms), 3)
+
+    def test_first_added_capture_keeps_the_enrollment_photo(self):
+        # Bob was enrolled with emp_photo only; a second capture must not replace it.
+        keep_photo_as_template(self.db, 2)
+        add_face_template(self.db, 2, synthetic_face(4))
+        keep_photo_as_template(self.db, 2)
+        self.db.commit()
+
+        self.assertEqual(len(list_face_templates(self.db, 2)), 2)
+        faces, names, _emp_ids = load_template_faces(self.db)
+        self.assertEqual(names, ["Alice", "Bob", "Bob"])
+        photo = cv2.imdecode(np.frombuffer(_jpeg(synthetic_face(2)), np.uint8), cv2.IMREAD_GRAYSCALE)
+        np.testing.assert_array_equal(faces[1], photo)
+
+    def test_missing_features_are_computed_and_written_back(self):
+        # A row as backfilled by the migration: JPEG only.
+        self.db.execute(
+            text("INSERT INTO face_templates (emp_id, face) VALUES (2, :face)"), {"face": _jpeg(synthetic_face(2))}
+        )
+        self.db.commit()
+
+        histograms, names, _emp_ids = load_template_features(self.db)
+        self.assertEqual(names, ["Alice", "Bob"])
+        expected = LBPHGallery().histogram(cv2.imdecode(np.frombuffer(_jpeg(synthetic_face(2)), np.uint8), 0))
+        np.testing.assert_allclose(histograms[1], expected)
+
+        face_raw, features, kind, quality = self.db.execute(
+            text("SELECT face_raw, features, feature_kind, quality FROM face_templates WHERE emp_id = 2")
+        ).one()
+        self.assertEqual(len(face_raw), 200 * 200)
+        self.assertEqual(kind, FEATURE_KIND)
+        self.assertIsNotNone(quality)
+        np.testing.assert_array_equal(np.frombuffer(features, dtype=np.float32), histograms[1])
+
+    def test_raw_faces_are_loaded_without_decoding(self):
+        face = synthetic_face(1)
+        add_face_template(self.db, 1, face)
+        self.db.commit()
+
+        faces, names, _emp_ids = load_template_faces(self.db)
+        self.assertEqual(names, ["Alice", "Bob"])
+        # Stored pixels come back exactly (no JPEG round trip) as a view over the fetched row.
+        np.testing.assert_array_equal(faces[0], face)
+        self.assertFalse(faces[0].flags.writeable)
+
+    def test_raw_faces_are_written_back_for_jpeg_only_templates(self):
+        self.db.execute(
+            text("INSERT INTO face_templates (emp_id, face) VALUES (2, :face)"), {"face": _jpeg(synthetic_face(2))}
+        )
+        self.db.commit()
+
+        faces, _names, _emp_ids = load_template_faces(self.db)
+        face_raw = self.db.execute(text("SELECT face_raw FROM face_templates WHERE emp_id = 2")).scalar()
+        np.testing.assert_array_equal(raw_face(face_raw), faces[1])
+        self.assertIsNone(raw_face(b"\x00" * 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
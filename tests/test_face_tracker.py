@@ -0,0 +1,56 @@
+import unittest
+
+from app.services.face_tracker import FaceTracker, SearchRegion
+
+FRAME = (480, 640, 3)
+
+
+class FaceTrackerTests(unittest.TestCase):
+    def test_full_frame_until_a_face_is_found(self):
+        tracker = FaceTracker()
+        self.assertIsNone(tracker.search_region(FRAME))
+        tracker.update([])
+        self.assertIsNone(tracker.search_region(FRAME))
+        self.assertEqual(tracker.stats()["full_scans"], 2)
+
+    def test_region_around_largest_face_clipped_to_frame(self):
+        tracker = FaceTracker(margin=0.5, size_band=(0.7, 1.4))
+        tracker.search_region(FRAME)
+        tracker.update([(10, 10, 40, 40), (500, 300, 120, 120)])
+
+        region = tracker.search_region(FRAME)
+        self.assertEqual(region, SearchRegion(440, 240, 200, 240, min_face=84, max_face=168))
+
+    def test_periodic_full_scan_and_loss(self):
+        tracker = FaceTracker(full_every=3)
+        tracker.search_region(FRAME)
+        tracker.update([(200, 150, 120, 120)])
+
+        regions = [tracker.search_region(FRAME) for _ in range(4)]
+        self.assertEqual([r is None for r in regions], [False, False, False, True])
+
+        tracker.update([])
+        self.assertIsNone(tracker.search_region(FRAME))
+        stats = tracker.stats()
+        self.assertEqual((stats["roi_scans"], stats["lost"], stats["tracking"]), (3, 1, False))
+
+    def test_reset_drops_the_box(self):
+        tracker = FaceTracker()
+        tracker.update([(200, 150, 120, 120)])
+        tracker.reset()
+        self.assertIsNone(tracker.search_region(FRAME))
+
+    def test_results_of_a_previous_session_are_ignored(self):
+        tracker = FaceTracker()
+        tracker.reset(session=1)
+        tracker.update([(200, 150, 120, 120)], session=1)
+        tracker.reset(session=2)
+        # A frame analysed before the reset finishes late: it must not seed the new session.
+        tracker.update([(200, 150, 120, 120)], session=1)
+        self.assertIsNone(tracker.search_region(FRAME))
+        tracker.update([(100, 100, 80, 80)], session=2)
+        self.assertIsNotNone(tracker.search_region(FRAME))
+
+
+if __name__ == "__main__":
+    unittest.main()
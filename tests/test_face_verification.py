@@ -0,0 +1,102 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from app.services.face_model import FaceModelManager
+from app.services.lbph_gallery import LBPHGallery
+from tests.face_fixtures import synthetic_faces
+
+try:
+    from app.services import video
+except ImportError:  # pyzbar needs the zbar shared library
+    video = None
+
+
+def _manager(faces, names, emp_ids) -> FaceModelManager:
+    gallery = LBPHGallery()
+    gallery.train(faces, np.arange(len(faces)))
+    manager = FaceModelManager()
+    manager._initialized = True
+    manager.recognizer = gallery
+    manager.known_names = names
+    manager.known_emp_ids = emp_ids
+    manager.model_version = 1
+    return manager
+
+
+@unittest.skipUnless(video, "app.services.video needs pyzbar and the zbar library")
+class NamesakeVerificationTests(unittest.TestCase):
+    """Two employees called Bob: emp_id 7 has a face template, emp_id 9 has none."""
+
+    def setUp(self):
+        self.faces = synthetic_faces(2)
+        self.manager = _manager([self.faces[0], self.faces[1]], ["Bob", "Alice"], [7, 8])
+        self.shown_face = self.faces[0]  # Bob 7 is in front of the camera
+        self.logged = []
+        patches = [
+            mock.patch.object(video, "face_model_manager", self.manager),
+            mock.patch.object(video, "face_process_pool", None),
+            mock.patch.object(video, "detect_and_recognize", self._detect_and_recognize),
+            mock.patch.object(video, "_log_good_entry", lambda *a, **k: self.logged.append("granted")),
+            mock.patch.object(video, "_log_unauthorized_access", lambda *a: self.logged.append("denied")),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.camera = video.VideoCamera(door_id="test", source=0)
+        self.addCleanup(self.camera.release)
+
+    def _detect_and_recognize(self, frame, recognizer, known_names, threshold, **kwargs):
+        """One face, scored with the recognizer the camera picked (no Haar detection needed)."""
+        label, distance = recognizer.predict(self.shown_face)
+        name = known_names[label] if distance < threshold else "Unknown"
+        return name, distance, [], 1
+
+    def _scan(self, emp_id):
+        self.camera.start_qr_scanning()
+        self.camera.set_target_employee("Bob", emp_id)
+        frame = np.zeros((8, 8, 3), dtype=np.uint8)
+        context = (self.camera.session_id, self.camera.state, "Bob", emp_id)
+        result = self.camera._analyze_frame(frame, 1, context)
+        self.camera._apply_analysis_result(result)
+        return result
+
+    def test_one_to_one_without_templates_is_denied(self):
+        with mock.patch.object(video, "FACE_VERIFICATION_MODE", "1:1"):
+            result = self._scan(9)
+
+        # No fallback to 1:N, where the other Bob's face would match the name.
+        self.assertTrue(result.no_templates)
+        self.assertEqual(result.detected_name, "Unknown")
+        self.assertEqual(self.camera.state, video.CameraState.ACCESS_DENIED)
+        self.assertEqual(self.logged, ["denied"])
+
+    def test_one_to_one_with_templates_is_granted(self):
+        with mock.patch.object(video, "FACE_VERIFICATION_MODE", "1:1"):
+            result = self._scan(7)
+
+        self.assertEqual(result.detected_emp_id, 7)
+        self.assertEqual(self.camera.state, video.CameraState.ACCESS_GRANTED)
+        self.assertEqual(self.logged, ["granted"])
+
+    def test_one_to_n_compares_the_emp_id_not_the_name(self):
+        with mock.patch.object(video, "FACE_VERIFICATION_MODE", "1:N"):
+            result = self._scan(9)
+
+        self.assertEqual((result.detected_name, result.detected_emp_id), ("Bob", 7))
+        self.assertEqual(self.camera.state, video.CameraState.FACE_VERIFICATION)
+        self.assertEqual(self.camera.face_failed_attempts, 1)
+        self.assertEqual(self.logged, [])
+
+
+class EmpIdForNameTests(unittest.TestCase):
+    def test_namesakes_are_ambiguous(self):
+        manager = _manager(synthetic_faces(3), ["Bob", "Alice", "Bob"], [7, 8, 9])
+        self.assertEqual(manager.emp_id_for_name("Alice"), 8)
+        self.assertIsNone(manager.emp_id_for_name("Bob"))
+        self.assertIsNone(manager.emp_id_for_name("Celina"))
+
+
+if __name__ == "__main__":
+    unittest.main()
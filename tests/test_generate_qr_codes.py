@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import cv2
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+import generate_qr_codes
+import app.services.qr_index as qr_index_module
+from app.models.qr_image import employees
+from app.models.qr_image import metadata as core_metadata
+
+
+def _scan(path: str) -> str:
+    # The classic QRCodeDetector misses about 1% of these badges; the Aruco-based one reads them all.
+    payload, _points, _code = cv2.QRCodeDetectorAruco().detectAndDecode(cv2.imread(path))
+    return payload
+
+
+class GenerateQrCodesTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self.qr_dir = os.path.join(self._tmpdir.name, "qr_codes")
+        self._engine = create_engine(
+            f"sqlite:///{os.path.join(self._tmpdir.name, 'test_access_control.db')}",
+            connect_args={"check_same_thread": False},
+        )
+        core_metadata.create_all(self._engine)
+        self._SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
+        self._patches = [
+            patch.object(generate_qr_codes, "SessionLocal", self._SessionLocal),
+            patch.object(qr_index_module, "SessionLocal", self._SessionLocal),
+        ]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in reversed(self._patches):
+            p.stop()
+        self._engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _generate(self, name: str) -> str:
+        generate_qr_codes.generate_and_store_qr_codes(1, [name], qr_output_folder=self.qr_dir)
+        return _scan(os.path.join(self.qr_dir, f"{name.replace(' ', '_')}.png"))
+
+    def _row(self, name: str):
+        with self._SessionLocal() as db:
+            return db.execute(
+                select(employees.c.emp_id, employees.c.qr_token).where(employees.c.emp_name == name)
+            ).one()
+
+    def test_regenerated_badge_of_an_existing_employee_still_resolves(self):
+        first = self._generate("Alice Nowak")
+        emp_id, token = self._row("Alice Nowak")
+
+        reprinted = self._generate("Alice Nowak")
+        self.assertEqual(reprinted, first)
+        self.assertEqual(self._row("Alice Nowak"), (emp_id, token))
+        record = qr_index_module.QrIndex().lookup(reprinted)
+        self.assertIsNotNone(record)
+        self.assertEqual(record["emp_id"], emp_id)
+
+    def test_employee_without_a_token_gets_one_with_the_new_badge(self):
+        with self._SessionLocal() as db:
+            emp_id = db.execute(insert(employees).values(emp_name="Bob")).inserted_primary_key[0]
+            db.commit()
+
+        payload = self._generate("Bob")
+        self.assertEqual(self._row("Bob"), (emp_id, payload.split("|", 1)[1]))
+        record = qr_index_module.QrIndex().lookup(payload)
+        self.assertIsNotNone(record)
+        self.assertEqual(record["emp_id"], emp_id)
+
+
+if __name__ == "__main__":
+    unittest.main()
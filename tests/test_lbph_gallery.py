@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+
+from app.services.lbph_gallery import LBPHGallery
+from tests.face_fixtures import synthetic_faces
+
+
+def _noisy(face: np.ndarray, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.clip(face.astype(np.int16) + rng.integers(-10, 10, face.shape), 0, 255).astype(np.uint8)
+
+
+class LBPHGalleryTests(unittest.TestCase):
+    def test_predict_finds_the_enrolled_face(self):
+        faces = synthetic_faces(6)
+        gallery = LBPHGallery()
+        gallery.train(faces, np.arange(6))
+
+        label, distance = gallery.predict(faces[4])
+        self.assertEqual(label, 4)
+        self.assertAlmostEqual(distance, 0.0, places=3)
+        self.assertEqual(gallery.predict(_noisy(faces[2]))[0], 2)
+
+    def test_top_k_and_label_restriction(self):
+        faces = synthetic_faces(6)
+        gallery = LBPHGallery()
+        gallery.train(faces, [0, 1, 2, 3, 4, 4])
+
+        top = gallery.predict_top_k(faces[1], k=3)
+        self.assertEqual(top[0][0], 1)
+        self.assertEqual(len(top), 3)
+        self.assertEqual([d for _, d in top], sorted(d for _, d in top))
+
+        # 1:1: only the claimed identity's templates are compared.
+        label, distance = gallery.predict(faces[1], labels=[4])
+        self.assertEqual(label, 4)
+        self.assertGreater(distance, top[0][1])
+        self.assertEqual(gallery.predict(faces[1], labels=[9]), (-1, float("inf")))
+
+    def test_update_and_write_read_round_trip(self):
+        faces = synthetic_faces(4)
+        gallery = LBPHGallery()
+        gallery.train(faces[:3], [0, 1, 2])
+        gallery.update([faces[3]], [3])
+        self.assertEqual(len(gallery), 4)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "model.npz")
+            gallery.write(path)
+            loaded = LBPHGallery()
+            loaded.read(path)
+        self.assertEqual(loaded.predict(_noisy(faces[3])), gallery.predict(_noisy(faces[3])))
+
+    def test_subset_is_a_one_person_gallery(self):
+        faces = synthetic_faces(5)
+        gallery = LBPHGallery()
+        gallery.train(faces, [0, 1, 2, 2, 3])
+
+        verifier = gallery.subset([2], as_label=0)
+        self.assertEqual(len(verifier), 2)
+        label, distance = verifier.predict(faces[3])
+        self.assertEqual(label, 0)
+        self.assertAlmostEqual(distance, 0.0, places=3)
+        # Scored against the claimed templates only, whoever else is closer.
+        self.assertAlmostEqual(verifier.predict(faces[0])[1], gallery.predict(faces[0], labels=[2])[1], places=4)
+
+    @unittest.skipUnless(hasattr(cv2, "face"), "opencv-contrib (cv2.face) not installed")
+    def test_from_opencv_histograms(self):
+        faces = synthetic_faces(4)
+        opencv = cv2.face.LBPHFaceRecognizer_create()
+        opencv.train(faces, np.arange(4))
+        histograms = opencv.getHistograms()
+
+        verifier = LBPHGallery.from_histograms([histograms[1]], [0])
+        probe = _noisy(faces[1])
+        self.assertAlmostEqual(verifier.predict(probe)[1], opencv.predict(probe)[1], delta=1e-2)
+
+    @unittest.skipUnless(hasattr(cv2, "face"), "opencv-contrib (cv2.face) not installed")
+    def test_matches_opencv_lbph(self):
+        faces = synthetic_faces(8)
+        opencv = cv2.face.LBPHFaceRecognizer_create()
+        opencv.train(faces, np.arange(8))
+        gallery = LBPHGallery()
+        gallery.train(faces, np.arange(8))
+
+        for seed in range(3):
+            probe = _noisy(faces[seed * 2], seed=seed)
+            expected_label, expected_distance = opencv.predict(probe)
+            label, distance = gallery.predict(probe)
+            self.assertEqual(label, expected_label)
+            self.assertAlmostEqual(distance, expected_distance, delta=1e-3 * expected_distance)
+
+
+if __name__ == "__main__":
+    unittest.main()
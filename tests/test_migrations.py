@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+
+from app.core.migrations import MIGRATIONS, current_version, run_migrations
+from app.models.qr_image import metadata as core_metadata
+
+
+# Schema as created by the first version of app.models.qr_image (no qr_token, no indexes).
+LEGACY_SCHEMA = [
+    "CREATE TABLE employees (emp_id INTEGER PRIMARY KEY, emp_name VARCHAR(100),"
+    " emp_qr_code BLOB, emp_photo BLOB, created_at DATETIME)",
+    "CREATE TABLE unauthorized_access (id INTEGER PRIMARY KEY, qr_text VARCHAR(512),"
+    " photo BLOB, created_at DATETIME)",
+    "CREATE TABLE good_entries (id INTEGER PRIMARY KEY, emp_id INTEGER,"
+    " emp_name VARCHAR(100) NOT NULL, created_at DATETIME)",
+]
+
+
+class MigrationTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(self._tmpdir.name, "test_access_control.db")
+        self._engine = create_engine(f"sqlite:///{db_path}")
+
+    def tearDown(self):
+        self._engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _index_names(self) -> set[str]:
+        with self._engine.connect() as conn:
+            rows = conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+        return {r[0] for r in rows}
+
+    def test_legacy_database_is_upgraded_once(self):
+        with self._engine.begin() as conn:
+            for stmt in LEGACY_SCHEMA:
+                conn.exec_driver_sql(stmt)
+            conn.exec_driver_sql("INSERT INTO employees (emp_name) VALUES ('Alice')")
+            conn.exec_driver_sql("INSERT INTO employees (emp_name, emp_photo) VALUES ('Bob', x'FFD8FFD9')")
+            conn.exec_driver_sql(
+                "INSERT INTO good_entries (emp_id, emp_name, created_at) VALUES"
+                " (1, 'Alice', '2026-01-01 08:15:00'), (1, 'Alice', '2026-01-01 08:45:00'),"
+                " (2, 'Bob', '2026-01-02 09:00:00')"
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO unauthorized_access (qr_text, created_at) VALUES"
+                " ('Not Found', '2026-01-02 10:00:00'), (NULL, '2026-01-02 10:05:00'), ('Bob', '2026-01-02 10:10:00')"
+            )
+
+        latest = MIGRATIONS[-1][0]
+        self.assertEqual(run_migrations(self._engine), latest)
+        self.assertEqual(run_migrations(self._engine), latest)
+
+        with self._engine.connect() as conn:
+            columns = [r[1] for r in conn.exec_driver_sql("PRAGMA table_info(employees)")]
+            denial_columns = [r[1] for r in conn.exec_driver_sql("PRAGMA table_info(unauthorized_access)")]
+            applied = conn.exec_driver_sql("SELECT COUNT(*) FROM schema_migrations").scalar()
+            emp_name = conn.exec_driver_sql("SELECT emp_name FROM employees").scalar()
+            templates = conn.exec_driver_sql("SELECT emp_id, face, face_raw, features FROM face_templates").fetchall()
+            rollups = dict(
+                ((r[0], r[1], r[2]), r[3])
+                for r in conn.exec_driver_sql(
+                    "SELECT period, bucket, emp_name, count FROM access_rollups WHERE outcome = 'granted'"
+                )
+            )
+            denied = dict(
+                ((r[0], r[1], r[2]), r[3])
+                for r in conn.exec_driver_sql(
+                    "SELECT period, bucket, emp_name, count FROM access_rollups WHERE outcome = 'denied'"
+                )
+            )
+        self.assertIn("qr_token", columns)
+        self.assertIn("thumbnail", denial_columns)
+        self.assertEqual(applied, len(MIGRATIONS))
+        self.assertEqual(emp_name, "Alice")
+        self.assertEqual([tuple(t) for t in templates], [(2, b"\xff\xd8\xff\xd9", None, None)])
+        self.assertEqual(rollups[("all", "", "")], 3)
+        self.assertEqual(rollups[("all", "", "Alice")], 2)
+        self.assertEqual(rollups[("hour", "2026-01-01 08:00:00", "")], 2)
+        self.assertEqual(rollups[("day", "2026-01-02", "Bob")], 1)
+        # Unknown QR codes count in the totals only.
+        self.assertEqual(denied[("all", "", "")], 3)
+        self.assertEqual(denied[("all", "", "Bob")], 1)
+        self.assertNotIn("Not Found", {emp_name for _period, _bucket, emp_name in denied})
+        self.assertTrue(
+            {
+                "ux_employees_qr_token",
+                "ix_employees_emp_name",
+                "ix_good_entries_created_at",
+                "ix_good_entries_emp_id",
+                "ix_unauthorized_access_created_at",
+                "ix_face_templates_emp_id",
+            }.issubset(self._index_names())
+        )
+
+    def test_placeholder_rollups_of_earlier_versions_are_dropped(self):
+        core_metadata.create_all(self._engine)
+        with self._engine.begin() as conn:
+            current_version(conn)
+            conn.exec_driver_sql(
+                "INSERT INTO schema_migrations (version, description) SELECT value, 'applied' FROM"
+                " (SELECT 1 AS value UNION SELECT 2 UNION SELECT 3 UNION SELECT 4 UNION SELECT 5 UNION SELECT 6)"
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO access_rollups (period, bucket, outcome, emp_name, count) VALUES"
+                " ('all', '', 'denied', '', 4), ('all', '', 'denied', 'Not Found', 3), ('all', '', 'denied', 'Bob', 1)"
+            )
+
+        self.assertEqual(run_migrations(self._engine), MIGRATIONS[-1][0])
+        with self._engine.connect() as conn:
+            rows = conn.exec_driver_sql("SELECT emp_name, count FROM access_rollups ORDER BY emp_name").fetchall()
+        self.assertEqual([tuple(r) for r in rows], [("", 4), ("Bob", 1)])
+
+    def test_fresh_database_from_metadata_accepts_all_migrations(self):
+        core_metadata.create_all(self._engine)
+        before = self._index_names()
+        self.assertEqual(run_migrations(self._engine), MIGRATIONS[-1][0])
+        # create_all already produced every index the migrations add.
+        self.assertEqual(before, self._index_names())
+
+
+if __name__ == "__main__":
+    unittest.main()
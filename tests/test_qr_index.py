@@ -0,0 +1,141 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.models.qr_image import metadata as core_metadata
+from app.models.qr_image import employees
+from app.services.qr_generator import build_qr_payload, qr_payload_token
+import app.services.qr_index as qr_index_module
+
+
+class _Rows:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class QrIndexTests(unittest.TestCase):
+    def setUp(self):
+        self._tmpdir = tempfile.TemporaryDirectory()
+        self._db_path = os.path.join(self._tmpdir.name, "test_access_control.db")
+        self._engine = create_engine(
+            f"sqlite:///{self._db_path}",
+            connect_args={"check_same_thread": False},
+        )
+        core_metadata.create_all(self._engine)
+        self._SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
+        self._patch = patch.object(qr_index_module, "SessionLocal", self._SessionLocal)
+        self._patch.start()
+
+    def tearDown(self):
+        self._patch.stop()
+        self._engine.dispose()
+        self._tmpdir.cleanup()
+
+    def _insert_employee(self, name: str, qr_token: str | None = None) -> int:
+        with self._SessionLocal() as db:
+            result = db.execute(insert(employees).values(emp_name=name, qr_token=qr_token))
+            db.commit()
+            return result.inserted_primary_key[0]
+
+    def test_lookup_resolves_payload_and_legacy_name_only_qr(self):
+        emp_id = self._insert_employee("Alice")
+        index = qr_index_module.QrIndex()
+
+        record = index.lookup(build_qr_payload("Alice"))
+        self.assertEqual(record["emp_id"], emp_id)
+        self.assertEqual(record["emp_name"], "Alice")
+        self.assertEqual(index.lookup("Alice")["emp_id"], emp_id)
+        self.assertIsNone(index.lookup(build_qr_payload("Mallory")))
+        self.assertIsNone(index.lookup(""))
+
+    def test_duplicate_names_resolve_to_newest_row(self):
+        self._insert_employee("Bob")
+        newest = self._insert_employee("Bob")
+        index = qr_index_module.QrIndex()
+        self.assertEqual(index.employee_by_name("Bob")["emp_id"], newest)
+
+    def test_token_lookup_separates_employees_with_the_same_name(self):
+        first_payload = build_qr_payload("Bob")
+        second_payload = build_qr_payload("Bob")
+        first = self._insert_employee("Bob", qr_payload_token(first_payload))
+        second = self._insert_employee("Bob", qr_payload_token(second_payload))
+        index = qr_index_module.QrIndex()
+
+        self.assertEqual(index.lookup(first_payload)["emp_id"], first)
+        self.assertEqual(index.lookup(second_payload)["emp_id"], second)
+        # Forged token or a name-only QR must not match an employee that has a token.
+        self.assertIsNone(index.lookup("Bob|0000000000000000"))
+        self.assertIsNone(index.lookup("Bob"))
+
+    def test_token_unknown_to_cache_is_found_by_indexed_query(self):
+        index = qr_index_module.QrIndex()
+        index.load()
+        payload = build_qr_payload("Carol")
+        emp_id = self._insert_employee("Carol", qr_payload_token(payload))
+
+        self.assertEqual(index.lookup(payload)["emp_id"], emp_id)
+        self.assertEqual(index.loads, 1)
+
+    def test_index_does_not_query_db_until_invalidated(self):
+        self._insert_employee("Alice")
+        index = qr_index_module.QrIndex(debounce_seconds=0.0)
+        payload = build_qr_payload("Alice")
+        self.assertIsNotNone(index.lookup(payload))
+
+        # Rows deleted behind the index's back are still served from memory...
+        with self._SessionLocal() as db:
+            db.execute(delete(employees))
+            db.commit()
+        self.assertIsNotNone(index.lookup(payload))
+        self.assertEqual(index.loads, 1)
+
+        # ...until an admin write invalidates it.
+        index.invalidate()
+        self.assertIsNone(index.lookup(payload))
+        self.assertEqual(index.loads, 2)
+
+    def test_load_racing_invalidate_is_discarded(self):
+        self._insert_employee("Alice")
+        index = qr_index_module.QrIndex(debounce_seconds=0.0)
+        payload = build_qr_payload("Alice")
+        real_session = self._SessionLocal
+
+        def session_then_delete():
+            # The DB is read first, then delete_user commits and invalidates before load() installs it.
+            db = real_session()
+            original_execute = db.execute
+
+            def execute(*args, **kwargs):
+                result = original_execute(*args, **kwargs).fetchall()
+                with real_session() as other:
+                    other.execute(delete(employees))
+                    other.commit()
+                index.invalidate()
+                return _Rows(result)
+
+            db.execute = execute
+            return db
+
+        with patch.object(qr_index_module, "SessionLocal", session_then_delete):
+            index.load()
+        self.assertFalse(index.stats()["loaded"])
+        self.assertIsNone(index.lookup(payload))
+
+    def test_debounce_cache_serves_repeated_payload(self):
+        self._insert_employee("Alice")
+        index = qr_index_module.QrIndex(debounce_seconds=60.0)
+        payload = build_qr_payload("Alice")
+        for _ in range(5):
+            self.assertEqual(index.lookup(payload)["emp_name"], "Alice")
+        self.assertEqual(index.debounce_hits, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
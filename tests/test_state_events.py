@@ -0,0 +1,39 @@
+import asyncio
+import json
+import threading
+import unittest
+
+from app.services.events import StateEventHub, format_sse
+
+
+class StateEventHubTests(unittest.TestCase):
+    def test_new_subscriber_gets_latest_state_then_transitions(self):
+        async def scenario():
+            hub = StateEventHub()
+            hub.publish({"state": "IDLE"})
+            hub.publish({"state": "QR_SCANNING"})
+            subscriber = hub.subscribe_async()
+
+            # Transitions come from the analysis thread.
+            thread = threading.Thread(target=hub.publish, args=({"state": "FACE_VERIFICATION"},))
+            thread.start()
+            received = [await subscriber.aget(timeout=1.0), await subscriber.aget(timeout=1.0)]
+            thread.join()
+
+            self.assertEqual(hub.stats()["subscribers"], 1)
+            hub.unsubscribe(subscriber)
+            self.assertEqual(hub.stats()["subscribers"], 0)
+            return received
+
+        received = asyncio.run(scenario())
+        self.assertEqual([e["state"] for e in received], ["QR_SCANNING", "FACE_VERIFICATION"])
+
+    def test_format_sse(self):
+        message = format_sse({"state": "ACCESS_GRANTED"})
+        self.assertTrue(message.startswith("event: state\ndata: "))
+        self.assertTrue(message.endswith("\n\n"))
+        self.assertEqual(json.loads(message.split("data: ", 1)[1]), {"state": "ACCESS_GRANTED"})
+
+
+if __name__ == "__main__":
+    unittest.main()